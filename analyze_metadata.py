@@ -3,67 +3,33 @@
 Analyze metadata from sample files to compare Ray-Ban Meta vs Phone
 """
 
+import argparse
 import os
 import json
-from datetime import datetime
+import struct
+import sys
+import time
 
-# Try to import available libraries
-try:
-    import piexif
-    HAS_PIEXIF = True
-except ImportError:
-    HAS_PIEXIF = False
+from exif_reader import read_exif, tag_name
+from metadata_catalog import CATALOG_NAME
+from read_video_metadata import probe_video, read_mov_metadata
 
-try:
-    from PIL import Image
-    from PIL.ExifTags import TAGS, GPSTAGS
-    HAS_PIL = True
-except ImportError:
-    HAS_PIL = False
-
-def extract_exif_piexif(filepath):
-    """Extract EXIF using piexif"""
+def extract_exif(filepath):
+    """Extract EXIF from JPEG headers / the HEIF meta box only (exif_reader), as {ifd: {tag name: value}}"""
     try:
-        exif_dict = piexif.load(filepath)
-        result = {}
-        
-        for ifd_name in exif_dict:
-            if ifd_name == "thumbnail":
-                continue
-            if exif_dict[ifd_name]:
-                result[ifd_name] = {}
-                for tag, value in exif_dict[ifd_name].items():
-                    # Try to decode bytes to string
-                    if isinstance(value, bytes):
-                        try:
-                            value = value.decode('utf-8', errors='ignore').strip('\x00')
-                        except:
-                            value = str(value)
-                    result[ifd_name][str(tag)] = value
-        return result
-    except Exception as e:
+        exif = read_exif(filepath)
+    except (OSError, ValueError, struct.error) as e:
         return {"error": str(e)}
-
-def extract_exif_pil(filepath):
-    """Extract EXIF using PIL"""
-    try:
-        img = Image.open(filepath)
-        exif_data = img._getexif()
-        if not exif_data:
-            return {"error": "No EXIF data found"}
-        
-        result = {}
-        for tag_id, value in exif_data.items():
-            tag = TAGS.get(tag_id, tag_id)
+    if not exif:
+        return {"error": "No EXIF data found"}
+    result = {"size": exif.size}
+    for ifd_name, tags in exif.to_dict().items():
+        result[ifd_name] = {}
+        for tag, value in tags.items():
             if isinstance(value, bytes):
-                try:
-                    value = value.decode('utf-8', errors='ignore').strip('\x00')
-                except:
-                    value = str(value)[:100]
-            result[str(tag)] = value
-        return result
-    except Exception as e:
-        return {"error": str(e)}
+                value = value.decode('utf-8', errors='ignore').strip('\x00')
+            result[ifd_name][tag_name(ifd_name, tag)] = value
+    return result
 
 def analyze_file(filepath):
     """Analyze a single file"""
@@ -74,58 +40,110 @@ def analyze_file(filepath):
     ext = os.path.splitext(filepath)[1].lower()
     
     if ext in ['.jpg', '.jpeg']:
-        print("\n--- PIEXIF Analysis ---")
-        if HAS_PIEXIF:
-            exif = extract_exif_piexif(filepath)
-            print(json.dumps(exif, indent=2, default=str))
-        
-        print("\n--- PIL Analysis ---")
-        if HAS_PIL:
-            exif = extract_exif_pil(filepath)
-            for key, value in sorted(exif.items()):
-                print(f"  {key}: {value}")
+        print("\n--- EXIF (header-only) ---")
+        exif = extract_exif(filepath)
+        print(json.dumps(exif, indent=2, default=str))
     
     elif ext in ['.heic', '.heif']:
-        print("HEIC format - attempting PIL analysis...")
-        if HAS_PIL:
-            try:
-                exif = extract_exif_pil(filepath)
-                for key, value in sorted(exif.items()):
-                    print(f"  {key}: {value}")
-            except Exception as e:
-                print(f"  Error: {e}")
-                print("  (May need pillow-heif package for HEIC support)")
+        print("\n--- EXIF (HEIF meta box, no decoding) ---")
+        exif = extract_exif(filepath)
+        print(json.dumps(exif, indent=2, default=str))
     
     elif ext in ['.mov', '.mp4']:
-        print("Video format - need to analyze with ffprobe or similar")
-        print("Will extract using subprocess...")
-        
-        # Try to get basic file info
+        print("\n--- Video probe (moov headers) ---")
         file_size = os.path.getsize(filepath)
         print(f"  File size: {file_size / 1024 / 1024:.2f} MB")
+        try:
+            probe = probe_video(filepath)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"  Error: {e}")
+            return
+        print(f"  Duration: {probe['duration']:.2f} s")
+        codec = f"{probe['codec']} {probe['profile']}" if probe['profile'] else probe['codec']
+        print(f"  Video: {codec} {probe['width']}x{probe['height']}"
+              f" rotation {probe['rotation']}° @ {probe['fps']:.2f} fps")
+        print(f"  Bitrate: {probe['bitrate'] / 1000:.0f} kb/s")
+        for track in probe['tracks']:
+            print(f"  Track {track['type']}: {track['codec']}, {track['sample_count']} samples,"
+                  f" {track['bitrate'] / 1000:.0f} kb/s")
+        tags = read_mov_metadata(filepath)['tags']
+        for key, value in tags.items():
+            print(f"  {key}: {value}")
+
+def run_catalog(args):
+    """--catalog / --find: incremental catalog update and/or indexed queries"""
+    from metadata_catalog import MetadataCatalog
+    from metadata_scanner import expand_inputs
+
+    with MetadataCatalog(args.catalog) as catalog:
+        if args.paths:
+            paths = expand_inputs(args.paths)
+            roots = [p for p in args.paths if os.path.isdir(os.path.expanduser(p))]
+            started = time.perf_counter()
+            stats = catalog.update(paths, args.jobs, prune_roots=roots)
+            print(f"✓ Catalog {args.catalog}: {stats['scanned']} scanned, {stats['unchanged']} unchanged, "
+                  f"{stats['removed']} removed, {stats['failed']} failed in {time.perf_counter() - started:.1f}s")
+        if args.find:
+            filters = {}
+            for item in args.find:
+                field, _, value = item.partition("=")
+                # Numbers compare as numbers (--find width=4032)
+                filters[field] = int(value) if value.isdigit() else value
+            try:
+                records = catalog.find(**filters)
+            except ValueError as e:
+                print(f"❌ {e}", file=sys.stderr)
+                return 2
+            for record in records:
+                print(json.dumps(record, ensure_ascii=False))
+            print(f"{len(records)} matching files", file=sys.stderr)
+        elif not args.paths:
+            for model, count in catalog.counts("model").items():
+                print(f"  {count:6}  {model}")
+
+
+def main(argv=None):
+    """Analyze the files given as arguments (default: the repo's samples folder)"""
+    parser = argparse.ArgumentParser(description="Analyze photo/video metadata")
+    parser.add_argument("paths", nargs="*", help="Files or folders (default: the repo's samples folder)")
+    parser.add_argument("--catalog", nargs="?", const=CATALOG_NAME,
+                        help="Update this SQLite catalog (re-reads only changed files) instead of dumping")
+    parser.add_argument("--find", action="append", metavar="FIELD=VALUE",
+                        help="Query the catalog, e.g. --find model='Ray-Ban Stories' (repeat to AND; "
+                             "a trailing * is a prefix match)")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes for catalog scans")
+    args = parser.parse_args(argv)
+    if args.find and not args.catalog:
+        args.catalog = CATALOG_NAME
+    if args.catalog:
+        return run_catalog(args)
 
-def main():
-    samples_dir = "/Users/bpmadmin/Charitycase/samples"
+    paths = args.paths or [os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")]
     
     print("="*80)
     print("METADATA ANALYSIS - Ray-Ban Meta vs Phone")
     print("="*80)
     
     # List all files
-    files = os.listdir(samples_dir)
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, f) for f in sorted(os.listdir(path)))
+        else:
+            files.append(path)
     print(f"\nFound {len(files)} files:")
-    for f in files:
-        filepath = os.path.join(samples_dir, f)
+    for filepath in files:
         size = os.path.getsize(filepath) / 1024 / 1024
-        print(f"  - {f} ({size:.2f} MB)")
+        print(f"  - {os.path.basename(filepath)} ({size:.2f} MB)")
     
     # Analyze each file
-    for f in sorted(files):
-        filepath = os.path.join(samples_dir, f)
+    for filepath in files:
         analyze_file(filepath)
+    print("\nFor a machine-readable inventory of many files: python metadata_scanner.py PATHS")
+    print("To keep an incremental, queryable catalog: python analyze_metadata.py --catalog PATHS")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
 
 
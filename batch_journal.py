@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Resumable batch journal
+A small SQLite file in the output folder that remembers every source file
+already processed - keyed by path, size, mtime and a content fingerprint -
+so an interrupted batch picks up where it stopped and re-running on a
+folder only touches new or changed files.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+JOURNAL_NAME = ".rayban_journal.sqlite"
+
+# Bytes hashed from each end of the file for the content fingerprint
+FINGERPRINT_CHUNK = 64 * 1024
+
+
+def fingerprint(path, size=None):
+    """
+    Content hash of a file: blake2b over its size, first and last 64 KB
+
+    Sampling both ends keeps this cheap for multi-GB videos while still
+    catching re-exports and edits (which rewrite headers and/or tails).
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        h.update(f.read(FINGERPRINT_CHUNK))
+        if size > FINGERPRINT_CHUNK * 2:
+            f.seek(-FINGERPRINT_CHUNK, os.SEEK_END)
+        h.update(f.read(FINGERPRINT_CHUNK))
+    return h.hexdigest()
+
+
+class BatchJournal:
+    """
+    Completed-file journal for one output folder
+
+    Every successful file is committed as soon as it finishes (WAL mode,
+    so this is cheap), which is what makes a crashed batch resumable.
+    Only use an instance from the thread that created it.
+
+    Args:
+        output_folder: Folder the journal lives in (next to the outputs)
+        settings: String describing the output settings (mode, size, profile).
+            Files done with different settings are processed again.
+    """
+
+    def __init__(self, output_folder, settings=""):
+        self.path = os.path.join(output_folder, JOURNAL_NAME)
+        self.settings = settings
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS completed (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                output TEXT NOT NULL,
+                completed_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, path):
+        """
+        Previous output for path if it is unchanged since it was processed
+
+        size + mtime match is trusted as-is; when only the mtime moved
+        (copied back, touched, synced) the content fingerprint decides.
+
+        Returns:
+            str or None: Output path, or None when the file needs processing
+        """
+        path = os.path.abspath(path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, hash, output FROM completed WHERE path = ? AND settings = ?",
+            (path, self.settings)
+        ).fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, digest, output = row
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size != size or not os.path.exists(output):
+            return None
+        if st.st_mtime_ns != mtime_ns:
+            if fingerprint(path, st.st_size) != digest:
+                return None
+            self.conn.execute("UPDATE completed SET mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, path))
+            self.conn.commit()
+        return output
+
+    def record(self, path, output):
+        """Mark path as done, producing output"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO completed VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns, fingerprint(path, st.st_size),
+             self.settings, os.path.abspath(output), time.time())
+        )
+        self.conn.commit()
+
+    def forget(self, path):
+        """Drop path from the journal so the next run processes it again"""
+        self.conn.execute("DELETE FROM completed WHERE path = ?", (os.path.abspath(path),))
+        self.conn.commit()
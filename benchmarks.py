@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the metadata processing hot paths
+Run: python benchmarks.py <name> [options]   (python benchmarks.py -h for the list)
+"""
+
+import argparse
+import io
+import os
+import statistics
+import struct
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLES_DIR = os.path.join(REPO_DIR, "samples")
+
+# Headless CLI start-up budget: one JPEG, interpreter launch to exit
+COLD_START_TARGET_MS = 150
+
+
+def time_call(fn, repeat):
+    """Run fn `repeat` times and return the median wall time in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def bench_encoders(args):
+    """Encode one decoded image with every ENCODER_PROFILES entry (EXIF included)"""
+    import piexif
+    from PIL import Image
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        pass
+    from cloner_core import ENCODER_PROFILES
+
+    with Image.open(args.image) as img:
+        rgb = img.convert('RGB')
+    exif_bytes = piexif.dump({"0th": {271: "Meta AI"}, "Exif": {40962: rgb.size[0], 40963: rgb.size[1]}})
+    print(f"{os.path.basename(args.image)} {rgb.size[0]}x{rgb.size[1]}, median of {args.repeat}")
+    print(f"{'profile':10} {'encode ms':>10} {'size KB':>10}")
+    for name, options in ENCODER_PROFILES.items():
+        output = io.BytesIO()
+
+        def encode():
+            output.seek(0)
+            output.truncate()
+            rgb.save(output, 'JPEG', exif=exif_bytes, **options)
+
+        ms = time_call(encode, args.repeat)
+        print(f"{name:10} {ms:10.1f} {len(output.getvalue()) / 1024:10.0f}")
+
+
+def process_io():
+    """(bytes read, bytes written) by this process so far, from /proc/self/io (Linux only)"""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+def bench_jpeg_rewrite(args):
+    """Native-JPEG path: copy2 + piexif.remove + piexif.insert vs the one-pass segment rewriter"""
+    import shutil
+    import tempfile
+    import piexif
+    from jpeg_segments import rewrite_jpeg_exif
+
+    exif_bytes = piexif.dump({"0th": {271: "Meta AI", 272: "Ray-Ban Meta Smart Glasses"}})
+    size_mb = os.path.getsize(args.image) / 1024 / 1024
+
+    def three_pass(dst):
+        shutil.copy2(args.image, dst)
+        piexif.remove(dst)
+        piexif.insert(exif_bytes, dst)
+
+    def one_pass(dst):
+        rewrite_jpeg_exif(args.image, dst, exif_bytes)
+
+    print(f"{os.path.basename(args.image)} ({size_mb:.1f} MB) x {args.count} files")
+    print(f"{'method':12} {'total ms':>10} {'files/s':>10} {'read MB':>10} {'written MB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fn in (("copy+piexif", three_pass), ("rewriter", one_pass)):
+            read_before, written_before = process_io()
+            started = time.perf_counter()
+            for i in range(args.count):
+                fn(os.path.join(tmp, f"{name}_{i}.jpg"))
+            elapsed = time.perf_counter() - started
+            read_after, written_after = process_io()
+            print(f"{name:12} {elapsed * 1000:10.0f} {args.count / elapsed:10.1f} "
+                  f"{(read_after - read_before) / 2**20:10.1f} {(written_after - written_before) / 2**20:11.1f}")
+
+
+def bench_exif(args):
+    """Per-file EXIF generation: build dict + piexif.dump vs patching the precompiled block"""
+    import contextlib
+    import piexif
+    import cloner_core
+
+    with contextlib.redirect_stdout(io.StringIO()):  # first compile logs the mode
+        cloner_core.create_rayban_exif_bytes(args.mode)  # compile outside the timed loop
+
+    def per_file_us(fn):
+        started = time.perf_counter()
+        for _ in range(args.count):
+            fn()
+        return (time.perf_counter() - started) / args.count * 1e6
+
+    values = cloner_core.random_exif_values()
+    exif_dict = cloner_core.create_rayban_exif(args.mode)
+    template = cloner_core._EXIF_TEMPLATES[args.mode]
+    rows = (
+        ("build dict", per_file_us(lambda: cloner_core.create_rayban_exif(args.mode))),
+        ("piexif.dump", per_file_us(lambda: piexif.dump(exif_dict))),
+        ("random values", per_file_us(cloner_core.random_exif_values)),
+        ("template patch", per_file_us(lambda: template.render(values))),
+    )
+    print(f"EXIF generation, mode={args.mode}, {args.count} files")
+    for name, us in rows:
+        print(f"{name:20} {us:10.1f} us/file")
+
+
+def bench_exif_read(args):
+    """EXIF reading per photo: piexif.load + PIL _getexif (old analyze path) vs exif_reader"""
+    import glob
+    import piexif
+    from PIL import Image
+    from exif_reader import read_exif
+
+    photos = sorted(p for p in glob.glob(os.path.join(SAMPLES_DIR, "*"))
+                    if p.lower().endswith(('.jpg', '.jpeg')) and os.path.getsize(p) > 64 * 1024)
+
+    def old(path):
+        piexif.load(path)
+        with Image.open(path) as img:
+            img._getexif()
+
+    def new(path):
+        exif = read_exif(path)
+        exif.get(272), exif.get(36867, "Exif")
+
+    print(f"{len(photos)} sample JPEGs x {args.count}")
+    print(f"{'method':16} {'us/file':>10} {'KB read/file':>14}")
+    for name, fn in (("piexif+PIL", old), ("exif_reader", new)):
+        read_before, _ = process_io()
+        started = time.perf_counter()
+        for _ in range(args.count):
+            for path in photos:
+                fn(path)
+        elapsed = time.perf_counter() - started
+        files = args.count * len(photos)
+        print(f"{name:16} {elapsed / files * 1e6:10.0f} {(process_io()[0] - read_before) / files / 1024:14.1f}")
+
+
+def bench_heif_exif(args):
+    """HEIC EXIF + size: pillow-heif (open / full decode) vs exif_reader's meta-box parse"""
+    from PIL import Image
+    from pillow_heif import register_heif_opener
+    from exif_reader import read_exif
+
+    register_heif_opener()
+
+    def pil_open():
+        with Image.open(args.image) as img:
+            img.getexif()
+
+    def pil_decode():
+        with Image.open(args.image) as img:
+            img.getexif()
+            img.load()
+
+    def meta_box():
+        exif = read_exif(args.image)
+        exif.get(272), exif.size
+
+    print(f"{os.path.basename(args.image)} ({os.path.getsize(args.image) / 2**20:.1f} MB), median of {args.repeat}")
+    print(f"{'method':20} {'ms':>10} {'KB read':>10}")
+    for name, fn in (("pillow-heif decode", pil_decode), ("pillow-heif open", pil_open), ("exif_reader", meta_box)):
+        read_before, _ = process_io()
+        ms = time_call(fn, args.repeat)
+        print(f"{name:20} {ms:10.2f} {(process_io()[0] - read_before) / args.repeat / 1024:10.1f}")
+
+
+def bench_batch(args):
+    """Whole-batch throughput of cloner_core.run_batch at increasing worker counts"""
+    import contextlib
+    import tempfile
+    from cloner_core import classify, run_batch
+
+    paths = [os.path.join(args.folder, name) for name in sorted(os.listdir(args.folder))
+             if classify(name)] * args.copies
+    print(f"{len(paths)} files from {args.folder}")
+    print(f"{'jobs':>4} {'total s':>10} {'files/s':>10} {'failed':>7}")
+    for jobs in args.jobs:
+        with tempfile.TemporaryDirectory() as tmp:
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = run_batch(paths, tmp, "metaspoof", encoder_profile="standard", jobs=jobs)
+            elapsed = time.perf_counter() - started
+        failed = sum(1 for r in results if r["error"])
+        print(f"{jobs:4} {elapsed:10.2f} {len(paths) / elapsed:10.1f} {failed:7}")
+
+
+def bench_video_copy(args):
+    """Video output copy: buffered user-space copy vs fast_copy (reflink / copy_file_range / sendfile)"""
+    import shutil
+    import tempfile
+    from fast_copy import copy_file
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        src = args.file
+        if src is None:
+            src = os.path.join(tmp, "source.bin")
+            with open(src, 'wb') as f:
+                for _ in range(args.size_mb):
+                    f.write(os.urandom(1024 * 1024))
+        size_mb = os.path.getsize(src) / 2**20
+        dst = os.path.join(tmp, "copy.bin")
+
+        def buffered():
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+
+        method = copy_file(src, dst)
+        print(f"{size_mb:.0f} MB, median of {args.repeat}")
+        for name, fn in (("buffered", buffered), (f"fast ({method})", lambda: copy_file(src, dst))):
+            ms = time_call(fn, args.repeat)
+            print(f"{name:24} {ms:8.1f} ms {size_mb / (ms / 1000):8.0f} MB/s")
+
+
+def _synthetic_movie(path, hours, fps, audio_rate=48000):
+    """moov-only MOV with video + AAC sample tables: co64, multi-run stsc, interleaved chunks"""
+    import numpy as np
+    from quicktime_patch import atom
+
+    def full(atom_type, payload):
+        return atom(atom_type, b'\0\0\0\0' + payload)
+
+    def table(atom_type, rows):
+        rows = np.asarray(rows)
+        return full(atom_type, len(rows).to_bytes(4, 'big') + rows.astype('>u4').tobytes())
+
+    rng = np.random.default_rng(1)
+    seconds = int(hours * 3600)
+    tracks = []
+    for handler, timescale, count, delta, per_chunk, max_size in (
+            (b'vide', fps * 100, seconds * fps, 100, fps // 2, 60000),
+            (b'soun', audio_rate, seconds * audio_rate // 1024, 1024, 20, 400)):
+        sizes = rng.integers(200, max_size, count)
+        starts = np.arange(0, count, per_chunk)
+        tracks.append({'handler': handler, 'timescale': timescale, 'count': count, 'delta': delta,
+                       'per_chunk': per_chunk, 'sizes': sizes,
+                       'chunk_bytes': np.add.reduceat(sizes, starts),
+                       'chunk_times': starts * delta / timescale})
+
+    # Lay chunks out in playback order, as a muxer would; past 4 GB so co64 is needed
+    times = np.concatenate([t['chunk_times'] for t in tracks])
+    lengths = np.concatenate([t['chunk_bytes'] for t in tracks])
+    order = np.argsort(times, kind='stable')
+    offsets = np.empty(len(order), np.int64)
+    offsets[order] = (1 << 32) + np.concatenate(([0], np.cumsum(lengths[order])[:-1]))
+    split = len(tracks[0]['chunk_bytes'])
+
+    traks = []
+    for t, chunk_offsets in zip(tracks, (offsets[:split], offsets[split:])):
+        count, per_chunk, chunks = t['count'], t['per_chunk'], len(t['chunk_bytes'])
+        stbl = atom(b'stbl',
+                    table(b'stts', [[count, t['delta']]])
+                    + (table(b'stss', np.arange(1, count + 1, fps * 2)) if t['handler'] == b'vide' else b'')
+                    + full(b'stsz', struct.pack('>II', 0, count) + t['sizes'].astype('>u4').tobytes())
+                    + table(b'stsc', [[1, per_chunk, 1], [chunks, count - per_chunk * (chunks - 1), 1]])
+                    + full(b'co64', struct.pack('>I', chunks) + chunk_offsets.astype('>u8').tobytes()))
+        mdhd = full(b'mdhd', struct.pack('>IIII', 0, 0, t['timescale'], count * t['delta']) + b'\0\0\0\0')
+        hdlr = full(b'hdlr', b'\0\0\0\0' + t['handler'] + b'\0' * 13)
+        traks.append(atom(b'trak', atom(b'mdia', mdhd + hdlr + atom(b'minf', stbl))))
+    mvhd = full(b'mvhd', struct.pack('>IIII', 0, 0, 1000, seconds * 1000) + b'\0' * 80)
+    with open(path, 'wb') as f:
+        f.write(atom(b'ftyp', b'qt  \0\0\0\0qt  ') + atom(b'moov', mvhd + b''.join(traks)))
+    return sum(len(t) for t in traks)
+
+
+def bench_sample_tables(args):
+    """sample_table_stats on an hours-long synthetic movie (target: under 1 s)"""
+    import tempfile
+    from read_video_metadata import sample_table_stats
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "long.mov")
+        moov_bytes = _synthetic_movie(path, args.hours, args.fps)
+        ms = time_call(lambda: sample_table_stats(path), args.repeat)
+        stats = sample_table_stats(path)
+    samples = sum(t["samples"] for t in stats["tracks"])
+    print(f"{args.hours:g} h at {args.fps} fps: {samples:,} samples, {moov_bytes / 2**20:.1f} MB of tables")
+    print(f"sample_table_stats  {ms:8.1f} ms (median of {args.repeat})")
+    for track in stats["tracks"]:
+        print(f"  {track['type']}: {track['fps']:.2f} fps, "
+              f"{track['bitrate_min'] / 1e6:.1f}-{track['bitrate_max'] / 1e6:.1f} Mb/s")
+    print(f"  interleave: {stats['interleave']}")
+    return 0 if ms < 1000 else 1
+
+
+def bench_cold_start(args):
+    """Wall time of a one-JPEG headless CLI run, plus which heavy modules got imported"""
+    import subprocess
+    import tempfile
+
+    cli = os.path.join(REPO_DIR, "cloner_cli.py")
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = [sys.executable, cli, "--input", args.image, "--output", tmp, "--force", "--quiet"]
+        subprocess.run(cmd, check=True, capture_output=True)  # warm the OS page cache
+        runs = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            subprocess.run(cmd, check=True, capture_output=True)
+            runs.append((time.perf_counter() - started) * 1000)
+
+    probe = ("import sys, cloner_cli; "
+             "print(' '.join(m for m in ('tkinter', 'PIL', 'pillow_heif', 'multiprocessing') if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", probe], cwd=REPO_DIR, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    baseline = time_call(lambda: subprocess.run([sys.executable, "-c", "pass"], check=True), args.repeat)
+
+    median = statistics.median(runs)
+    print(f"python -c pass:        {baseline:7.1f} ms")
+    print(f"cloner_cli, 1 JPEG:    {median:7.1f} ms (target {COLD_START_TARGET_MS} ms)")
+    print(f"heavy modules at import: {loaded or 'none'}")
+    return 0 if median <= COLD_START_TARGET_MS else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("encoders", help="JPEG encoder profile speed/size")
+    p.add_argument("image", nargs="?", default=os.path.join(SAMPLES_DIR, "IMG_1173.HEIC"))
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_encoders)
+
+    p = sub.add_parser("jpeg-rewrite", help="native JPEG EXIF swap: three passes vs one")
+    p.add_argument("image", nargs="?", default=os.path.join(SAMPLES_DIR, "IMG_3777_20251203_195329_377990.JPEG"))
+    p.add_argument("--count", type=int, default=50)
+    p.set_defaults(func=bench_jpeg_rewrite)
+
+    p = sub.add_parser("exif", help="per-file EXIF generation cost")
+    p.add_argument("--mode", choices=("metaspoof", "authentic"), default="metaspoof")
+    p.add_argument("--count", type=int, default=2000)
+    p.set_defaults(func=bench_exif)
+
+    p = sub.add_parser("batch", help="parallel batch throughput vs worker count")
+    p.add_argument("folder", nargs="?", default=SAMPLES_DIR)
+    p.add_argument("--copies", type=int, default=4, help="process each sample this many times")
+    p.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    p.set_defaults(func=bench_batch)
+
+    p = sub.add_parser("video-copy", help="buffered copy vs reflink/copy_file_range/sendfile")
+    p.add_argument("file", nargs="?", default=None, help="file to copy (default: random data)")
+    p.add_argument("--size-mb", type=int, default=256)
+    p.add_argument("--dir", default=None, help="filesystem to test on (default: system temp)")
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_video_copy)
+
+    p = sub.add_parser("exif-read", help="header-only EXIF reader vs piexif + PIL")
+    p.add_argument("--count", type=int, default=50)
+    p.set_defaults(func=bench_exif_read)
+
+    p = sub.add_parser("heif-exif", help="HEIC EXIF extraction without pixel decoding")
+    p.add_argument("image", nargs="?", default=os.path.join(SAMPLES_DIR, "IMG_1173.HEIC"))
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_heif_exif)
+
+    p = sub.add_parser("sample-tables", help="NumPy sample-table statistics speed (exit 1 over 1 s)")
+    p.add_argument("--hours", type=float, default=5)
+    p.add_argument("--fps", type=int, default=60)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_sample_tables)
+
+    p = sub.add_parser("cold-start", help="headless CLI start-up time (exit 1 over target)")
+    p.add_argument("image", nargs="?", default=os.path.join(SAMPLES_DIR, "IMG_3777_20251203_195329_377990.JPEG"))
+    p.add_argument("--repeat", type=int, default=10)
+    p.set_defaults(func=bench_cold_start)
+
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Metadata Cloner - headless command line
+Same pipeline as the desktop app (cloner_core), for servers and scripts.
+
+Usage:
+    python cloner_cli.py --input ~/Photos/batch --output ~/Desktop/"Ready to Send"
+    python cloner_cli.py --input a.heic b.jpg clip.mov --output out --mode authentic --jobs 4
+    python cloner_cli.py --watch --input ~/Dropbox/incoming --output ~/Desktop/"Ready to Send"
+
+Only the standard library, piexif and the repo modules load at start-up;
+Pillow / pillow-heif are imported the first time a file needs converting.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from cloner_core import ENCODER_PROFILES, OUTPUT_SIZE_CHOICES, batch_settings, classify, run_batch
+
+
+def collect_inputs(inputs, recursive=False):
+    """Expand files and folders into the list of supported files, in a stable order"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                for dirpath, dirnames, filenames in os.walk(item):
+                    dirnames.sort()
+                    paths.extend(os.path.join(dirpath, name) for name in sorted(filenames)
+                                 if classify(name) and not name.startswith('.'))
+            else:
+                with os.scandir(item) as entries:
+                    paths.extend(sorted(entry.path for entry in entries
+                                        if entry.is_file() and classify(entry.name)
+                                        and not entry.name.startswith('.')))
+        elif classify(item):
+            paths.append(item)
+        else:
+            print(f"⚠ Skipping unsupported input: {item}", file=sys.stderr)
+    return paths
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Inject Ray-Ban Meta metadata into photos and videos (no GUI)"
+    )
+    parser.add_argument("--input", "-i", nargs="+", required=True,
+                        help="Files and/or folders to process")
+    parser.add_argument("--output", "-o", required=True,
+                        help="Output folder (created if missing)")
+    parser.add_argument("--mode", choices=("metaspoof", "authentic"), default="metaspoof",
+                        help="Metadata format (default: metaspoof)")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Worker count (default: CPU count)")
+    parser.add_argument("--max-dimension", choices=OUTPUT_SIZE_CHOICES[1:], default=None,
+                        help="Longest photo side in pixels (default: original size)")
+    parser.add_argument("--profile", choices=tuple(ENCODER_PROFILES), default="standard",
+                        help="JPEG encoder profile for converted photos")
+    parser.add_argument("--recursive", "-r", action="store_true",
+                        help="Descend into sub-folders of --input folders")
+    parser.add_argument("--force", action="store_true",
+                        help="Reprocess files the output folder's journal already has")
+    parser.add_argument("--quiet", "-q", action="store_true",
+                        help="Only print the summary and errors")
+    parser.add_argument("--preflight", action="store_true",
+                        help="Only scan headers: report unreadable files and a time/size estimate, then exit")
+
+    watch = parser.add_argument_group("watch-folder daemon")
+    watch.add_argument("--watch", action="store_true",
+                       help="Keep running and process files as they arrive in the --input folder")
+    watch.add_argument("--settle", type=float, default=2.0,
+                       help="Seconds a file must stay unchanged before it is processed")
+    watch.add_argument("--poll-interval", type=float, default=2.0,
+                       help="Scan interval when polling instead of using inotify")
+    watch.add_argument("--stats-interval", type=float, default=30.0,
+                       help="Seconds between throughput/backlog reports (0 disables)")
+    watch.add_argument("--polling", action="store_true",
+                       help="Force os.scandir polling even where inotify is available")
+    return parser
+
+
+def run_watch(args, max_dimension):
+    """--watch: hand the folder over to the watch daemon until Ctrl+C"""
+    from watch_folder import WatchDaemon
+
+    if len(args.input) != 1 or not os.path.isdir(args.input[0]):
+        print("--watch needs exactly one --input folder", file=sys.stderr)
+        return 2
+    daemon = WatchDaemon(
+        args.input[0], args.output, args.mode, max_dimension, args.profile,
+        jobs=args.jobs, settle_seconds=args.settle, poll_interval=args.poll_interval,
+        stats_interval=args.stats_interval, use_inotify=not args.polling,
+    )
+    stats = daemon.run()
+    return 1 if stats["failed"] else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+    max_dimension = int(args.max_dimension) if args.max_dimension else None
+    if args.watch:
+        return run_watch(args, max_dimension)
+
+    paths = collect_inputs(args.input, args.recursive)
+    if not paths:
+        print("No supported files found.", file=sys.stderr)
+        return 2
+    if args.preflight:
+        from preflight import format_report, scan
+        report = scan(paths, args.jobs, max_dimension, args.profile)
+        print(format_report(report))
+        return 1 if report["problems"] else 0
+    os.makedirs(args.output, exist_ok=True)
+
+    def on_result(result):
+        name = os.path.basename(result["path"])
+        if result["error"]:
+            print(f"  ✗ {name}: {result['error']}", file=sys.stderr)
+        elif not args.quiet:
+            if result["skipped"]:
+                print(f"  = {name} unchanged, skipped")
+            else:
+                print(f"  ✓ {name} → {os.path.basename(result['output'])}")
+
+    journal = None
+    if not args.force:
+        from batch_journal import BatchJournal
+        journal = BatchJournal(args.output, batch_settings(args.mode, max_dimension, args.profile))
+    try:
+        results = run_batch(paths, args.output, args.mode, max_dimension, args.profile,
+                            jobs=args.jobs, on_result=on_result, journal=journal)
+    except KeyboardInterrupt:
+        print("\n⏹ Interrupted - completed files are journalled, re-run to resume", file=sys.stderr)
+        return 130
+    finally:
+        if journal is not None:
+            journal.close()
+
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for r in results if r["error"])
+    skipped = sum(1 for r in results if r["skipped"])
+    done = len(results) - failed - skipped
+    print(f"✓ {done} processed, {skipped} skipped, {failed} failed "
+          f"in {elapsed:.1f}s ({(done + failed) / elapsed if elapsed > 0 else 0:.1f} files/s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,610 @@
+#!/usr/bin/env python3
+"""
+Metadata Cloner core pipeline - no tkinter
+Ray-Ban Meta EXIF generation, JPEG/convert/video processing and the parallel
+batch runner shared by the desktop app. Everything here is importable by
+worker processes without starting a GUI.
+"""
+
+import os
+import random
+import struct
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from exif_template import ExifTemplate
+from fast_copy import copy_file
+from jpeg_segments import read_header_segments, rewrite_jpeg_exif
+from quicktime_patch import patch_video_metadata
+
+# Pillow and pillow-heif are imported on first use by load_pil(), so
+# JPEG-only and video-only runs start without loading any image codecs
+Image = None
+HAS_HEIF = False
+_PIL_MISSING = False
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.heic', '.heif',
+                    '.webp', '.bmp', '.gif', '.tiff', '.tif')
+VIDEO_EXTENSIONS = ('.mov', '.mp4')
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+# Longest-side choices for the output size menu ("Original" keeps full resolution)
+OUTPUT_SIZE_CHOICES = ("Original", "4032", "3024", "2048", "1080")
+
+# JPEG encoder settings for converted photos. EXIF is passed to the encoder
+# directly, so every converted image is written exactly once.
+# Encode time / size for samples/IMG_1173.HEIC (3024x4032), `python benchmarks.py encoders`
+ENCODER_PROFILES = {
+    "standard": {"quality": 95},                                      #  53 ms, 3.7 MB (4:2:0)
+    "fast": {"quality": 90, "subsampling": 2},                        #  45 ms, 2.3 MB
+    "compact": {"quality": 90, "subsampling": 2, "optimize": True, "progressive": True},  # 278 ms, 2.2 MB
+    "max": {"quality": 95, "subsampling": 0, "optimize": True},       # 284 ms, 3.8 MB (4:4:4)
+}
+
+# Per-file EXIF fields; everything else in the block is fixed for a given mode
+EXIF_PATCH_FIELDS = {
+    "datetime": [("0th", 306), ("Exif", 36867), ("Exif", 36868)],
+    "exposure_time": [("Exif", 33434)],
+    "f_number": [("Exif", 33437)],
+    "iso": [("Exif", 34855)],
+    "user_comment": [("Exif", 37510)],
+    "subsec": [("Exif", 37520)],
+    "subsec_original": [("Exif", 37521)],
+    "subsec_digitized": [("Exif", 37522)],
+    "width": [("Exif", 40962)],
+    "height": [("Exif", 40963)],
+    "body_serial": [("Exif", 42033)],
+}
+
+# Compiled EXIF blocks, one per metadata mode
+_EXIF_TEMPLATES = {}
+
+
+def classify(path):
+    """Return 'jpeg', 'convert', 'video' or None for unsupported files"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in JPEG_EXTENSIONS:
+        return "jpeg"
+    if ext in IMAGE_EXTENSIONS:
+        return "convert"
+    if ext in VIDEO_EXTENSIONS:
+        return "video"
+    return None
+
+
+def load_pil():
+    """Import Pillow (and register the HEIC opener) the first time an image needs decoding
+
+    Returns:
+        module: PIL.Image, or None if Pillow is not installed
+    """
+    global Image, HAS_HEIF, _PIL_MISSING
+    if Image is not None or _PIL_MISSING:
+        return Image
+
+    # Try to import PIL for format conversion
+    try:
+        from PIL import Image as pil_image
+    except ImportError:
+        _PIL_MISSING = True
+        print("WARNING: Pillow not installed. Only JPEG images supported.")
+        print("Install with: pip3 install Pillow")
+        return None
+
+    # Try to import pillow-heif for HEIC support
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+        HAS_HEIF = True
+    except ImportError:
+        HAS_HEIF = False
+
+    Image = pil_image
+    return Image
+
+
+# ============ EXIF GENERATION ============
+
+def generate_random_datetime():
+    """Generate a random datetime within the last 30 days"""
+    now = datetime.now()
+    random_days = random.randint(0, 30)
+    random_hours = random.randint(0, 23)
+    random_minutes = random.randint(0, 59)
+    random_seconds = random.randint(0, 59)
+
+    random_date = now - timedelta(days=random_days, hours=random_hours,
+                                   minutes=random_minutes, seconds=random_seconds)
+    return random_date.strftime("%Y:%m:%d %H:%M:%S")
+
+
+def deg_to_dms_rational(deg):
+    """Convert decimal degrees to DMS rational format for GPS"""
+    d = int(deg)
+    m = int((deg - d) * 60)
+    s = int(((deg - d) * 60 - m) * 60 * 100)
+    return ((d, 1), (m, 1), (s, 100))
+
+
+def generate_uuid():
+    """Generate a UUID in the format used by Ray-Ban Meta"""
+    return str(uuid.uuid4()).upper()
+
+
+def model_name_for(mode):
+    """Device model string for the selected A/B test mode"""
+    return "Ray-Ban Meta Smart Glasses 2" if mode == "authentic" else "Ray-Ban Meta Smart Glasses"
+
+
+def random_exif_values(width=3024, height=4032):
+    """Generate the per-file EXIF values - keys match EXIF_PATCH_FIELDS"""
+    # Camera settings
+    exposure_times = [(1, 100), (1, 120), (1, 150), (1, 200), (1, 250), (1, 4000)]
+    f_numbers = [(11, 5), (7, 5)]  # f/2.2 or f/1.4
+    iso_values = [100, 125, 150, 200, 397, 400, 500]
+
+    # Serial numbers
+    body_serials = ["2Q", "4V", "3X", "5R", "6T"]
+
+    return {
+        "datetime": generate_random_datetime(),
+        "exposure_time": random.choice(exposure_times),
+        "f_number": random.choice(f_numbers),
+        "iso": random.choice(iso_values),
+        "user_comment": f"ASCII   {generate_uuid()}".encode('utf-8'),
+        "subsec": str(random.randint(100, 999)),
+        "subsec_original": str(random.randint(100, 999)),
+        "subsec_digitized": str(random.randint(100, 999)),
+        "width": width,
+        "height": height,
+        "body_serial": random.choice(body_serials),
+    }
+
+
+def create_rayban_exif(mode, width=3024, height=4032):
+    """Create Ray-Ban Meta EXIF data based on selected A/B test mode"""
+
+    # Generate random but realistic values
+    values = random_exif_values(width, height)
+    model_name = model_name_for(mode)
+
+    # Mode-specific values
+    if mode == "authentic":
+        # Authentic 2024/2025 format (Ray-Ban Meta Smart Glasses 2)
+        exif_version = b"0220"
+        focal_length = (56, 25)  # From authentic sample
+        focal_35mm = 13
+        scene_capture = 0  # Standard
+    else:
+        # Metaspoof format (WORKING format - match exactly!)
+        exif_version = b"0231"
+        focal_length = (35, 1)
+        focal_35mm = 35
+        scene_capture = 1  # Portrait - THIS IS KEY!
+
+    # Build EXIF dictionary based on selected mode
+    exif_dict = {
+        "0th": {
+            271: "Meta AI",          # Make - same for both modes
+            272: model_name,         # Model - changes based on mode
+            274: 1,                  # Orientation
+            282: (72, 1),            # XResolution
+            283: (72, 1),            # YResolution
+            296: 2,                  # ResolutionUnit
+            306: values["datetime"],  # DateTime
+        },
+        "Exif": {
+            33434: values["exposure_time"],  # ExposureTime
+            33437: values["f_number"],       # FNumber
+            34850: 1,                # ExposureProgram
+            34855: values["iso"],            # ISOSpeedRatings
+            36864: exif_version,     # ExifVersion - mode specific
+            36867: values["datetime"],  # DateTimeOriginal
+            36868: values["datetime"],  # DateTimeDigitized
+            37377: (26773, 3361),    # ShutterSpeedValue
+            37378: (25249, 26007),   # ApertureValue
+            37380: (0, 1),           # ExposureBiasValue
+            37381: (227, 100),       # MaxApertureValue
+            37383: 5,                # MeteringMode (Pattern)
+            37385: 0,                # Flash (no flash)
+            37386: focal_length,     # FocalLength - mode specific
+            37510: values["user_comment"],  # UserComment
+            37520: values["subsec"],            # SubSecTime
+            37521: values["subsec_original"],   # SubSecTimeOriginal
+            37522: values["subsec_digitized"],  # SubSecTimeDigitized
+            40960: b"0100",          # FlashpixVersion
+            40961: 1,                # ColorSpace (sRGB)
+            40962: values["width"],  # PixelXDimension
+            40963: values["height"],  # PixelYDimension
+            41495: 2,                # SensingMethod
+            41986: 0,                # ExposureMode (Auto)
+            41987: 0,                # WhiteBalance (Auto)
+            41989: focal_35mm,       # FocalLengthIn35mmFilm - mode specific
+            41990: scene_capture,    # SceneCaptureType - Portrait for Metaspoof!
+            42033: values["body_serial"],  # BodySerialNumber
+        },
+        "GPS": {},
+        "1st": {},
+        "thumbnail": None
+    }
+
+    return exif_dict
+
+
+def create_rayban_exif_bytes(mode, width=3024, height=4032):
+    """Serialized EXIF for one file, patched into the precompiled block for the mode"""
+    template = _EXIF_TEMPLATES.get(mode)
+    if template is None:
+        print(f"[{mode.upper()}] Using model: {model_name_for(mode)}")
+        template = _EXIF_TEMPLATES[mode] = ExifTemplate(create_rayban_exif(mode), EXIF_PATCH_FIELDS)
+    return template.render(random_exif_values(width, height))
+
+
+# ============ IMAGE PROCESSING ============
+
+def prepare_scaled_decode(img, max_dimension):
+    """Ask the decoder for a smaller image before load() when the source is oversized.
+
+    For JPEG, draft() makes libjpeg decode at 1/2, 1/4 or 1/8 scale directly,
+    choosing the smallest scale that still covers max_dimension.
+    """
+    if not max_dimension or max(img.size) <= max_dimension:
+        return
+    if img.format == 'JPEG':
+        scale = max(img.size) / max_dimension
+        img.draft('RGB', (int(img.size[0] / scale), int(img.size[1] / scale)))
+
+
+def reduce_to_fit(img, max_dimension):
+    """Shrink a loaded image so its longest side is at most max_dimension.
+
+    reduce() does the bulk of the work with a cheap integer box filter; a
+    final resize only covers the remainder. Returns img when nothing changed.
+    """
+    if not max_dimension or max(img.size) <= max_dimension:
+        return img
+    factor = max(img.size) // max_dimension
+    result = img.reduce(factor) if factor >= 2 else img
+    if max(result.size) > max_dimension:
+        scale = max_dimension / max(result.size)
+        size = (max(1, round(result.size[0] * scale)), max(1, round(result.size[1] * scale)))
+        resized = result.resize(size, Image.LANCZOS)
+        if result is not img:
+            result.close()
+        result = resized
+    return result
+
+
+def convert_to_jpeg_with_exif(input_path, output_folder, mode, max_dimension=None, encoder_profile="standard"):
+    """Convert any image format to JPEG with EXIF metadata
+
+    With max_dimension set, oversized sources are decoded at reduced scale
+    and the EXIF pixel dimensions describe the image actually written.
+    The EXIF block goes straight into the encoder, so the file is written once.
+    """
+    if load_pil() is None:
+        raise ValueError("Pillow not installed - cannot convert image formats")
+
+    # Generate output path in "Ready to Send" folder
+    basename = os.path.splitext(os.path.basename(input_path))[0]
+    output_path = os.path.join(output_folder, f"RayBan_{basename}.jpg")
+
+    with Image.open(input_path) as img:
+        prepare_scaled_decode(img, max_dimension)
+        img.load()
+        scaled = reduce_to_fit(img, max_dimension)
+
+        # Convert to RGB if necessary (for PNG with transparency, etc.)
+        if scaled.mode in ('RGBA', 'LA', 'P'):
+            # Create white background for transparent images
+            rgb = Image.new('RGB', scaled.size, (255, 255, 255))
+            source = scaled.convert('RGBA') if scaled.mode == 'P' else scaled
+            rgb.paste(source, mask=source.split()[-1] if source.mode == 'RGBA' else None)
+            if source is not scaled:
+                source.close()
+        elif scaled.mode != 'RGB':
+            rgb = scaled.convert('RGB')
+        else:
+            rgb = scaled
+
+        try:
+            exif_bytes = create_rayban_exif_bytes(mode, *rgb.size)
+            rgb.save(output_path, 'JPEG', exif=exif_bytes, **ENCODER_PROFILES[encoder_profile])
+        finally:
+            if rgb is not scaled:
+                rgb.close()
+            if scaled is not img:
+                scaled.close()
+
+    return output_path
+
+
+def process_jpeg(input_path, output_folder, mode, max_dimension=None, encoder_profile="standard"):
+    """Native JPEG: swap the EXIF segment in one streaming pass
+
+    Returns (output_path, converted) - oversized JPEGs in max-dimension mode
+    go through the conversion path instead and report converted=True.
+    """
+    # Header-only check: does the JPEG have to be downscaled? (SOF read, no codec)
+    if max_dimension:
+        with open(input_path, 'rb') as f:
+            _, size = read_header_segments(f)
+        if size and max(size) > max_dimension:
+            return convert_to_jpeg_with_exif(input_path, output_folder, mode,
+                                             max_dimension, encoder_profile), True
+
+    # One streaming pass: read source once, swap the EXIF segment,
+    # copy the image data straight through
+    output_path = os.path.join(output_folder, f"RayBan_{os.path.basename(input_path)}")
+    rewrite_jpeg_exif(
+        input_path, output_path,
+        lambda width, height: create_rayban_exif_bytes(mode, width, height)
+    )
+    return output_path, False
+
+
+# ============ VIDEO PROCESSING ============
+
+def process_video(input_path, output_folder, mode):
+    """Inject QuickTime metadata into video file - converts to MOV for iOS compatibility"""
+    basename = os.path.basename(input_path)
+    name_without_ext = os.path.splitext(basename)[0]
+    ext = os.path.splitext(basename)[1]  # Keep original extension
+
+    # Get mode-specific values
+    model_name = model_name_for(mode)
+
+    unique_uuid = generate_uuid()
+    comment = f"app=Meta AI&device={model_name}&id={unique_uuid}"
+    creation_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    print(f"[{mode.upper()} VIDEO] Model: {model_name}")
+
+    # Copy video without re-encoding (avoids ffmpeg fingerprints that Instagram detects).
+    # Reflink/in-kernel copy where possible - no multi-GB trip through user space
+    output_path = os.path.join(output_folder, f"RayBan_{name_without_ext}{ext}")
+    method = copy_file(input_path, output_path)
+    print(f"  [copy] Video copied via {method} (no re-encoding - cleaner for Instagram)")
+
+    # Format date for QuickTime (YYYY:MM:DD HH:MM:SS)
+    now = datetime.now()
+    qt_date = now.strftime("%Y:%m:%d %H:%M:%S")
+
+    # Step 2a: Rewrite just the moov atom in place - same tags exiftool writes below
+    try:
+        keys_items = {
+            'com.apple.quicktime.model': model_name,
+            'com.apple.quicktime.copyright': 'Meta AI',
+            'com.apple.quicktime.comment': comment,
+            'com.apple.quicktime.description': '4V',
+            'com.apple.quicktime.creationdate': creation_date,
+        }
+        if patch_video_metadata(output_path, keys_items, now.replace(microsecond=0)):
+            print(f"  ✓ QuickTime metadata injected (moov patched in place)")
+            return output_path
+        print(f"  [moov] Can't patch moov in place (no room, or non-Keys meta) - using exiftool")
+    except (OSError, ValueError, struct.error) as e:
+        print(f"  ⚠ moov patch failed ({e}) - using exiftool")
+
+    # Check for exiftool
+    exiftool_path = None
+    for path in ['/opt/homebrew/bin/exiftool', '/usr/local/bin/exiftool']:
+        if os.path.exists(path):
+            exiftool_path = path
+            break
+
+    # Step 2b: Add QuickTime metadata with exiftool (rewrites the whole file)
+    if exiftool_path:
+        try:
+            cmd = [
+                exiftool_path, '-overwrite_original',
+                # Keys metadata (what Instagram reads)
+                f'-Keys:Model={model_name}',
+                f'-Keys:Copyright=Meta AI',
+                f'-Keys:Comment={comment}',
+                f'-Keys:Description=4V',
+                f'-Keys:CreationDate={creation_date}',
+                # QuickTime header dates (to look authentic)
+                f'-QuickTime:CreateDate={qt_date}',
+                f'-QuickTime:ModifyDate={qt_date}',
+                f'-QuickTime:TrackCreateDate={qt_date}',
+                f'-QuickTime:TrackModifyDate={qt_date}',
+                f'-QuickTime:MediaCreateDate={qt_date}',
+                f'-QuickTime:MediaModifyDate={qt_date}',
+                output_path
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode == 0:
+                print(f"  ✓ QuickTime metadata injected")
+                return output_path
+            else:
+                print(f"  ⚠ exiftool error: {result.stderr[:100] if result.stderr else result.stdout[:100]}")
+        except Exception as e:
+            print(f"  ⚠ exiftool exception: {e}")
+
+    print(f"  ✓ Video saved (metadata may be limited)")
+    return output_path
+
+
+# ============ BATCH PROCESSING ============
+
+def process_file(input_path, output_folder, mode, max_dimension=None, encoder_profile="standard"):
+    """
+    Process one file of any supported type
+
+    Returns:
+        dict: path, kind ('photo' or 'video'), output, converted, skipped, error.
+        Failures are reported in 'error' rather than raised, so results can
+        cross process boundaries cleanly.
+    """
+    kind = classify(input_path)
+    result = {"path": input_path, "kind": "video" if kind == "video" else "photo",
+              "output": None, "converted": False, "skipped": False, "error": None}
+    try:
+        if not os.path.exists(input_path):
+            result["error"] = "File not found"
+        elif kind == "jpeg":
+            result["output"], result["converted"] = process_jpeg(
+                input_path, output_folder, mode, max_dimension, encoder_profile)
+        elif kind == "convert":
+            if load_pil() is None:
+                result["error"] = "Install Pillow: pip3 install Pillow"
+            else:
+                result["output"] = convert_to_jpeg_with_exif(
+                    input_path, output_folder, mode, max_dimension, encoder_profile)
+                result["converted"] = True
+        elif kind == "video":
+            result["output"] = process_video(input_path, output_folder, mode)
+        else:
+            result["error"] = "Unsupported file type"
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def batch_settings(mode, max_dimension=None, encoder_profile="standard"):
+    """Journal settings key - a file is redone when any of these change"""
+    return f"{mode}|{max_dimension or 'original'}|{encoder_profile}"
+
+
+def run_batch(paths, output_folder, mode, max_dimension=None, encoder_profile="standard",
+              jobs=None, on_result=None, cancel_event=None, journal=None):
+    """
+    Process many files in parallel
+
+    Conversions (HEIC/PNG/... decode + encode) are CPU-bound and go to a
+    process pool; native JPEG rewrites and video copies are I/O-bound and go
+    to a thread pool. on_result(result) is called from the calling thread as
+    each file finishes, in completion order.
+
+    Args:
+        cancel_event: threading.Event - when set, files not yet started are
+            skipped and the function returns early
+        journal: Optional BatchJournal - files it already has (unchanged, same
+            settings) are reported with skipped=True instead of being
+            processed, and each success is recorded as soon as it finishes
+
+    Returns:
+        list: result dicts (see process_file) for every file that ran
+    """
+    from collections import deque
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    jobs = jobs or os.cpu_count() or 1
+    cancel_event = cancel_event or threading.Event()
+
+    results = []
+    if journal is not None:
+        pending = []
+        for path in paths:
+            previous = journal.lookup(path)
+            if previous is None:
+                pending.append(path)
+                continue
+            result = {"path": path, "kind": "video" if classify(path) == "video" else "photo",
+                      "output": previous, "converted": False, "skipped": True, "error": None}
+            results.append(result)
+            if on_result:
+                on_result(result)
+        paths = pending
+
+    conversions = deque(p for p in paths if classify(p) == "convert")
+    others = [p for p in paths if classify(p) != "convert"]
+    thread_pool = ThreadPoolExecutor(max_workers=min(32, jobs * 2))
+    process_pool = ProcessPoolExecutor(max_workers=jobs) if conversions else None
+    # Conversions are fed to the pool 2 x jobs at a time, so a dead worker
+    # (OOM, decoder crash) only takes the files in flight down with it. Those
+    # become suspects: each is retried alone in a fresh pool, and only a file
+    # that crashes the pool again on its own is reported as failed.
+    suspects = deque()
+    args = (output_folder, mode, max_dimension, encoder_profile)
+    try:
+        # future -> (path, process pool it ran on or None, retried alone)
+        pending = {thread_pool.submit(process_file, path, *args): (path, None, False) for path in others}
+        while pending or conversions or suspects:
+            in_pool = sum(1 for _, pool, _ in pending.values() if pool is not None)
+            if suspects:
+                if not in_pool:
+                    path = suspects.popleft()
+                    pending[process_pool.submit(process_file, path, *args)] = (path, process_pool, True)
+            else:
+                while conversions and in_pool < jobs * 2:
+                    path = conversions.popleft()
+                    pending[process_pool.submit(process_file, path, *args)] = (path, process_pool, False)
+                    in_pool += 1
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if cancel_event.is_set():
+                    break
+                path, pool, alone = pending.pop(future)
+                if future.cancelled():
+                    conversions.appendleft(path)
+                    continue
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    if pool is process_pool:  # not replaced yet by an earlier result
+                        process_pool.shutdown(wait=False, cancel_futures=True)
+                        process_pool = ProcessPoolExecutor(max_workers=jobs)
+                    if not alone:
+                        suspects.append(path)
+                        continue
+                    result = {"path": path, "kind": "photo", "output": None, "converted": False,
+                              "skipped": False, "error": "Worker process crashed"}
+                except Exception as e:
+                    result = {"path": path, "kind": "video" if classify(path) == "video" else "photo",
+                              "output": None, "converted": False, "skipped": False, "error": str(e)}
+                if journal is not None and not result["error"]:
+                    journal.record(result["path"], result["output"])
+                results.append(result)
+                if on_result:
+                    on_result(result)
+            if cancel_event.is_set():
+                break
+    finally:
+        cancelled = cancel_event.is_set()
+        thread_pool.shutdown(wait=True, cancel_futures=cancelled)
+        if process_pool:
+            process_pool.shutdown(wait=True, cancel_futures=cancelled)
+    return results
+
+
+class BatchProgress:
+    """
+    Running throughput and ETA for a batch
+
+    Files skipped by the journal count towards done but not towards the
+    rate - they finish instantly, so a resumed batch would otherwise show
+    an inflated files/s and too short an ETA.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+
+    def update(self, count=1, skipped=False):
+        self.done += count
+        if skipped:
+            self.skipped += count
+
+    @property
+    def files_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return (self.done - self.skipped) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self):
+        rate = self.files_per_second
+        return (self.total - self.done) / rate if rate > 0 else None
+
+    def describe(self):
+        eta = self.eta_seconds
+        eta_text = f"{int(eta // 60)}:{int(eta % 60):02d}" if eta is not None else "--:--"
+        return f"{self.done}/{self.total} · {self.files_per_second:.1f} files/s · ETA {eta_text}"
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Header-only EXIF reader
+Walks the JPEG marker segments with seeks, reads only the EXIF APP1 payload
+and the frame size from SOF, and stops at SOS (or sooner) - a few KB of I/O
+per photo however large the image is. For HEIC/HEIF the ISOBMFF 'meta' box
+is parsed instead (iinf/iloc/iref) and only the Exif item's bytes are read;
+the size comes from the primary item's 'ispe'. No pixels are decoded.
+IFDs are parsed when first accessed and tag values decoded when first read.
+
+    exif = read_exif("photo.jpg")   # or "IMG_1173.HEIC"
+    exif.get(272)                    # Model, from 0th IFD
+    exif.get(36867, "Exif")          # DateTimeOriginal
+    exif["Model"], exif.size         # by name; (width, height) from SOF
+    exif.to_dict()                   # {"0th": {...}, "Exif": {...}, "GPS": {...}, ...} like piexif.load
+"""
+
+import os
+import struct
+
+from quicktime_patch import iter_atoms, top_level_atoms
+
+SOI = b"\xff\xd8"
+SOS = 0xDA
+APP1 = 0xE1
+EXIF_HEADER = b"Exif\x00\x00"
+
+# Markers without a length field
+STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))
+
+# Start-of-frame markers (all coding processes) - they hold the image size
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+               0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+HEIF_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1', b'avif'}
+
+# TIFF field type -> (struct code, size in bytes)
+FIELD_TYPES = {
+    1: ('B', 1),   # BYTE
+    2: ('s', 1),   # ASCII
+    3: ('H', 2),   # SHORT
+    4: ('I', 4),   # LONG
+    5: ('II', 8),  # RATIONAL
+    6: ('b', 1),   # SBYTE
+    7: ('s', 1),   # UNDEFINED
+    8: ('h', 2),   # SSHORT
+    9: ('i', 4),   # SLONG
+    10: ('ii', 8),  # SRATIONAL
+    11: ('f', 4),  # FLOAT
+    12: ('d', 8),  # DOUBLE
+}
+
+# Sub-IFD pointer tags
+EXIF_POINTER = 0x8769
+GPS_POINTER = 0x8825
+INTEROP_POINTER = 0xA005
+
+# IFD name -> tag name -> tag id, for the fields the tools look at
+TAG_IDS = {
+    "0th": {"ImageDescription": 270, "Make": 271, "Model": 272, "Orientation": 274,
+            "XResolution": 282, "YResolution": 283, "ResolutionUnit": 296, "Software": 305,
+            "DateTime": 306, "Artist": 315, "HostComputer": 316, "Copyright": 33432,
+            "ExifTag": EXIF_POINTER, "GPSTag": GPS_POINTER},
+    "Exif": {"ExposureTime": 33434, "FNumber": 33437, "ExposureProgram": 34850,
+             "ISOSpeedRatings": 34855, "ExifVersion": 36864, "DateTimeOriginal": 36867,
+             "DateTimeDigitized": 36868, "OffsetTime": 36880, "OffsetTimeOriginal": 36881,
+             "ShutterSpeedValue": 37377, "ApertureValue": 37378, "BrightnessValue": 37379,
+             "ExposureBiasValue": 37380, "MeteringMode": 37383, "Flash": 37385,
+             "FocalLength": 37386, "MakerNote": 37500, "UserComment": 37510,
+             "SubSecTimeOriginal": 37521, "ColorSpace": 40961, "PixelXDimension": 40962,
+             "PixelYDimension": 40963, "WhiteBalance": 41987, "FocalLengthIn35mmFilm": 41989,
+             "ImageUniqueID": 42016, "BodySerialNumber": 42033, "LensMake": 42035,
+             "LensModel": 42036, "InteroperabilityTag": INTEROP_POINTER},
+    "GPS": {"GPSVersionID": 0, "GPSLatitudeRef": 1, "GPSLatitude": 2, "GPSLongitudeRef": 3,
+            "GPSLongitude": 4, "GPSAltitudeRef": 5, "GPSAltitude": 6, "GPSTimeStamp": 7,
+            "GPSDateStamp": 29},
+}
+
+# Reverse lookup: (ifd, tag id) -> name
+TAG_NAMES = {(ifd, tag): name for ifd, tags in TAG_IDS.items() for name, tag in tags.items()}
+
+
+def tag_name(ifd, tag):
+    """Readable name of a tag, or its number as a string"""
+    return TAG_NAMES.get((ifd, tag), str(tag))
+
+
+class IFD:
+    """
+    One TIFF image file directory
+
+    The entry table (12 bytes per tag) is indexed on construction; values
+    are decoded and cached the first time they are read.
+    """
+
+    def __init__(self, tiff, offset, endian):
+        self._tiff = tiff
+        self._endian = endian
+        self._values = {}
+        self.entries = {}
+        self.next_offset = 0
+        if offset <= 0 or offset + 2 > len(tiff):
+            return
+        (count,) = struct.unpack_from(endian + 'H', tiff, offset)
+        end = offset + 2 + count * 12
+        if end > len(tiff):
+            raise ValueError(f"IFD at {offset} runs past the end of the EXIF block")
+        for pos in range(offset + 2, end, 12):
+            tag, field_type, value_count = struct.unpack_from(endian + 'HHI', tiff, pos)
+            self.entries[tag] = (field_type, value_count, pos + 8)
+        if end + 4 <= len(tiff):
+            (self.next_offset,) = struct.unpack_from(endian + 'I', tiff, end)
+
+    def __contains__(self, tag):
+        return tag in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, tag, default=None):
+        if tag not in self.entries:
+            return default
+        if tag not in self._values:
+            self._values[tag] = self._decode(*self.entries[tag])
+        return self._values[tag]
+
+    def __getitem__(self, tag):
+        if tag not in self.entries:
+            raise KeyError(tag)
+        return self.get(tag)
+
+    def items(self):
+        return [(tag, self.get(tag)) for tag in self.entries]
+
+    def _decode(self, field_type, count, value_pos):
+        if field_type not in FIELD_TYPES:
+            return None
+        code, size = FIELD_TYPES[field_type]
+        total = size * count
+        if total > 4:
+            (value_pos,) = struct.unpack_from(self._endian + 'I', self._tiff, value_pos)
+        if value_pos + total > len(self._tiff):
+            return None  # offset outside the EXIF block
+        raw = self._tiff[value_pos:value_pos + total]
+        if field_type == 2:
+            return raw.split(b'\x00', 1)[0].decode('utf-8', errors='replace')
+        if field_type == 7:
+            return bytes(raw)
+        values = struct.unpack(self._endian + code * count, raw)
+        if field_type in (5, 10):
+            values = tuple(zip(values[0::2], values[1::2]))  # (numerator, denominator), as piexif
+        return values[0] if count == 1 else values
+
+
+class ExifData:
+    """
+    Parsed view of one EXIF (TIFF) block
+
+    IFD names follow piexif: "0th", "Exif", "GPS", "Interop", "1st".
+    """
+
+    def __init__(self, tiff=b"", size=None):
+        if tiff.startswith(EXIF_HEADER):
+            tiff = tiff[len(EXIF_HEADER):]
+        self.tiff = tiff
+        self.size = size  # (width, height) from SOF / ispe, when known
+        self._ifds = {}
+        self.endian = None
+        if tiff:
+            if tiff[:4] == b"II*\x00":
+                self.endian = '<'
+            elif tiff[:4] == b"MM\x00*":
+                self.endian = '>'
+            else:
+                raise ValueError("EXIF block has no TIFF header")
+
+    def __bool__(self):
+        return self.endian is not None
+
+    def ifd(self, name):
+        """IFD by name, parsed on first use (empty when absent)"""
+        if name not in self._ifds:
+            offset = 0
+            if self.endian is not None:
+                if name == "0th":
+                    (offset,) = struct.unpack_from(self.endian + 'I', self.tiff, 4)
+                elif name == "1st":
+                    offset = self.ifd("0th").next_offset
+                elif name == "Exif":
+                    offset = self.ifd("0th").get(EXIF_POINTER, 0)
+                elif name == "GPS":
+                    offset = self.ifd("0th").get(GPS_POINTER, 0)
+                elif name == "Interop":
+                    offset = self.ifd("Exif").get(INTEROP_POINTER, 0)
+            self._ifds[name] = IFD(self.tiff, offset if isinstance(offset, int) else 0, self.endian or '>')
+        return self._ifds[name]
+
+    def get(self, tag, ifd="0th", default=None):
+        """Value of a numeric tag, e.g. get(36867, "Exif")"""
+        return self.ifd(ifd).get(tag, default)
+
+    def __getitem__(self, name):
+        """Value by tag name, searching 0th, Exif and GPS ("Model", "DateTimeOriginal")"""
+        for ifd, tags in TAG_IDS.items():
+            if name in tags:
+                return self.get(tags[name], ifd)
+        raise KeyError(name)
+
+    def to_dict(self):
+        """Every IFD, fully decoded: {"0th": {tag: value}, "Exif": {...}, ...}"""
+        return {name: dict(self.ifd(name).items()) for name in ("0th", "Exif", "GPS", "Interop", "1st")
+                if len(self.ifd(name))}
+
+
+def _jpeg_exif(f):
+    """(EXIF APP1 payload or None, (width, height) or None) by walking the markers"""
+    if f.read(2) != SOI:
+        raise ValueError("Not a JPEG file (missing SOI marker)")
+    exif = None
+    size = None
+    while True:
+        header = f.read(2)
+        if len(header) < 2:
+            raise ValueError("Unexpected end of file before SOS marker")
+        if header[0] != 0xFF:
+            raise ValueError(f"Corrupt JPEG header: expected marker, got {header[:1]!r}")
+        marker = header[1]
+        while marker == 0xFF:  # fill bytes
+            byte = f.read(1)
+            if not byte:
+                raise ValueError("Unexpected end of file before SOS marker")
+            marker = byte[0]
+        if marker == SOS:
+            break
+        if marker in STANDALONE_MARKERS:
+            continue
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            raise ValueError("Truncated JPEG segment")
+        length = struct.unpack('>H', length_bytes)[0] - 2
+        if marker == APP1 and exif is None:
+            # Peek at the identifier so XMP and other APP1 data is skipped, not read
+            ident = f.read(len(EXIF_HEADER))
+            if ident != EXIF_HEADER:
+                f.seek(length - len(ident), 1)
+                continue
+            payload = f.read(length - len(ident))
+            if len(payload) < length - len(ident):
+                raise ValueError("Truncated JPEG segment")
+            exif = ident + payload
+        elif marker in SOF_MARKERS and size is None:
+            frame = f.read(5)
+            if len(frame) < 5:
+                raise ValueError("Truncated JPEG segment")
+            height, width = struct.unpack_from('>HH', frame, 1)
+            size = (width, height)
+            if exif is not None:
+                break  # EXIF always precedes the frame header - nothing left to find
+            f.seek(length - 5, 1)
+        else:
+            f.seek(length, 1)  # skip without reading (ICC profiles, thumbnails, ...)
+    return exif, size
+
+
+# ============ HEIF (ISOBMFF meta) ============
+
+def _uint(data, pos, size):
+    """Big-endian unsigned int of 0, 4 or 8 bytes (iloc field sizes)"""
+    return int.from_bytes(data[pos:pos + size], 'big'), pos + size
+
+
+def _parse_iinf(body):
+    """{item_id: item_type} from an iinf payload"""
+    version = body[0]
+    pos = 6 if version == 0 else 8
+    items = {}
+    for atom_type, offset, header_size, size in iter_atoms(body, pos):
+        if atom_type != b'infe':
+            continue
+        entry = offset + header_size
+        infe_version = body[entry]
+        if infe_version < 2:
+            continue  # v0/v1 entries have no item_type
+        if infe_version == 2:
+            item_id = struct.unpack_from('>H', body, entry + 4)[0]
+            type_pos = entry + 8
+        else:
+            item_id = struct.unpack_from('>I', body, entry + 4)[0]
+            type_pos = entry + 10
+        items[item_id] = body[type_pos:type_pos + 4]
+    return items
+
+
+def _parse_iloc(body):
+    """{item_id: (construction_method, [(offset, length), ...])} from an iloc payload"""
+    version = body[0]
+    offset_size, length_size = body[4] >> 4, body[4] & 0x0F
+    base_offset_size, index_size = body[5] >> 4, (body[5] & 0x0F if version in (1, 2) else 0)
+    if version < 2:
+        count, pos = struct.unpack_from('>H', body, 6)[0], 8
+    else:
+        count, pos = struct.unpack_from('>I', body, 6)[0], 10
+    locations = {}
+    for _ in range(count):
+        item_id, pos = _uint(body, pos, 2 if version < 2 else 4)
+        method = 0
+        if version in (1, 2):
+            method, pos = _uint(body, pos, 2)
+            method &= 0x0F
+        pos += 2  # data_reference_index
+        base_offset, pos = _uint(body, pos, base_offset_size)
+        extent_count, pos = _uint(body, pos, 2)
+        extents = []
+        for _ in range(extent_count):
+            pos += index_size
+            extent_offset, pos = _uint(body, pos, offset_size)
+            extent_length, pos = _uint(body, pos, length_size)
+            extents.append((base_offset + extent_offset, extent_length))
+        locations[item_id] = (method, extents)
+    return locations
+
+
+def _parse_iref(body):
+    """[(reference_type, from_id, [to_ids])] from an iref payload"""
+    id_size = 2 if body[0] == 0 else 4
+    refs = []
+    for ref_type, offset, header_size, size in iter_atoms(body, 4):
+        pos = offset + header_size
+        from_id, pos = _uint(body, pos, id_size)
+        count, pos = _uint(body, pos, 2)
+        to_ids = []
+        for _ in range(count):
+            to_id, pos = _uint(body, pos, id_size)
+            to_ids.append(to_id)
+        refs.append((ref_type, from_id, to_ids))
+    return refs
+
+
+def _parse_iprp(body):
+    """(properties, {item_id: [1-based property indexes]}) from an iprp payload"""
+    properties = []
+    associations = {}
+    for atom_type, offset, header_size, size in iter_atoms(body):
+        start = offset + header_size
+        if atom_type == b'ipco':
+            properties = [(prop, body[p_offset + p_header:p_offset + p_size])
+                          for prop, p_offset, p_header, p_size in iter_atoms(body, start, offset + size)]
+        elif atom_type == b'ipma':
+            version, flags = body[start], int.from_bytes(body[start + 1:start + 4], 'big')
+            (count,) = struct.unpack_from('>I', body, start + 4)
+            pos = start + 8
+            for _ in range(count):
+                item_id, pos = _uint(body, pos, 2 if version < 1 else 4)
+                n, pos = _uint(body, pos, 1)
+                indexes = []
+                for _ in range(n):
+                    if flags & 1:
+                        value, pos = _uint(body, pos, 2)
+                        indexes.append(value & 0x7FFF)
+                    else:
+                        value, pos = _uint(body, pos, 1)
+                        indexes.append(value & 0x7F)
+                associations[item_id] = indexes
+    return properties, associations
+
+
+def _heif_exif(f, file_size):
+    """(Exif TIFF bytes or None, (width, height) or None) from a HEIF's meta box"""
+    atoms = top_level_atoms(f, file_size)
+    if not atoms or atoms[0][0] != b'ftyp':
+        raise ValueError("Not an ISO-BMFF file (no ftyp)")
+    f.seek(atoms[0][1] + 8)
+    if f.read(4) not in HEIF_BRANDS:
+        raise ValueError("ftyp brand is not HEIF/HEIC")
+    meta = next((a for a in atoms if a[0] == b'meta'), None)
+    if meta is None:
+        raise ValueError("No meta box - HEIF item information missing")
+    f.seek(meta[1])
+    data = f.read(meta[2])
+
+    primary = None
+    items, locations, refs, properties, associations = {}, {}, [], [], {}
+    idat_start = None
+    for atom_type, offset, header_size, size in iter_atoms(data, 12):  # meta is a full box
+        body = data[offset + header_size:offset + size]
+        if atom_type == b'pitm':
+            primary = _uint(body, 4, 2 if body[0] == 0 else 4)[0]
+        elif atom_type == b'iinf':
+            items = _parse_iinf(body)
+        elif atom_type == b'iloc':
+            locations = _parse_iloc(body)
+        elif atom_type == b'iref':
+            refs = _parse_iref(body)
+        elif atom_type == b'iprp':
+            properties, associations = _parse_iprp(body)
+        elif atom_type == b'idat':
+            idat_start = offset + header_size
+
+    # Size: the primary item's ispe, else the largest ispe (grid tiles are smaller)
+    size = None
+    sizes = [struct.unpack_from('>II', body, 4) for prop, body in properties if prop == b'ispe']
+    for index in associations.get(primary, []):
+        if 0 < index <= len(properties) and properties[index - 1][0] == b'ispe':
+            size = struct.unpack_from('>II', properties[index - 1][1], 4)
+    if size is None and sizes:
+        size = max(sizes, key=lambda wh: wh[0] * wh[1])
+
+    # Exif item: the one describing ('cdsc') the primary image, else the first
+    exif_ids = [item_id for item_id, item_type in items.items() if item_type == b'Exif']
+    described = [from_id for ref_type, from_id, to_ids in refs
+                 if ref_type == b'cdsc' and from_id in exif_ids and primary in to_ids]
+    exif_id = (described or exif_ids or [None])[0]
+    if exif_id is None or exif_id not in locations:
+        return None, size
+
+    method, extents = locations[exif_id]
+    chunks = []
+    for extent_offset, extent_length in extents:
+        if method == 1:  # stored in the meta box's idat
+            if idat_start is None:
+                raise ValueError("Exif item refers to a missing idat box")
+            chunks.append(data[idat_start + extent_offset:idat_start + extent_offset + extent_length])
+        elif method == 0:
+            f.seek(extent_offset)
+            chunks.append(f.read(extent_length or file_size - extent_offset))
+        else:
+            raise ValueError(f"Unsupported iloc construction method {method}")
+    item = b''.join(chunks)
+    # Exif item payload: 32-bit offset to the TIFF header, then e.g. "Exif\0\0" + TIFF
+    if len(item) < 4:
+        return None, size
+    (tiff_offset,) = struct.unpack_from('>I', item)
+    return item[4 + tiff_offset:], size
+
+
+def read_exif(path):
+    """
+    EXIF of a JPEG or HEIC/HEIF, reading only headers and the EXIF bytes
+
+    Returns:
+        ExifData: falsy when the file has no EXIF; .size is (width, height)
+        or None. Raises ValueError for files that aren't readable JPEGs or
+        HEIF images.
+    """
+    # Unbuffered: every read and seek is exactly what the parser asked for
+    with open(path, 'rb', buffering=0) as f:
+        head = f.read(8)
+        f.seek(0)
+        if head[4:8] == b'ftyp':
+            exif, size = _heif_exif(f, os.fstat(f.fileno()).st_size)
+        else:
+            exif, size = _jpeg_exif(f)
+    return ExifData(exif or b"", size)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Precompiled EXIF blocks
+piexif.dump is run once per layout; after that, per-file values are patched
+into a copy of the serialized bytes at known offsets instead of rebuilding
+and re-serializing every IFD for each photo.
+"""
+
+import struct
+
+import piexif
+
+EXIF_HEADER = b"Exif\x00\x00"
+TIFF_START = len(EXIF_HEADER)
+
+# TIFF field types we know how to patch, with their per-value size
+ASCII, SHORT, LONG, RATIONAL, UNDEFINED = 2, 3, 4, 5, 7
+TYPE_SIZES = {1: 1, ASCII: 1, SHORT: 2, LONG: 4, RATIONAL: 8, UNDEFINED: 1}
+
+# Where each IFD lives: the 0th IFD comes from the TIFF header, the others
+# are reached through pointer tags in the 0th IFD
+IFD_POINTERS = {"Exif": 34665, "GPS": 34853}
+
+
+def _walk_ifd(blob, ifd_offset):
+    """Yield (tag, type, count, value_offset) for each entry; offsets are into blob"""
+    base = TIFF_START + ifd_offset
+    (entry_count,) = struct.unpack_from('>H', blob, base)
+    for i in range(entry_count):
+        entry = base + 2 + i * 12
+        tag, field_type, count = struct.unpack_from('>HHL', blob, entry)
+        size = TYPE_SIZES.get(field_type, 1) * count
+        if size <= 4:
+            value_offset = entry + 8
+        else:
+            value_offset = TIFF_START + struct.unpack_from('>L', blob, entry + 8)[0]
+        yield tag, field_type, count, value_offset
+
+
+def locate_fields(blob):
+    """
+    Map every (ifd, tag) in a piexif.dump blob to (type, count, offset)
+
+    piexif always writes big-endian ("MM") TIFF data, which is all this
+    needs to handle.
+    """
+    if not blob.startswith(EXIF_HEADER) or blob[TIFF_START:TIFF_START + 2] != b"MM":
+        raise ValueError("Expected a big-endian EXIF block from piexif.dump")
+    (ifd0_offset,) = struct.unpack_from('>L', blob, TIFF_START + 4)
+
+    fields = {}
+    pointers = {}
+    for tag, field_type, count, value_offset in _walk_ifd(blob, ifd0_offset):
+        fields[("0th", tag)] = (field_type, count, value_offset)
+        for ifd_name, pointer_tag in IFD_POINTERS.items():
+            if tag == pointer_tag:
+                pointers[ifd_name] = struct.unpack_from('>L', blob, value_offset)[0]
+    for ifd_name, ifd_offset in pointers.items():
+        for tag, field_type, count, value_offset in _walk_ifd(blob, ifd_offset):
+            fields[(ifd_name, tag)] = (field_type, count, value_offset)
+    return fields
+
+
+def _pack(field_type, count, value):
+    """Serialize one value exactly as piexif would, refusing anything that changes the size"""
+    if field_type == ASCII:
+        data = (value.encode('ascii') if isinstance(value, str) else value) + b"\x00"
+    elif field_type == UNDEFINED:
+        data = value
+    elif field_type == SHORT:
+        data = struct.pack('>H', value)
+    elif field_type == LONG:
+        data = struct.pack('>L', value)
+    elif field_type == RATIONAL:
+        data = struct.pack('>LL', *value)
+    else:
+        raise ValueError(f"Cannot patch TIFF type {field_type}")
+    if len(data) != TYPE_SIZES[field_type] * count:
+        raise ValueError(f"Patched value {value!r} does not fit the compiled field "
+                         f"({count} x type {field_type})")
+    return data
+
+
+class ExifTemplate:
+    """
+    A serialized EXIF block plus the byte offsets of its per-file fields
+
+    Args:
+        exif_dict: piexif-style dict whose variable fields already hold values
+            of the final length (e.g. a 19-char datetime, a 36-char UUID)
+        patch_fields: {name: [(ifd, tag), ...]} - one name may fill several
+            tags, e.g. DateTime, DateTimeOriginal and DateTimeDigitized
+    """
+
+    def __init__(self, exif_dict, patch_fields):
+        self._blob = piexif.dump(exif_dict)
+        located = locate_fields(self._blob)
+        self._fields = {}
+        for name, tags in patch_fields.items():
+            try:
+                self._fields[name] = [located[ifd_tag] for ifd_tag in tags]
+            except KeyError as e:
+                raise ValueError(f"Field {name!r}: tag {e.args[0]} is not in the EXIF dict") from None
+
+    def render(self, values):
+        """Return a new EXIF block with the given {name: value} fields patched in"""
+        buf = bytearray(self._blob)
+        for name, value in values.items():
+            for field_type, count, offset in self._fields[name]:
+                data = _pack(field_type, count, value)
+                buf[offset:offset + len(data)] = data
+        return bytes(buf)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Fast file copies for large video outputs
+Tries the cheapest mechanism the OS and filesystem offer, in order:
+
+    1. reflink / clone - FICLONE on Linux (btrfs, XFS), clonefile() on macOS
+       (APFS). No data is copied at all; blocks are shared copy-on-write.
+    2. os.copy_file_range - in-kernel copy, may be offloaded by NFS/SMB servers
+    3. os.sendfile - in-kernel copy without user-space buffers
+    4. buffered copy with a 1 MB buffer
+
+Metadata (mode bits, timestamps) is copied afterwards, as with shutil.copy2.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import shutil
+import sys
+
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+
+BUFFER_SIZE = 1024 * 1024
+
+# Errors that mean "this filesystem can't do this" rather than a real I/O failure.
+# EXDEV isn't one: it only says this source and destination are on different
+# filesystems, so that copy moves on to the next mechanism without a memo.
+UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL,
+                      errno.ENOSYS, errno.EBADF, errno.EPERM}
+
+# Memo of (src_dev, dst_dev, mechanism) that failed with "not supported", so a
+# filesystem without reflinks isn't asked again for every file - other
+# device pairs still get to try
+_unsupported = set()
+
+
+def _clone_linux(src_fd, dst_fd, size):
+    import fcntl
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd, dst_fd, size):
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(src_fd, dst_fd, size - copied)
+        if n == 0:
+            break
+        copied += n
+    if copied != size:
+        raise OSError(f"copy_file_range stopped after {copied} of {size} bytes")
+
+
+def _sendfile(src_fd, dst_fd, size):
+    offset = 0
+    while offset < size:
+        n = os.sendfile(dst_fd, src_fd, offset, size - offset)
+        if n == 0:
+            break
+        offset += n
+    if offset != size:
+        raise OSError(f"sendfile stopped after {offset} of {size} bytes")
+
+
+def _clone_macos(src, dst):
+    """clonefile(2) - creates dst itself, so it runs before dst is opened"""
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+
+def _fd_methods():
+    methods = []
+    if sys.platform.startswith("linux"):
+        methods.append(("reflink", _clone_linux))
+    if hasattr(os, "copy_file_range"):
+        methods.append(("copy_file_range", _copy_file_range))
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        methods.append(("sendfile", _sendfile))
+    return methods
+
+
+def copy_file(src, dst):
+    """
+    Copy src to dst with the fastest available mechanism, then copy metadata
+
+    Returns:
+        str: The mechanism that did the copy - 'clonefile', 'reflink',
+        'copy_file_range', 'sendfile' or 'buffered'
+    """
+    devices = (os.stat(src).st_dev, os.stat(os.path.dirname(os.path.abspath(dst))).st_dev)
+    if sys.platform == "darwin" and devices + ("clonefile",) not in _unsupported:
+        if os.path.exists(dst):
+            os.remove(dst)  # clonefile refuses to overwrite
+        try:
+            _clone_macos(src, dst)
+            return "clonefile"
+        except AttributeError:
+            _unsupported.add(devices + ("clonefile",))
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                _unsupported.add(devices + ("clonefile",))
+
+    size = os.path.getsize(src)
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        used = None
+        for name, method in _fd_methods():
+            if devices + (name,) in _unsupported:
+                continue
+            try:
+                method(fsrc.fileno(), fdst.fileno(), size)
+                used = name
+                break
+            except OSError as e:
+                if e.errno in UNSUPPORTED_ERRNOS:
+                    _unsupported.add(devices + (name,))
+                elif e.errno != errno.EXDEV:
+                    raise
+                # Not available for this copy - start over with the next mechanism
+                fdst.seek(0)
+                fdst.truncate()
+        if used is None:
+            fsrc.seek(0)
+            shutil.copyfileobj(fsrc, fdst, BUFFER_SIZE)
+            used = "buffered"
+    shutil.copystat(src, dst)
+    return used
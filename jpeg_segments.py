@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Streaming JPEG marker rewriter
+Swaps the EXIF APP1 segment of a JPEG in a single read of the source and a
+single write of the destination - the entropy-coded image data after SOS is
+copied straight through without being parsed.
+"""
+
+import shutil
+import struct
+
+SOI = b"\xff\xd8"
+SOS = 0xDA
+APP0 = 0xE0
+APP1 = 0xE1
+EXIF_HEADER = b"Exif\x00\x00"
+
+# Markers that carry no length field
+STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))
+
+# Start-of-frame markers (all coding processes) - they hold the image size
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+               0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def read_header_segments(f):
+    """
+    Read the marker segments between SOI and SOS
+
+    Args:
+        f: Binary file object positioned at the start of the JPEG
+
+    Returns:
+        tuple: (segments, size) where segments is a list of (marker, raw_bytes)
+        with raw_bytes including the 0xFF marker prefix and length, and size is
+        (width, height) from the SOF segment or None. The file is left
+        positioned just after the SOS marker bytes.
+    """
+    if f.read(2) != SOI:
+        raise ValueError("Not a JPEG file (missing SOI marker)")
+
+    segments = []
+    size = None
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise ValueError("Unexpected end of file before SOS marker")
+        if byte != b"\xff":
+            raise ValueError(f"Corrupt JPEG header: expected marker, got {byte!r}")
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            raise ValueError("Unexpected end of file before SOS marker")
+        marker = marker[0]
+
+        if marker == SOS:
+            return segments, size
+        if marker in STANDALONE_MARKERS:
+            segments.append((marker, bytes((0xFF, marker))))
+            continue
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            raise ValueError("Truncated JPEG segment")
+        length = struct.unpack('>H', length_bytes)[0]
+        payload = f.read(length - 2)
+        if len(payload) < length - 2:
+            raise ValueError("Truncated JPEG segment")
+        if marker in SOF_MARKERS and size is None and len(payload) >= 5:
+            height, width = struct.unpack('>HH', payload[1:5])
+            size = (width, height)
+        segments.append((marker, bytes((0xFF, marker)) + length_bytes + payload))
+
+
+def is_exif_segment(marker, raw):
+    """True for APP1 segments that carry EXIF (XMP and other APP1 data is kept)"""
+    return marker == APP1 and raw[4:10] == EXIF_HEADER
+
+
+def build_app1(exif_bytes):
+    """Wrap an EXIF blob (as returned by piexif.dump) in an APP1 segment"""
+    if not exif_bytes.startswith(EXIF_HEADER):
+        exif_bytes = EXIF_HEADER + exif_bytes
+    if len(exif_bytes) + 2 > 0xFFFF:
+        raise ValueError("EXIF data too large for a single APP1 segment")
+    return b"\xff\xe1" + struct.pack('>H', len(exif_bytes) + 2) + exif_bytes
+
+
+def rewrite_jpeg_exif(src_path, dst_path, exif):
+    """
+    Copy a JPEG to dst_path with its EXIF replaced, reading the source once
+
+    Existing EXIF APP1 segments are dropped and the new one goes directly
+    after SOI, taking the place of a leading APP0 (JFIF) segment if there is
+    one - byte-for-byte the layout the previous copy2 + piexif.remove +
+    piexif.insert sequence produced.
+
+    Args:
+        src_path: Source JPEG
+        dst_path: Output path (must differ from src_path)
+        exif: EXIF bytes, or a callable taking (width, height) from the SOF
+            segment and returning EXIF bytes - lets the caller fill in real
+            pixel dimensions without a second read
+
+    Returns:
+        tuple: (width, height) of the image, or None if no SOF was found
+    """
+    with open(src_path, 'rb', buffering=COPY_BUFFER_SIZE) as src:
+        segments, size = read_header_segments(src)
+        if callable(exif):
+            exif = exif(*(size or (3024, 4032)))
+        app1 = build_app1(exif)
+
+        kept = [raw for marker, raw in segments if not is_exif_segment(marker, raw)]
+        if segments and segments[0][0] == APP0:
+            kept = kept[1:]
+
+        with open(dst_path, 'wb', buffering=COPY_BUFFER_SIZE) as dst:
+            dst.write(SOI)
+            dst.write(app1)
+            for raw in kept:
+                dst.write(raw)
+            dst.write(b"\xff\xda")
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+    return size
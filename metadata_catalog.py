@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Incremental metadata catalog
+A SQLite file holding one metadata_scanner record per media file, keyed by
+path and validated by size, mtime and inode. Re-running an audit only
+re-parses files that changed; questions like "which files have Model X"
+are answered from the indexes without touching the media at all.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+from metadata_scanner import FIELDS, scan
+
+CATALOG_NAME = ".metadata_catalog.sqlite"
+
+# Record fields with their own indexed column - everything else is in the JSON record
+INDEXED_FIELDS = ("kind", "make", "model", "datetime_original")
+
+# Fields find() accepts as filters
+QUERY_FIELDS = set(FIELDS) - {"path", "error"}
+
+
+class MetadataCatalog:
+    """
+    Metadata catalog for one media library
+
+    Only use an instance from the thread that created it.
+
+    Args:
+        path: Catalog file (created if missing)
+    """
+
+    def __init__(self, path=CATALOG_NAME):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                kind TEXT,
+                make TEXT,
+                model TEXT,
+                datetime_original TEXT,
+                record TEXT NOT NULL,
+                scanned_at REAL NOT NULL
+            )
+        """)
+        for field in INDEXED_FIELDS:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS files_{field} ON files ({field})")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stale(self, paths):
+        """
+        Paths whose size, mtime or inode differ from the catalog (or that are new)
+
+        Only stats the files - one catalog query for the whole list.
+        """
+        known = {row[0]: row[1:] for row in self.conn.execute("SELECT path, size, mtime_ns, inode FROM files")}
+        changed = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (st.st_size, st.st_mtime_ns, st.st_ino):
+                changed.append(path)
+        return changed
+
+    def update(self, paths, jobs=None, prune_roots=None):
+        """
+        Re-scan only new or changed files and store their records
+
+        Args:
+            paths: Every file currently in the library
+            jobs: Worker processes for the scan
+            prune_roots: Folders that were walked completely - catalog rows
+                under them for files no longer in paths are removed
+
+        Returns:
+            dict: scanned, unchanged, removed and failed counts - failed
+            files aren't stored, so they are rescanned on the next update
+        """
+        changed = self.stale(paths)
+        failed = 0
+        with self.conn:
+            for record in scan(changed, jobs):
+                if record["error"]:
+                    # Not cached: a transient error (or a parser fix) gets a fresh try next run
+                    failed += 1
+                    self.conn.execute("DELETE FROM files WHERE path = ?", (record["path"],))
+                    continue
+                try:
+                    st = os.stat(record["path"])
+                except OSError:
+                    continue
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (record["path"], st.st_size, st.st_mtime_ns, st.st_ino,
+                     *(record[field] for field in INDEXED_FIELDS),
+                     json.dumps(record, ensure_ascii=False), time.time())
+                )
+        removed = self.prune(paths, prune_roots) if prune_roots else 0
+        return {"scanned": len(changed), "unchanged": len(paths) - len(changed), "removed": removed,
+                "failed": failed}
+
+    def prune(self, paths, roots):
+        """Drop rows under roots that aren't in paths (deleted or moved files)"""
+        present = {os.path.abspath(p) for p in paths}
+        gone = []
+        for root in roots:
+            prefix = os.path.join(os.path.abspath(root), "")
+            gone.extend(path for (path,) in self.conn.execute(
+                "SELECT path FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+                if path not in present)
+        with self.conn:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", ((p,) for p in gone))
+        return len(gone)
+
+    def find(self, **filters):
+        """
+        Catalog records matching every filter, e.g. find(model="Ray-Ban Stories")
+
+        Indexed fields (kind, make, model, datetime_original) are answered
+        from their indexes; other fields are matched inside the JSON record.
+        A value ending in '*' is a prefix match ("2025:11*").
+
+        Returns:
+            list: Records (dicts with all metadata_scanner.FIELDS), by path
+        """
+        clauses = []
+        params = []
+        for field, value in filters.items():
+            if field not in QUERY_FIELDS:
+                raise ValueError(f"Unknown field {field!r} (choose from {', '.join(sorted(QUERY_FIELDS))})")
+            column = field if field in INDEXED_FIELDS else f"json_extract(record, '$.{field}')"
+            if isinstance(value, str) and value.endswith('*'):
+                # Range on the index rather than LIKE, which SQLite won't index case-sensitively
+                clauses.append(f"{column} >= ? AND {column} < ?")
+                prefix = value[:-1]
+                params += [prefix, prefix + '\U0010ffff']
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT record FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return [json.loads(record) for (record,) in self.conn.execute(sql + " ORDER BY path", params)]
+
+    def counts(self, field):
+        """{value: file count} for an indexed field, e.g. counts('model')"""
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"counts() needs an indexed field: {', '.join(INDEXED_FIELDS)}")
+        return dict(self.conn.execute(f"SELECT {field}, COUNT(*) FROM files GROUP BY {field} ORDER BY 2 DESC"))
@@ -3,46 +3,131 @@
 Metadata Cloner - Inject Ray-Ban Meta metadata into photos AND videos
 Pre-configured with authentic Ray-Ban Stories metadata
 Supports: ALL image formats (auto-converts to JPEG) + MOV, MP4 videos
+
+Run without arguments for the GUI; with arguments it runs headless
+(see cloner_cli.py): python metadata_cloner.py --input FOLDER --output FOLDER
 """
 
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-import piexif
 import os
-from datetime import datetime, timedelta
-import random
-import secrets
-import uuid
-import struct
-import io
+import queue
+import sys
+import threading
+from collections import Counter
 
-# Try to import PIL for format conversion
+# tkinter is only needed for the GUI - headless servers often lack it
 try:
-    from PIL import Image
-    HAS_PIL = True
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
+    HAS_TK = True
 except ImportError:
-    HAS_PIL = False
-    print("WARNING: Pillow not installed. Only JPEG images supported.")
-    print("Install with: pip3 install Pillow")
+    HAS_TK = False
 
-# Try to import pillow-heif for HEIC support
-try:
-    from pillow_heif import register_heif_opener
-    register_heif_opener()
-    HAS_HEIF = True
-except ImportError:
-    HAS_HEIF = False
+from cloner_core import (
+    OUTPUT_SIZE_CHOICES, ENCODER_PROFILES, BatchProgress, batch_settings, classify, run_batch,
+)
+from batch_journal import BatchJournal
+
+# How often the Tk main loop drains worker results (ms)
+RESULT_POLL_MS = 100
+
+# List row labels by cloner_core.classify() kind
+FILE_ICONS = {"jpeg": "📷 {}", "convert": "🔄 {} → JPEG", "video": "🎬 {}"}
+
+
+class VirtualFileList:
+    """
+    Scrollable file list that only draws the rows currently visible
+
+    A tk.Listbox creates an entry per file up front, which stalls the UI for
+    seconds on 20,000+ file selections. This keeps a small pool of canvas
+    text items (one per visible row) and relabels them on scroll, so cost
+    depends on the window height, not the selection size.
+
+    The view shares the paths list it is given - append to it and call
+    refresh() to add files without rebuilding anything.
+    """
+
+    ROW_HEIGHT = 20
+
+    def __init__(self, parent, paths, font, bg="white", fg="#1d1d1f"):
+        self.paths = paths
+        self.font = font
+        self.fg = fg
+        self.top = 0
+        self.row_items = []
+
+        self.frame = tk.Frame(parent, bg=bg, highlightthickness=1, highlightbackground="#d1d1d6")
+        self.scrollbar = tk.Scrollbar(self.frame, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self.frame, bg=bg, highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", self.refresh)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)    # macOS / Windows
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -3, "units"))  # X11
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 3, "units"))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def visible_rows(self):
+        return max(1, self.canvas.winfo_height() // self.ROW_HEIGHT)
+
+    def _on_mousewheel(self, event):
+        step = -event.delta if abs(event.delta) < 120 else -event.delta // 120 * 3
+        self.yview("scroll", step, "units")
+
+    def yview(self, *args):
+        """Scrollbar protocol: ('moveto', fraction) or ('scroll', n, 'units'|'pages')"""
+        visible = self.visible_rows()
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.paths))
+        elif args[0] == "scroll":
+            amount = int(args[1]) * (visible if args[2] == "pages" else 1)
+            self.top += amount
+        self.top = max(0, min(self.top, len(self.paths) - visible))
+        self.refresh()
+
+    def scroll_to_end(self):
+        self.top = max(0, len(self.paths) - self.visible_rows())
+        self.refresh()
+
+    def refresh(self, event=None):
+        """Relabel the visible rows - O(visible rows) regardless of list length"""
+        visible = self.visible_rows()
+        while len(self.row_items) < visible + 1:
+            y = len(self.row_items) * self.ROW_HEIGHT + self.ROW_HEIGHT // 2
+            self.row_items.append(self.canvas.create_text(
+                8, y, anchor=tk.W, font=self.font, fill=self.fg, text=""))
+
+        total = len(self.paths)
+        self.top = max(0, min(self.top, total - visible))
+        for row, item in enumerate(self.row_items):
+            index = self.top + row
+            if index < total:
+                path = self.paths[index]
+                label = FILE_ICONS.get(classify(path), "{}").format(os.path.basename(path))
+                self.canvas.itemconfigure(item, text=label, state=tk.NORMAL)
+            else:
+                self.canvas.itemconfigure(item, state=tk.HIDDEN)
+
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
 
 
 class MetadataCloner:
     def __init__(self, root):
         self.root = root
         self.root.title("Ray-Ban Meta Cloner")
-        self.root.geometry("700x450")
+        self.root.geometry("700x520")
         self.root.resizable(True, True)
         
-        # Target image paths
+        # Target image paths, with per-type counts kept in step (see add_target_paths)
         self.target_image_paths = []
+        self.target_path_set = set()
+        self.type_counts = Counter()
         
         # Output folder - "Ready to Send" on Desktop
         self.output_folder = os.path.join(os.path.expanduser("~"), "Desktop", "Ready to Send")
@@ -51,6 +136,22 @@ class MetadataCloner:
         # A/B Test Mode - Toggle between metadata formats
         self.metadata_mode = tk.StringVar(value="metaspoof")  # Default to working format
         
+        # Output size - oversized photos are decoded at reduced scale
+        self.output_size = tk.StringVar(value="Original")
+        
+        # JPEG encoder profile for converted photos
+        self.encoder_profile = tk.StringVar(value="standard")
+        
+        # Skip files already processed into the output folder (resumes interrupted batches)
+        self.skip_unchanged = tk.BooleanVar(value=True)
+        
+        # Background batch state - results arrive on result_queue from worker threads
+        self.result_queue = queue.Queue()
+        self.batch_thread = None
+        self.cancel_event = None
+        self.batch_results = []
+        self.batch_progress = None
+        
         # Configure style for modern look
         self.setup_styles()
         
@@ -88,114 +189,10 @@ class MetadataCloner:
                 fg="#007AFF"
             )
     
-    def generate_random_datetime(self):
-        """Generate a random datetime within the last 30 days"""
-        now = datetime.now()
-        random_days = random.randint(0, 30)
-        random_hours = random.randint(0, 23)
-        random_minutes = random.randint(0, 59)
-        random_seconds = random.randint(0, 59)
-        
-        random_date = now - timedelta(days=random_days, hours=random_hours, 
-                                       minutes=random_minutes, seconds=random_seconds)
-        return random_date.strftime("%Y:%m:%d %H:%M:%S")
-
-    def deg_to_dms_rational(self, deg):
-        """Convert decimal degrees to DMS rational format for GPS"""
-        d = int(deg)
-        m = int((deg - d) * 60)
-        s = int(((deg - d) * 60 - m) * 60 * 100)
-        return ((d, 1), (m, 1), (s, 100))
-
-    def generate_uuid(self):
-        """Generate a UUID in the format used by Ray-Ban Meta"""
-        import uuid
-        return str(uuid.uuid4()).upper()
-    
-    def create_rayban_exif(self):
-        """Create Ray-Ban Meta EXIF data based on selected A/B test mode"""
-        
-        # Generate random but realistic values
-        random_datetime = self.generate_random_datetime()
-        unique_uuid = self.generate_uuid()
-        
-        # Get current mode
-        mode = self.metadata_mode.get()
-        
-        # Camera settings
-        exposure_times = [(1, 100), (1, 120), (1, 150), (1, 200), (1, 250), (1, 4000)]
-        f_numbers = [(11, 5), (7, 5)]  # f/2.2 or f/1.4
-        iso_values = [100, 125, 150, 200, 397, 400, 500]
-        
-        # Serial numbers
-        body_serials = ["2Q", "4V", "3X", "5R", "6T"]
-        body_serial = random.choice(body_serials)
-        
-        # Mode-specific values
-        if mode == "authentic":
-            # Authentic 2024/2025 format (Ray-Ban Meta Smart Glasses 2)
-            model_name = "Ray-Ban Meta Smart Glasses 2"
-            exif_version = b"0220"
-            focal_length = (56, 25)  # From authentic sample
-            focal_35mm = 13
-            scene_capture = 0  # Standard
-        else:
-            # Metaspoof format (WORKING format - match exactly!)
-            model_name = "Ray-Ban Meta Smart Glasses"
-            exif_version = b"0231"
-            focal_length = (35, 1)
-            focal_35mm = 35
-            scene_capture = 1  # Portrait - THIS IS KEY!
-        
-        # Build EXIF dictionary based on selected mode
-        exif_dict = {
-            "0th": {
-                271: "Meta AI",          # Make - same for both modes
-                272: model_name,         # Model - changes based on mode
-                274: 1,                  # Orientation
-                282: (72, 1),            # XResolution
-                283: (72, 1),            # YResolution
-                296: 2,                  # ResolutionUnit
-                306: random_datetime,    # DateTime
-            },
-            "Exif": {
-                33434: random.choice(exposure_times),  # ExposureTime
-                33437: random.choice(f_numbers),       # FNumber
-                34850: 1,                # ExposureProgram
-                34855: random.choice(iso_values),      # ISOSpeedRatings
-                36864: exif_version,     # ExifVersion - mode specific
-                36867: random_datetime,  # DateTimeOriginal
-                36868: random_datetime,  # DateTimeDigitized
-                37377: (26773, 3361),    # ShutterSpeedValue
-                37378: (25249, 26007),   # ApertureValue
-                37380: (0, 1),           # ExposureBiasValue
-                37381: (227, 100),       # MaxApertureValue
-                37383: 5,                # MeteringMode (Pattern)
-                37385: 0,                # Flash (no flash)
-                37386: focal_length,     # FocalLength - mode specific
-                37510: f"ASCII   {unique_uuid}".encode('utf-8'),  # UserComment
-                37520: str(random.randint(100, 999)),  # SubSecTime
-                37521: str(random.randint(100, 999)),  # SubSecTimeOriginal
-                37522: str(random.randint(100, 999)),  # SubSecTimeDigitized
-                40960: b"0100",          # FlashpixVersion
-                40961: 1,                # ColorSpace (sRGB)
-                40962: 3024,             # PixelXDimension
-                40963: 4032,             # PixelYDimension
-                41495: 2,                # SensingMethod
-                41986: 0,                # ExposureMode (Auto)
-                41987: 0,                # WhiteBalance (Auto)
-                41989: focal_35mm,       # FocalLengthIn35mmFilm - mode specific
-                41990: scene_capture,    # SceneCaptureType - Portrait for Metaspoof!
-                42033: body_serial,      # BodySerialNumber
-            },
-            "GPS": {},
-            "1st": {},
-            "thumbnail": None
-        }
-        
-        print(f"[{mode.upper()}] Using model: {model_name}")
-        
-        return exif_dict
+    def get_max_dimension(self):
+        """Longest output side in pixels, or None to keep full resolution"""
+        value = self.output_size.get()
+        return int(value) if value.isdigit() else None
     
     def setup_styles(self):
         """Configure modern styling"""
@@ -303,8 +300,11 @@ class MetadataCloner:
         )
         target_label.pack(anchor=tk.W, pady=(0, 8))
         
+        button_row = tk.Frame(target_frame, bg=self.bg_color)
+        button_row.pack(fill=tk.X)
+        
         self.target_button = tk.Button(
-            target_frame,
+            button_row,
             text="📁 Select Photos & Videos",
             command=self.select_target_images,
             font=("SF Pro Display", 12) if os.name == 'posix' else ("Segoe UI", 12),
@@ -318,29 +318,49 @@ class MetadataCloner:
             cursor="hand2",
             borderwidth=0
         )
-        self.target_button.pack(fill=tk.X)
+        self.target_button.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
-        # Target images list with scrollbar
-        list_frame = tk.Frame(target_frame, bg=self.bg_color)
-        list_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        self.add_more_button = tk.Button(
+            button_row,
+            text="➕ Add More",
+            command=lambda: self.select_target_images(append=True),
+            font=("SF Pro Display", 12) if os.name == 'posix' else ("Segoe UI", 12),
+            bg="#5AC8FA",
+            fg="white",
+            activebackground="#0051D5",
+            activeforeground="white",
+            relief=tk.FLAT,
+            padx=20,
+            pady=10,
+            cursor="hand2",
+            borderwidth=0
+        )
+        self.add_more_button.pack(side=tk.LEFT, padx=(8, 0))
         
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.check_button = tk.Button(
+            button_row,
+            text="🔍 Check",
+            command=self.run_preflight,
+            font=("SF Pro Display", 12) if os.name == 'posix' else ("Segoe UI", 12),
+            bg="#8E8E93",
+            fg="white",
+            activebackground="#636366",
+            activeforeground="white",
+            relief=tk.FLAT,
+            padx=20,
+            pady=10,
+            cursor="hand2",
+            borderwidth=0
+        )
+        self.check_button.pack(side=tk.LEFT, padx=(8, 0))
         
-        self.target_listbox = tk.Listbox(
-            list_frame,
+        # Target file list - virtualized, only visible rows are drawn
+        self.target_list = VirtualFileList(
+            target_frame,
+            self.target_image_paths,
             font=("SF Pro Display", 10) if os.name == 'posix' else ("Segoe UI", 10),
-            bg="white",
-            fg="#1d1d1f",
-            relief=tk.FLAT,
-            borderwidth=1,
-            highlightthickness=1,
-            highlightbackground="#d1d1d6",
-            selectmode=tk.EXTENDED,
-            yscrollcommand=scrollbar.set
         )
-        self.target_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.config(command=self.target_listbox.yview)
+        self.target_list.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
         
         # Status label
         self.status_label = tk.Label(
@@ -352,6 +372,50 @@ class MetadataCloner:
         )
         self.status_label.pack(pady=(5, 10))
         
+        # Batch progress
+        self.progress_bar = ttk.Progressbar(main_frame, mode="determinate")
+        self.progress_bar.pack(fill=tk.X, pady=(0, 10))
+        
+        # Output size selector
+        size_frame = tk.Frame(main_frame, bg=self.bg_color)
+        size_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        size_label = tk.Label(
+            size_frame,
+            text="Max photo size (longest side):",
+            font=("SF Pro Display", 10) if os.name == 'posix' else ("Segoe UI", 10),
+            bg=self.bg_color,
+            fg="#1d1d1f"
+        )
+        size_label.pack(side=tk.LEFT)
+        
+        size_menu = tk.OptionMenu(size_frame, self.output_size, *OUTPUT_SIZE_CHOICES)
+        size_menu.config(bg=self.bg_color, relief=tk.FLAT, highlightthickness=0)
+        size_menu.pack(side=tk.LEFT, padx=(8, 0))
+        
+        encoder_label = tk.Label(
+            size_frame,
+            text="JPEG profile:",
+            font=("SF Pro Display", 10) if os.name == 'posix' else ("Segoe UI", 10),
+            bg=self.bg_color,
+            fg="#1d1d1f"
+        )
+        encoder_label.pack(side=tk.LEFT, padx=(20, 0))
+        
+        encoder_menu = tk.OptionMenu(size_frame, self.encoder_profile, *ENCODER_PROFILES)
+        encoder_menu.config(bg=self.bg_color, relief=tk.FLAT, highlightthickness=0)
+        encoder_menu.pack(side=tk.LEFT, padx=(8, 0))
+        
+        skip_check = tk.Checkbutton(
+            size_frame,
+            text="Skip unchanged",
+            variable=self.skip_unchanged,
+            font=("SF Pro Display", 10) if os.name == 'posix' else ("Segoe UI", 10),
+            bg=self.bg_color,
+            activebackground=self.bg_color
+        )
+        skip_check.pack(side=tk.LEFT, padx=(20, 0))
+        
         # Process Button
         self.process_button = tk.Button(
             main_frame,
@@ -369,18 +433,27 @@ class MetadataCloner:
             borderwidth=0
         )
         self.process_button.pack(fill=tk.X)
-    
-    def select_target_images(self):
-        """Open file dialog to select multiple target files (images and videos)"""
-        # All supported image extensions
-        image_extensions = (
-            '.jpg', '.jpeg', '.png', '.heic', '.heif', 
-            '.webp', '.bmp', '.gif', '.tiff', '.tif'
+        
+        self.cancel_button = tk.Button(
+            main_frame,
+            text="Cancel",
+            command=self.cancel_batch,
+            state=tk.DISABLED,
+            font=("SF Pro Display", 11) if os.name == 'posix' else ("Segoe UI", 11),
+            relief=tk.FLAT,
+            cursor="hand2",
+            borderwidth=0
         )
-        video_extensions = ('.mov', '.mp4')
+        self.cancel_button.pack(fill=tk.X, pady=(8, 0))
+    
+    def select_target_images(self, append=False):
+        """Open file dialog to select multiple target files (images and videos)
         
+        With append=True the chosen files are added to the current selection
+        (duplicates ignored) instead of replacing it.
+        """
         file_paths = filedialog.askopenfilenames(
-            title="Select Photos & Videos to Process",
+            title="Add Photos & Videos" if append else "Select Photos & Videos to Process",
             filetypes=[
                 ("All Supported", "*.jpg *.jpeg *.png *.heic *.heif *.webp *.bmp *.gif *.tiff *.tif *.mov *.mp4 *.JPG *.JPEG *.PNG *.HEIC *.MOV *.MP4"),
                 ("Images", "*.jpg *.jpeg *.png *.heic *.heif *.webp *.bmp *.gif *.tiff *.tif"),
@@ -390,242 +463,233 @@ class MetadataCloner:
         )
         
         if file_paths:
-            all_extensions = image_extensions + video_extensions
-            valid_paths = [path for path in file_paths if path.lower().endswith(all_extensions)]
-            
-            if len(valid_paths) < len(file_paths):
-                skipped = len(file_paths) - len(valid_paths)
+            skipped = self.add_target_paths(file_paths, append)
+            if skipped:
                 messagebox.showwarning(
                     "Some Files Skipped",
-                    f"Skipped {skipped} unsupported file(s). Selected {len(valid_paths)} valid files."
+                    f"Skipped {skipped} unsupported file(s). Selected {len(self.target_image_paths)} valid files."
                 )
-            
-            self.target_image_paths = list(valid_paths)
-            
-            # Update listbox with file type indicators
-            self.target_listbox.delete(0, tk.END)
-            for path in self.target_image_paths:
-                filename = os.path.basename(path)
-                ext = os.path.splitext(filename)[1].lower()
-                if ext in video_extensions:
-                    self.target_listbox.insert(tk.END, f"🎬 {filename}")
-                elif ext in ['.jpg', '.jpeg']:
-                    self.target_listbox.insert(tk.END, f"📷 {filename}")
-                else:
-                    # Non-JPEG images will be converted
-                    self.target_listbox.insert(tk.END, f"🔄 {filename} → JPEG")
-            
-            # Count files by type
-            photo_count = len([p for p in self.target_image_paths if p.lower().endswith(image_extensions)])
-            video_count = len([p for p in self.target_image_paths if p.lower().endswith(video_extensions)])
-            convert_count = len([p for p in self.target_image_paths 
-                                if p.lower().endswith(image_extensions) 
-                                and not p.lower().endswith(('.jpg', '.jpeg'))])
-            
-            # Update status
-            status_parts = []
-            if photo_count > 0:
-                status_parts.append(f"{photo_count} photo{'s' if photo_count != 1 else ''}")
-            if video_count > 0:
-                status_parts.append(f"{video_count} video{'s' if video_count != 1 else ''}")
-            
-            status_text = f"✓ {' and '.join(status_parts)} selected"
-            if convert_count > 0:
-                status_text += f" ({convert_count} will convert to JPEG)"
-            
-            self.status_label.config(text=status_text, fg=self.success_color)
     
-    # ============ VIDEO PROCESSING METHODS ============
-
-
-    def process_video(self, input_path):
-        """Inject QuickTime metadata into video file - converts to MOV for iOS compatibility"""
-        import shutil
-        import subprocess
-        
-        basename = os.path.basename(input_path)
-        name_without_ext = os.path.splitext(basename)[0]
-        ext = os.path.splitext(basename)[1]  # Keep original extension
-        
-        # Get mode-specific values
-        mode = self.metadata_mode.get()
-        if mode == "authentic":
-            model_name = "Ray-Ban Meta Smart Glasses 2"
+    def add_target_paths(self, file_paths, append=False):
+        """
+        Classify and add files in a single pass, updating the per-type counters
+        
+        Returns:
+            int: Number of unsupported files that were skipped
+        """
+        if not append:
+            # Clear in place - the list view shares this list object
+            self.target_image_paths.clear()
+            self.target_path_set.clear()
+            self.type_counts.clear()
+        
+        skipped = 0
+        for path in file_paths:
+            kind = classify(path)
+            if kind is None:
+                skipped += 1
+            elif path not in self.target_path_set:
+                self.target_path_set.add(path)
+                self.target_image_paths.append(path)
+                self.type_counts[kind] += 1
+        
+        if append:
+            self.target_list.scroll_to_end()
         else:
-            model_name = "Ray-Ban Meta Smart Glasses"
-        
-        unique_uuid = str(uuid.uuid4()).upper()
-        comment = f"app=Meta AI&device={model_name}&id={unique_uuid}"
-        creation_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+            self.target_list.top = 0
+            self.target_list.refresh()
+        self.update_selection_status()
+        return skipped
+    
+    def update_selection_status(self):
+        """Status line from the per-type counters - no pass over the selection"""
+        photo_count = self.type_counts["jpeg"] + self.type_counts["convert"]
+        video_count = self.type_counts["video"]
+        convert_count = self.type_counts["convert"]
+        
+        status_parts = []
+        if photo_count > 0:
+            status_parts.append(f"{photo_count} photo{'s' if photo_count != 1 else ''}")
+        if video_count > 0:
+            status_parts.append(f"{video_count} video{'s' if video_count != 1 else ''}")
+        if not status_parts:
+            self.status_label.config(text="", fg="#6e6e73")
+            return
         
-        print(f"[{mode.upper()} VIDEO] Model: {model_name}")
+        status_text = f"✓ {' and '.join(status_parts)} selected"
+        if convert_count > 0:
+            status_text += f" ({convert_count} will convert to JPEG)"
         
-        # Check for exiftool
-        exiftool_path = None
-        for path in ['/opt/homebrew/bin/exiftool', '/usr/local/bin/exiftool']:
-            if os.path.exists(path):
-                exiftool_path = path
-                break
+        self.status_label.config(text=status_text, fg=self.success_color)
+    
+    # ============ PRE-FLIGHT CHECK ============
+    
+    def run_preflight(self):
+        """Header-scan the selection in the background, then show problems and an estimate"""
+        if not self.target_image_paths:
+            messagebox.showerror(
+                "No Files Selected",
+                "Please select at least one file to check."
+            )
+            return
+        self.check_button.config(state=tk.DISABLED)
+        self.status_label.config(text=f"🔍 Checking {len(self.target_image_paths)} files...", fg="#6e6e73")
         
-        # Copy video without re-encoding (avoids ffmpeg fingerprints that Instagram detects)
-        output_path = os.path.join(self.output_folder, f"RayBan_{name_without_ext}{ext}")
-        shutil.copy2(input_path, output_path)
-        print(f"  [copy] Video copied (no re-encoding - cleaner for Instagram)")
+        paths = list(self.target_image_paths)
+        max_dimension = self.get_max_dimension()
+        encoder_profile = self.encoder_profile.get()
+        report_queue = queue.Queue()
         
-        # Step 2: Add QuickTime metadata with exiftool
-        if exiftool_path:
+        def worker():
+            from preflight import scan
             try:
-                # Format date for QuickTime (YYYY:MM:DD HH:MM:SS)
-                qt_date = datetime.now().strftime("%Y:%m:%d %H:%M:%S")
-                
-                cmd = [
-                    exiftool_path, '-overwrite_original',
-                    # Keys metadata (what Instagram reads)
-                    f'-Keys:Model={model_name}',
-                    f'-Keys:Copyright=Meta AI',
-                    f'-Keys:Comment={comment}',
-                    f'-Keys:Description=4V',
-                    f'-Keys:CreationDate={creation_date}',
-                    # QuickTime header dates (to look authentic)
-                    f'-QuickTime:CreateDate={qt_date}',
-                    f'-QuickTime:ModifyDate={qt_date}',
-                    f'-QuickTime:TrackCreateDate={qt_date}',
-                    f'-QuickTime:TrackModifyDate={qt_date}',
-                    f'-QuickTime:MediaCreateDate={qt_date}',
-                    f'-QuickTime:MediaModifyDate={qt_date}',
-                    output_path
-                ]
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                if result.returncode == 0:
-                    print(f"  ✓ QuickTime metadata injected")
-                    return output_path
-                else:
-                    print(f"  ⚠ exiftool error: {result.stderr[:100] if result.stderr else result.stdout[:100]}")
+                report_queue.put(scan(paths, None, max_dimension, encoder_profile))
             except Exception as e:
-                print(f"  ⚠ exiftool exception: {e}")
+                report_queue.put(e)
         
-        print(f"  ✓ Video saved (metadata may be limited)")
-        return output_path
-    
-    # ============ IMAGE CONVERSION ============
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(RESULT_POLL_MS, self._poll_preflight, report_queue)
     
-    def convert_to_jpeg_with_exif(self, input_path, exif_bytes):
-        """Convert any image format to JPEG with EXIF metadata"""
-        if not HAS_PIL:
-            raise ValueError("Pillow not installed - cannot convert image formats")
-        
-        # Open the image
-        img = Image.open(input_path)
-        
-        # Convert to RGB if necessary (for PNG with transparency, etc.)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # Create white background for transparent images
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Generate output path in "Ready to Send" folder
-        basename = os.path.splitext(os.path.basename(input_path))[0]
-        output_path = os.path.join(self.output_folder, f"RayBan_{basename}.jpg")
-        
-        # Save as JPEG first (without EXIF)
-        img.save(output_path, 'JPEG', quality=95)
-        
-        # Then inject EXIF using piexif (more reliable)
-        piexif.insert(exif_bytes, output_path)
-        
-        return output_path
+    def _poll_preflight(self, report_queue):
+        try:
+            report = report_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(RESULT_POLL_MS, self._poll_preflight, report_queue)
+            return
+        
+        from preflight import format_report
+        self.check_button.config(state=tk.NORMAL)
+        self.update_selection_status()
+        if isinstance(report, Exception):
+            messagebox.showerror("Check Failed", str(report))
+        elif report["problems"]:
+            messagebox.showwarning("Pre-flight Check", format_report(report))
+        else:
+            messagebox.showinfo("Pre-flight Check", format_report(report))
     
     # ============ MAIN PROCESSING ============
     
     def apply_metadata(self):
-        """Apply Ray-Ban Meta data to all target files (photos and videos)"""
+        """Apply Ray-Ban Meta data to all target files (photos and videos)
+        
+        The batch runs on a background thread feeding cloner_core.run_batch
+        (process pool for conversions, thread pool for JPEG rewrites and video
+        copies). Results come back through a queue drained by root.after, so
+        the window stays responsive.
+        """
         if not self.target_image_paths:
             messagebox.showerror(
                 "No Files Selected",
                 "Please select at least one file to process."
             )
             return
+        if self.batch_thread is not None:
+            return
         
-        # Define extensions
-        image_extensions = ('.jpg', '.jpeg', '.png', '.heic', '.heif', 
-                          '.webp', '.bmp', '.gif', '.tiff', '.tif')
-        video_extensions = ('.mov', '.mp4')
-        jpeg_extensions = ('.jpg', '.jpeg')
+        paths = list(self.target_image_paths)
+        self.batch_results = []
+        self.batch_progress = BatchProgress(len(paths))
+        self.cancel_event = threading.Event()
+        self.progress_bar.config(maximum=len(paths), value=0)
+        self.process_button.config(state=tk.DISABLED)
+        self.target_button.config(state=tk.DISABLED)
+        self.add_more_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.status_label.config(text=self.batch_progress.describe(), fg="#6e6e73")
+        
+        self.batch_thread = threading.Thread(
+            target=self._run_batch,
+            args=(paths, self.metadata_mode.get(), self.get_max_dimension(), self.encoder_profile.get(),
+                  self.skip_unchanged.get()),
+            daemon=True,
+        )
+        self.batch_thread.start()
+        self.root.after(RESULT_POLL_MS, self._poll_results)
+    
+    def _run_batch(self, paths, mode, max_dimension, encoder_profile, skip_unchanged):
+        """Worker thread body - never touches Tk, only the result queue"""
+        journal = None
+        try:
+            # The journal is opened here so its SQLite connection belongs to this thread
+            if skip_unchanged:
+                journal = BatchJournal(self.output_folder, batch_settings(mode, max_dimension, encoder_profile))
+            run_batch(paths, self.output_folder, mode, max_dimension, encoder_profile,
+                      on_result=self.result_queue.put, cancel_event=self.cancel_event,
+                      journal=journal)
+        except Exception as e:
+            self.result_queue.put({"path": None, "kind": None, "output": None,
+                                   "converted": False, "skipped": False, "error": f"Batch failed: {e}"})
+        finally:
+            if journal is not None:
+                journal.close()
+            self.result_queue.put(None)  # sentinel: batch finished
+    
+    def _poll_results(self):
+        """Drain finished files from the worker queue and update progress (Tk thread)"""
+        finished = False
+        while True:
+            try:
+                result = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                finished = True
+                break
+            self.batch_results.append(result)
+            self.batch_progress.update(skipped=result["skipped"])
+            name = os.path.basename(result["path"]) if result["path"] else "batch"
+            if result["error"]:
+                print(f"  ✗ {name}: {result['error']}")
+            elif result["skipped"]:
+                print(f"  = {name} unchanged, skipped")
+            else:
+                print(f"  ✓ {name} → {os.path.basename(result['output'])}")
+        
+        self.progress_bar.config(value=self.batch_progress.done)
+        if finished:
+            self._finish_batch()
+        else:
+            if not self.cancel_event.is_set():
+                self.status_label.config(text=self.batch_progress.describe(), fg="#6e6e73")
+            self.root.after(RESULT_POLL_MS, self._poll_results)
+    
+    def cancel_batch(self):
+        """Stop handing out new files; files already running are allowed to finish"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_label.config(text="Cancelling - finishing files in progress...", fg=self.error_color)
+    
+    def _finish_batch(self):
+        """Restore the controls and show the summary for the completed batch"""
+        self.batch_thread = None
+        self.process_button.config(state=tk.NORMAL)
+        self.target_button.config(state=tk.NORMAL)
+        self.add_more_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        cancelled = self.cancel_event.is_set()
         
-        # Process files
         photo_success = 0
         video_success = 0
         converted_count = 0
+        skipped_count = 0
         failed_files = []
         created_files = []
-        
-        for target_path in self.target_image_paths:
-            target_name = os.path.basename(target_path)
-            ext = os.path.splitext(target_path)[1].lower()
-            print(f"Processing: {target_name}")
-            
-            try:
-                if not os.path.exists(target_path):
-                    print(f"  ✗ File not found")
-                    failed_files.append((target_name, "File not found"))
-                    continue
-                
-                if ext in jpeg_extensions:
-                    # Native JPEG - copy to output folder with EXIF
-                    unique_exif = self.create_rayban_exif()
-                    exif_bytes = piexif.dump(unique_exif)
-                    
-                    # Copy to Ready to Send folder
-                    output_path = os.path.join(self.output_folder, f"RayBan_{target_name}")
-                    
-                    # Copy original file first
-                    import shutil
-                    shutil.copy2(target_path, output_path)
-                    
-                    # Remove existing EXIF from copy
-                    try:
-                        piexif.remove(output_path)
-                    except:
-                        pass
-                    
-                    # Inject our Ray-Ban EXIF using piexif (most reliable method)
-                    piexif.insert(exif_bytes, output_path)
-                    
-                    print(f"  ✓ JPEG saved: {os.path.basename(output_path)}")
-                    photo_success += 1
-                    created_files.append(output_path)
-                    
-                elif ext in image_extensions:
-                    # Non-JPEG image - convert to JPEG with EXIF
-                    if not HAS_PIL:
-                        print(f"  ✗ Cannot convert - Pillow not installed")
-                        failed_files.append((target_name, "Install Pillow: pip3 install Pillow"))
-                        continue
-                    
-                    unique_exif = self.create_rayban_exif()
-                    exif_bytes = piexif.dump(unique_exif)
-                    output_path = self.convert_to_jpeg_with_exif(target_path, exif_bytes)
-                    print(f"  ✓ Converted to JPEG: {os.path.basename(output_path)}")
-                    photo_success += 1
-                    converted_count += 1
-                    created_files.append(output_path)
-                    
-                elif ext in video_extensions:
-                    # Process video
-                    output_path = self.process_video(target_path)
-                    print(f"  ✓ Video saved: {os.path.basename(output_path)}")
-                    video_success += 1
-                    created_files.append(output_path)
-                
-            except Exception as e:
-                error_msg = str(e)
-                print(f"  ✗ Failed: {error_msg}")
-                failed_files.append((target_name, error_msg))
+        for result in self.batch_results:
+            name = os.path.basename(result["path"]) if result["path"] else "batch"
+            if result["error"]:
+                failed_files.append((name, result["error"]))
+                continue
+            if result["skipped"]:
+                skipped_count += 1
+                continue
+            if result["kind"] == "video":
+                video_success += 1
+            else:
+                photo_success += 1
+            if result["converted"]:
+                converted_count += 1
+            created_files.append(result["output"])
         
         # Show results
         total_success = photo_success + video_success
@@ -637,6 +701,11 @@ class MetadataCloner:
                 parts.append(f"{video_success} video{'s' if video_success != 1 else ''}")
             
             message = f"✓ Applied Ray-Ban Meta data to {' and '.join(parts)}!"
+            if skipped_count > 0:
+                message += f"\n\n⏭ {skipped_count} unchanged file{'s' if skipped_count != 1 else ''} already done - skipped"
+            if cancelled:
+                skipped = self.batch_progress.total - len(self.batch_results)
+                message += f"\n\n⏹ Cancelled - {skipped} file{'s' if skipped != 1 else ''} not processed"
             message += f"\n\n📁 Saved to: Ready to Send (Desktop)"
             
             if len(created_files) > 0:
@@ -662,7 +731,17 @@ class MetadataCloner:
             status = f"✓ Processed {' and '.join(parts)}"
             if converted_count > 0:
                 status += f" ({converted_count} converted)"
+            if skipped_count > 0:
+                status += f", {skipped_count} skipped"
+            status += f" · {self.batch_progress.files_per_second:.1f} files/s"
             self.status_label.config(text=status, fg=self.success_color)
+        elif skipped_count > 0 and not failed_files:
+            self.status_label.config(
+                text=f"✓ All {skipped_count} file{'s' if skipped_count != 1 else ''} unchanged - nothing to do",
+                fg=self.success_color
+            )
+        elif cancelled and not failed_files:
+            self.status_label.config(text="⏹ Cancelled - no files processed", fg=self.error_color)
         else:
             message = "Failed to process any files.\n\n"
             for filename, error in failed_files[:5]:
@@ -670,14 +749,22 @@ class MetadataCloner:
             if len(failed_files) > 5:
                 message += f"\n... and {len(failed_files) - 5} more"
             messagebox.showerror("Error", message)
+            self.status_label.config(text="", fg="#6e6e73")
 
 
 def main():
-    """Main entry point"""
+    """Main entry point - GUI, or the headless CLI when arguments are given"""
+    if len(sys.argv) > 1:
+        from cloner_cli import main as cli_main
+        return cli_main(sys.argv[1:])
+    if not HAS_TK:
+        print("tkinter is not available - use the command line instead:")
+        print("  python metadata_cloner.py --input FOLDER --output FOLDER")
+        return 1
     root = tk.Tk()
     app = MetadataCloner(root)
     root.mainloop()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
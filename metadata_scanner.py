@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Parallel metadata scanner
+Inventories photos and videos into one flat record per file - camera make
+and model, capture date, dimensions, codec, duration - and streams them as
+NDJSON (default) or CSV. Records come out in sorted path order with a fixed
+set of fields, so two scans of the same library diff cleanly.
+
+Usage:
+    python metadata_scanner.py samples/
+    python metadata_scanner.py ~/Photos "~/Videos/**/*.mov" --format csv -o inventory.csv
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from cloner_core import IMAGE_EXTENSIONS, JPEG_EXTENSIONS, VIDEO_EXTENSIONS
+
+HEIF_EXTENSIONS = ('.heic', '.heif')
+
+# Output columns, in order - every record has all of them (None when unknown)
+FIELDS = ("path", "kind", "size", "mtime", "width", "height", "make", "model", "software",
+          "datetime_original", "duration", "codec", "fps", "bitrate", "rotation", "error")
+
+# QuickTime keys (and their udta fallbacks) for the camera fields
+VIDEO_TAGS = {
+    "make": ("com.apple.quicktime.make", "©mak"),
+    "model": ("com.apple.quicktime.model", "©mod"),
+    "software": ("com.apple.quicktime.software", "©swr"),
+    "datetime_original": ("com.apple.quicktime.creationdate", "©day"),
+}
+
+# EXIF (IFD, tag) for the camera fields
+EXIF_TAGS = {
+    "make": ("0th", 271),
+    "model": ("0th", 272),
+    "software": ("0th", 305),
+    "datetime_original": ("Exif", 36867),
+}
+
+
+def file_kind(path):
+    """'jpeg', 'heif', 'image', 'video' or None"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in JPEG_EXTENSIONS:
+        return "jpeg"
+    if ext in HEIF_EXTENSIONS:
+        return "heif"
+    if ext in IMAGE_EXTENSIONS:
+        return "image"
+    if ext in VIDEO_EXTENSIONS:
+        return "video"
+    return None
+
+
+# ============ PER-FILE EXTRACTION ============
+
+def _text(value):
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='replace')
+    return value.strip('\x00 ') if isinstance(value, str) else value
+
+
+def _exif_fields(path, record):
+    """Size + EXIF: JPEG headers up to SOS, or the HEIF meta box and Exif item"""
+    from exif_reader import read_exif
+
+    exif = read_exif(path)
+    if exif.size:
+        record["width"], record["height"] = exif.size
+    for field, (ifd, tag) in EXIF_TAGS.items():
+        record[field] = _text(exif.get(tag, ifd))
+
+
+def _video_fields(path, record):
+    from read_video_metadata import probe_video, read_mov_metadata
+
+    probe = probe_video(path)
+    for field in ("width", "height", "codec", "rotation", "bitrate"):
+        record[field] = probe[field]
+    record["duration"] = round(probe["duration"], 3)
+    record["fps"] = round(probe["fps"], 3)
+    tags = read_mov_metadata(path)["tags"]
+    for field, keys in VIDEO_TAGS.items():
+        record[field] = next((_text(tags[k]) for k in keys if k in tags), None)
+
+
+def _image_fields(path, record):
+    from preflight import probe_other
+
+    probe = probe_other(path)
+    record["width"], record["height"] = probe["width"], probe["height"]
+
+
+def scan_file(path):
+    """One flat record (all FIELDS) for a file; failures land in 'error'"""
+    record = dict.fromkeys(FIELDS)
+    record["path"] = path
+    record["kind"] = kind = file_kind(path)
+    try:
+        st = os.stat(path)
+        record["size"] = st.st_size
+        record["mtime"] = datetime.fromtimestamp(int(st.st_mtime), timezone.utc).isoformat()
+        if kind in ("jpeg", "heif"):
+            _exif_fields(path, record)
+        elif kind == "video":
+            _video_fields(path, record)
+        elif kind == "image":
+            _image_fields(path, record)
+    except Exception as e:  # one bad file must not stop an inventory
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+# ============ INPUTS ============
+
+def walk(directory):
+    """Every supported file under directory (recursive, os.scandir, no hidden entries)"""
+    stack = [directory]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and file_kind(entry.name):
+                        yield entry.path
+        except OSError as e:
+            print(f"⚠ Cannot read {e.filename}: {e.strerror}", file=sys.stderr)
+
+
+def expand_inputs(inputs):
+    """Files, directories and glob patterns -> sorted, de-duplicated file list"""
+    paths = set()
+    for item in inputs:
+        item = os.path.expanduser(item)
+        matches = glob.glob(item, recursive=True) if glob.has_magic(item) else [item]
+        if not matches:
+            print(f"⚠ No match for {item}", file=sys.stderr)
+        for match in matches:
+            if os.path.isdir(match):
+                paths.update(walk(match))
+            elif os.path.isfile(match) and file_kind(match):
+                paths.add(match)
+    return sorted(paths)
+
+
+# ============ OUTPUT ============
+
+def write_records(records, out, fmt):
+    """Stream records as they arrive; returns (count, errors)"""
+    count = errors = 0
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+    for record in records:
+        if writer:
+            writer.writerow(record)
+        else:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+        errors += record["error"] is not None
+    return count, errors
+
+
+def scan(paths, jobs=None):
+    """Records for paths in input order, computed on a process pool"""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) < 2:
+        yield from map(scan_file, paths)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # map keeps input order while results stream in
+        yield from pool.map(scan_file, paths, chunksize=max(1, min(64, len(paths) // (jobs * 4))))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Inventory photo/video metadata as NDJSON or CSV")
+    parser.add_argument("inputs", nargs="+", help="Files, folders (scanned recursively) or glob patterns")
+    parser.add_argument("--format", "-f", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--output", "-o", help="Write to this file instead of stdout")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: CPU count)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("No supported files found.", file=sys.stderr)
+        return 2
+
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        count, errors = write_records(scan(paths, args.jobs), out, args.format)
+    finally:
+        if args.output:
+            out.close()
+    print(f"✓ {count} files scanned, {errors} with errors", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
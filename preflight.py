@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Pre-flight header scan
+Reads only the headers of every selected file - JPEG SOF, PNG IHDR, HEIC
+'ispe', MOV/MP4 'mvhd'/'tkhd' - in parallel, so corrupt or unsupported
+inputs are flagged before a long batch starts. Pixel counts and video
+durations are totalled and turned into a wall-time / output-size estimate
+from the per-stage costs below.
+"""
+
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import read_video_metadata
+from cloner_core import classify, load_pil
+from exif_reader import read_exif
+from jpeg_segments import read_header_segments
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Per-stage costs, measured on one core with `python benchmarks.py encoders` /
+# `jpeg-rewrite` / `video-copy` and Pillow decode timings of samples/
+COSTS = {
+    "decode_ms_per_mp": {"heic": 65.0, "other": 10.0},
+    "encode_ms_per_mp": {"standard": 4.3, "fast": 3.7, "compact": 22.8, "max": 23.3},
+    "output_mb_per_mp": {"standard": 0.30, "fast": 0.19, "compact": 0.18, "max": 0.31},
+    "jpeg_rewrite_ms": 1.2,       # per file, on top of I/O
+    "copy_mb_per_s": 800.0,       # sequential copy throughput (JPEG rewrite + video copy)
+    "video_patch_ms": 5.0,        # in-place moov rewrite
+}
+
+
+# ============ HEADER PROBES ============
+
+def probe_jpeg(path):
+    with open(path, 'rb') as f:
+        _, size = read_header_segments(f)  # raises on anything truncated before SOS
+    if size is None:
+        raise ValueError("No SOF segment - not a baseline/progressive JPEG")
+    return {"width": size[0], "height": size[1]}
+
+
+def probe_png(path):
+    with open(path, 'rb') as f:
+        header = f.read(33)
+    if not header.startswith(PNG_SIGNATURE) or header[12:16] != b'IHDR':
+        raise ValueError("Not a PNG file (bad signature or missing IHDR)")
+    width, height = struct.unpack_from('>II', header, 16)
+    return {"width": width, "height": height}
+
+
+def probe_heif(path):
+    """Primary image size from its 'ispe' property - meta box only, see exif_reader"""
+    size = read_exif(path).size
+    if size is None:
+        raise ValueError("No ispe property - image size unknown")
+    return {"width": size[0], "height": size[1]}
+
+
+def probe_video(path):
+    """Duration and frame size of the first video track - reads moov only"""
+    probe = read_video_metadata.probe_video(path)
+    return {"width": probe["width"], "height": probe["height"], "duration": probe["duration"]}
+
+
+def probe_other(path):
+    """WebP/BMP/GIF/TIFF: Pillow reads only the header on open"""
+    Image = load_pil()
+    if Image is None:
+        raise ValueError("Pillow not installed - cannot read this format")
+    with Image.open(path) as img:
+        return {"width": img.size[0], "height": img.size[1]}
+
+
+def probe_file(path):
+    """
+    Header facts for one file
+
+    Returns:
+        dict: path, kind, bytes, width, height, duration, error
+    """
+    kind = classify(path)
+    info = {"path": path, "kind": kind, "bytes": 0, "width": 0, "height": 0,
+            "duration": 0.0, "error": None}
+    try:
+        info["bytes"] = os.path.getsize(path)
+        ext = os.path.splitext(path)[1].lower()
+        if kind is None:
+            raise ValueError("Unsupported file type")
+        if info["bytes"] == 0:
+            raise ValueError("Empty file")
+        if kind == "jpeg":
+            info.update(probe_jpeg(path))
+        elif kind == "video":
+            info.update(probe_video(path))
+        elif ext == '.png':
+            info.update(probe_png(path))
+        elif ext in ('.heic', '.heif'):
+            info.update(probe_heif(path))
+        else:
+            info.update(probe_other(path))
+    except (OSError, ValueError, struct.error) as e:
+        info["error"] = str(e) or type(e).__name__
+    except Exception as e:  # Pillow raises its own types for unreadable images
+        info["error"] = f"{type(e).__name__}: {e}"
+    return info
+
+
+# ============ ESTIMATE ============
+
+def estimate_file(info, max_dimension=None, encoder_profile="standard"):
+    """(cpu_ms, io_ms, output_bytes) for one probed file"""
+    megapixels = info["width"] * info["height"] / 1e6
+    mb = info["bytes"] / 1e6
+    longest = max(info["width"], info["height"])
+    oversized = bool(max_dimension) and longest > max_dimension
+
+    if info["kind"] == "video":
+        return COSTS["video_patch_ms"], mb / COSTS["copy_mb_per_s"] * 1000, info["bytes"]
+    if info["kind"] == "jpeg" and not oversized:
+        return COSTS["jpeg_rewrite_ms"], mb / COSTS["copy_mb_per_s"] * 1000, info["bytes"]
+
+    # Conversion (or downscaled JPEG): decode + encode
+    out_mp = megapixels * (max_dimension / longest) ** 2 if oversized else megapixels
+    ext = os.path.splitext(info["path"])[1].lower()
+    if ext in ('.heic', '.heif'):
+        decode = COSTS["decode_ms_per_mp"]["heic"] * megapixels
+    else:
+        # JPEG draft decoding works at the reduced size
+        decode = COSTS["decode_ms_per_mp"]["other"] * (out_mp if info["kind"] == "jpeg" else megapixels)
+    encode = COSTS["encode_ms_per_mp"][encoder_profile] * out_mp
+    output_bytes = COSTS["output_mb_per_mp"][encoder_profile] * out_mp * 1e6
+    return decode + encode, 0.0, int(output_bytes)
+
+
+def scan(paths, jobs=None, max_dimension=None, encoder_profile="standard"):
+    """
+    Probe every file in parallel and total up the batch
+
+    Returns:
+        dict: files (per-file probe dicts), problems [(path, error)], counts
+        by kind, megapixels, video_seconds, input_bytes, est_seconds,
+        est_output_bytes
+    """
+    jobs = jobs or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=min(32, jobs * 4)) as pool:
+        files = list(pool.map(probe_file, paths))
+
+    report = {"files": files, "problems": [], "counts": {"jpeg": 0, "convert": 0, "video": 0},
+              "megapixels": 0.0, "video_seconds": 0.0, "input_bytes": 0,
+              "est_seconds": 0.0, "est_output_bytes": 0}
+    cpu_ms = 0.0
+    io_ms = 0.0
+    for info in files:
+        if info["error"]:
+            report["problems"].append((info["path"], info["error"]))
+            continue
+        report["counts"][info["kind"]] += 1
+        report["input_bytes"] += info["bytes"]
+        if info["kind"] == "video":
+            report["video_seconds"] += info["duration"]
+        else:
+            report["megapixels"] += info["width"] * info["height"] / 1e6
+        file_cpu, file_io, output_bytes = estimate_file(info, max_dimension, encoder_profile)
+        cpu_ms += file_cpu
+        io_ms += file_io
+        report["est_output_bytes"] += output_bytes
+
+    # CPU work spreads over the workers; copies share one disk
+    report["est_seconds"] = (cpu_ms / jobs + io_ms) / 1000
+    return report
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m {seconds % 60:02d}s"
+
+
+def format_report(report, max_problems=10):
+    """Multi-line human-readable summary"""
+    counts = report["counts"]
+    lines = [
+        f"{len(report['files'])} files: {counts['jpeg']} JPEG, {counts['convert']} to convert, "
+        f"{counts['video']} video",
+        f"{report['megapixels']:.0f} megapixels, {format_duration(report['video_seconds'])} of video, "
+        f"{report['input_bytes'] / 1e9:.2f} GB in",
+        f"Estimated: ~{format_duration(report['est_seconds'])}, "
+        f"~{report['est_output_bytes'] / 1e9:.2f} GB out",
+    ]
+    problems = report["problems"]
+    if problems:
+        lines.append(f"⚠ {len(problems)} file{'s' if len(problems) != 1 else ''} will fail:")
+        for path, error in problems[:max_problems]:
+            lines.append(f"  • {os.path.basename(path)}: {error}")
+        if len(problems) > max_problems:
+            lines.append(f"  ... and {len(problems) - max_problems} more")
+    else:
+        lines.append("✓ All files readable")
+    return "\n".join(lines)
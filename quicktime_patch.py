@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+In-place QuickTime metadata patcher
+Writes Keys metadata (moov/meta: hdlr 'mdta' + keys + ilst) and the
+movie/track/media header dates by rewriting only the moov atom - the media
+data (mdat) is never read or moved, so chunk offsets stay valid.
+
+This works when the new moov fits where the old one was:
+    - moov is the last top-level atom (the file is truncated and moov rewritten), or
+    - moov is followed by a 'free' atom with enough padding to absorb the growth,
+and moov/meta (if any) holds only Keys metadata - an iTunes-style meta would
+be lost in the rewrite.
+Otherwise patch_video_metadata returns False and the caller falls back to
+exiftool, which rewrites the whole file.
+"""
+
+import calendar
+import os
+import struct
+
+# Seconds between the QuickTime epoch (1904-01-01) and the Unix epoch
+MAC_EPOCH_OFFSET = 2082844800
+
+# Containers on the path to the headers we date-stamp
+DATE_CONTAINERS = {b'moov', b'trak', b'mdia'}
+DATED_HEADERS = {b'mvhd', b'tkhd', b'mdhd'}
+
+# Well-known ilst data type for UTF-8 text
+DATA_TYPE_UTF8 = 1
+
+
+def atom(atom_type, payload):
+    """Serialize one atom, using a 64-bit size when needed"""
+    if len(payload) + 8 > 0xFFFFFFFF:
+        return struct.pack('>I4sQ', 1, atom_type, len(payload) + 16) + payload
+    return struct.pack('>I4s', len(payload) + 8, atom_type) + payload
+
+
+def iter_atoms(data, start=0, end=None):
+    """Yield (type, offset, header_size, size) for sibling atoms in data[start:end]"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, atom_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size or offset + size > end:
+            raise ValueError(f"Corrupt atom {atom_type!r} at {offset}")
+        yield atom_type, offset, header_size, size
+        offset += size
+
+
+def top_level_atoms(f, file_size):
+    """(type, offset, size) of each top-level atom, reading only the headers"""
+    atoms = []
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(16)
+        size, atom_type = struct.unpack_from('>I4s', header)
+        if size == 1:
+            size = struct.unpack_from('>Q', header, 8)[0]
+        elif size == 0:
+            size = file_size - offset
+        if size < 8 or offset + size > file_size:
+            raise ValueError(f"Corrupt top-level atom {atom_type!r} at {offset}")
+        atoms.append((atom_type, offset, size))
+        offset += size
+    return atoms
+
+
+def parse_keys_meta(meta_payload):
+    """Existing Keys metadata from a moov/meta payload as {key: (data_type, value_bytes)}"""
+    keys = []
+    values = {}
+    for atom_type, offset, header_size, size in iter_atoms(meta_payload):
+        body = meta_payload[offset + header_size:offset + size]
+        if atom_type == b'keys':
+            (count,) = struct.unpack_from('>I', body, 4)
+            pos = 8
+            for _ in range(count):
+                key_size = struct.unpack_from('>I', body, pos)[0]
+                keys.append(body[pos + 8:pos + key_size].decode('utf-8', errors='replace'))
+                pos += key_size
+        elif atom_type == b'ilst':
+            for index, item_offset, item_header, item_size in iter_atoms(body):
+                item = body[item_offset + item_header:item_offset + item_size]
+                for data_type, d_offset, d_header, d_size in iter_atoms(item):
+                    if data_type == b'data':
+                        type_indicator = struct.unpack_from('>I', item, d_offset + d_header)[0]
+                        values[struct.unpack('>I', index)[0]] = (
+                            type_indicator & 0xFFFFFF, item[d_offset + d_header + 8:d_offset + d_size])
+                        break
+    return {key: values[i + 1] for i, key in enumerate(keys) if i + 1 in values}
+
+
+def build_keys_meta(items):
+    """moov/meta atom for {key: (data_type, value_bytes)} - QuickTime style, no version/flags"""
+    hdlr = atom(b'hdlr', b'\0' * 8 + b'mdta' + b'\0' * 12 + b'\0')
+    key_entries = b''.join(struct.pack('>I4s', len(k.encode()) + 8, b'mdta') + k.encode() for k in items)
+    keys = atom(b'keys', struct.pack('>II', 0, len(items)) + key_entries)
+    ilst = atom(b'ilst', b''.join(
+        atom(struct.pack('>I', i + 1), atom(b'data', struct.pack('>II', data_type, 0) + value))
+        for i, (data_type, value) in enumerate(items.values())
+    ))
+    return atom(b'meta', hdlr + keys + ilst)
+
+
+def _patch_dates(buf, start, end, timestamp):
+    """Set creation/modification time in every mvhd/tkhd/mdhd under buf[start:end]"""
+    for atom_type, offset, header_size, size in iter_atoms(buf, start, end):
+        body = offset + header_size
+        if atom_type in DATED_HEADERS:
+            if buf[body] == 1:  # version 1: 64-bit times
+                struct.pack_into('>QQ', buf, body + 4, timestamp, timestamp)
+            else:
+                struct.pack_into('>II', buf, body + 4, timestamp, timestamp)
+        elif atom_type in DATE_CONTAINERS:
+            _patch_dates(buf, body, offset + size, timestamp)
+
+
+def is_keys_meta(meta_payload):
+    """True if a moov/meta payload holds only mdta Keys metadata (what rebuild_moov can merge)"""
+    for atom_type, offset, header_size, size in iter_atoms(meta_payload):
+        if atom_type == b'hdlr':
+            handler = meta_payload[offset + header_size + 8:offset + header_size + 12]
+            if handler != b'mdta':
+                return False
+        elif atom_type not in (b'keys', b'ilst', b'free'):
+            return False
+    return True
+
+
+def rebuild_moov(moov, keys_items, date=None):
+    """
+    New moov bytes with merged Keys metadata and (optionally) new header dates
+
+    Returns None if moov has a meta box of another kind (e.g. iTunes
+    mdir/ilst) - rewriting it here would drop that metadata.
+
+    Args:
+        moov: Complete moov atom bytes
+        keys_items: {key: str} - e.g. {'com.apple.quicktime.model': '...'}
+        date: datetime for mvhd/tkhd/mdhd creation and modification times,
+            stored as given (no timezone conversion - same as exiftool's default)
+    """
+    header_size = 16 if struct.unpack_from('>I', moov)[0] == 1 else 8
+    children = []
+    existing = {}
+    for atom_type, offset, child_header, size in iter_atoms(moov, header_size):
+        if atom_type == b'meta':
+            payload = moov[offset + child_header:offset + size]
+            # ISO-style meta is a full box (4 bytes version/flags before its children)
+            if payload[4:8] not in (b'hdlr', b'keys', b'ilst'):
+                payload = payload[4:]
+            if not is_keys_meta(payload):
+                return None
+            existing.update(parse_keys_meta(payload))
+            continue
+        children.append(moov[offset:offset + size])
+
+    merged = dict(existing)
+    for key, value in keys_items.items():
+        merged[key] = (DATA_TYPE_UTF8, value.encode('utf-8'))
+    body = bytearray(b''.join(children) + build_keys_meta(merged))
+
+    if date is not None:
+        _patch_dates(body, 0, len(body), calendar.timegm(date.timetuple()) + MAC_EPOCH_OFFSET)
+    return atom(b'moov', bytes(body))
+
+
+def patch_video_metadata(path, keys_items, date=None):
+    """
+    Rewrite only the moov atom of a MOV/MP4 in place
+
+    Returns:
+        bool: True if patched, False if the new moov doesn't fit or the
+        existing meta can't be merged (nothing written)
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        atoms = top_level_atoms(f, file_size)
+        index = next((i for i, a in enumerate(atoms) if a[0] == b'moov'), None)
+        if index is None:
+            raise ValueError("No moov atom - not a QuickTime/MP4 file")
+        _, moov_offset, moov_size = atoms[index]
+        f.seek(moov_offset)
+        new_moov = rebuild_moov(f.read(moov_size), keys_items, date)
+        if new_moov is None:
+            return False
+
+        is_last = index == len(atoms) - 1
+        available = moov_size
+        if not is_last and atoms[index + 1][0] == b'free':
+            available += atoms[index + 1][2]
+
+        if is_last:
+            f.seek(moov_offset)
+            f.write(new_moov)
+            f.truncate()
+        elif len(new_moov) == available:
+            f.seek(moov_offset)
+            f.write(new_moov)
+        elif available - len(new_moov) >= 8:
+            padding = available - len(new_moov)
+            f.seek(moov_offset)
+            f.write(new_moov + struct.pack('>I4s', padding, b'free') + b'\0' * (padding - 8))
+        else:
+            return False
+    return True
+
@@ -4,11 +4,17 @@ Read video metadata from MOV/MP4 files
 Parses the QuickTime container format to extract metadata
 """
 
+import math
 import struct
 import os
+import sys
 import plistlib
+from array import array
+from bisect import bisect_right
 from datetime import datetime
 
+from quicktime_patch import iter_atoms, top_level_atoms
+
 def read_atom(f, size_limit=None):
     """Read a QuickTime atom"""
     start = f.tell()
@@ -17,7 +23,7 @@ def read_atom(f, size_limit=None):
         return None, None, None
     
     size, atom_type = struct.unpack('>I4s', header)
-    atom_type = atom_type.decode('ascii', errors='ignore')
+    atom_type = atom_type.decode('latin-1')  # keeps the © in iTunes atoms like ©nam
     
     if size == 1:  # Extended size
         size = struct.unpack('>Q', f.read(8))[0]
@@ -59,132 +65,622 @@ def parse_mvhd(data):
         'duration_seconds': duration / timescale if timescale else 0,
     }
 
-def find_all_strings(data, min_length=4):
-    """Find all printable strings in binary data"""
-    result = []
-    current = []
-    
-    for byte in data:
-        if 32 <= byte <= 126:
-            current.append(chr(byte))
+# Optional: NumPy for sample-table statistics
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Atoms whose children are atoms - everything else is a leaf we either decode or skip
+CONTAINER_ATOMS = {'moov', 'trak', 'mdia', 'minf', 'stbl', 'udta', 'meta',
+                   'edts', 'dinf', 'tref', 'mvex', 'moof', 'traf'}
+
+# iTunes-style text atoms under udta (and udta/meta/ilst)
+ITUNES_TEXT_ATOMS = {'©nam', '©ART', '©alb', '©day', '©too', '©cmt',
+                     '©mak', '©mod', '©swr', '©xyz', 'desc'}
+
+# Keywords that make a decoded string "interesting"
+INTERESTING_KEYWORDS = ['meta', 'ray', 'ban', 'model', 'make', 'device',
+                        'software', 'apple', 'iphone', 'samsung']
+
+
+# ============ TYPED METADATA (keys / ilst) ============
+
+# Well-known 'data' atom types from the QuickTime File Format spec:
+# code -> (name, struct format for fixed-size values or None)
+DATA_TYPES = {
+    0: ('binary', None),
+    1: ('utf8', None),
+    2: ('utf16', None),
+    3: ('sjis', None),
+    4: ('utf8_sort', None),
+    5: ('utf16_sort', None),
+    13: ('jpeg', None),
+    14: ('png', None),
+    21: ('int', None),       # big-endian signed, 1/2/3/4/8 bytes
+    22: ('uint', None),      # big-endian unsigned, 1/2/3/4/8 bytes
+    23: ('float32', '>f'),
+    24: ('float64', '>d'),
+    27: ('bmp', None),
+    28: ('atom', None),
+    65: ('int8', '>b'),
+    66: ('int16', '>h'),
+    67: ('int32', '>i'),
+    70: ('point', '>2f'),
+    71: ('dimensions', '>2f'),
+    72: ('rect', '>4f'),
+    74: ('int64', '>q'),
+    75: ('uint8', '>B'),
+    76: ('uint16', '>H'),
+    77: ('uint32', '>I'),
+    78: ('uint64', '>Q'),
+    79: ('affine', '>9d'),
+}
+
+TEXT_ENCODINGS = {1: 'utf-8', 2: 'utf-16-be', 3: 'shift_jis', 4: 'utf-8', 5: 'utf-16-be'}
+
+
+def decode_data_value(type_code, payload):
+    """Typed Python value of a 'data' atom payload (after type and locale)"""
+    if type_code in TEXT_ENCODINGS:
+        return payload.decode(TEXT_ENCODINGS[type_code], errors='replace')
+    if type_code in (21, 22):
+        if len(payload) not in (1, 2, 3, 4, 8):
+            return bytes(payload)
+        return int.from_bytes(payload, 'big', signed=type_code == 21)
+    fmt = DATA_TYPES.get(type_code, (None, None))[1]
+    if fmt and len(payload) == struct.calcsize(fmt):
+        values = struct.unpack(fmt, payload)
+        return values[0] if len(values) == 1 else values
+    return bytes(payload)  # images, binary and unknown types stay raw
+
+
+def parse_keys(data):
+    """
+    Key names from a 'keys' atom payload, in order (ilst item i is keys[i - 1])
+
+    Entries are namespace + name; 'mdta' keys are reverse-DNS names and are
+    returned as-is, other namespaces are prefixed ("udta:©nam").
+    """
+    (count,) = struct.unpack_from('>I', data, 4)
+    keys = []
+    pos = 8
+    for _ in range(count):
+        size, namespace = struct.unpack_from('>I4s', data, pos)
+        if size < 8 or pos + size > len(data):
+            raise ValueError(f"Corrupt keys entry at {pos}")
+        name = data[pos + 8:pos + size].decode('utf-8', errors='replace')
+        keys.append(name if namespace == b'mdta' else f"{namespace.decode('latin-1')}:{name}")
+        pos += size
+    return keys
+
+
+def parse_item_list(data, keys=None):
+    """
+    Typed values from an 'ilst' atom payload
+
+    With keys (QuickTime Keys metadata, hdlr 'mdta') items are 1-based key
+    indexes; without, item types are iTunes four-char codes such as '©nam',
+    and '----' items are named by their 'mean' and 'name' children.
+    Only the first 'data' atom of an item is used - the default locale.
+
+    Returns:
+        dict: key -> {'value': typed value, 'type': type name, 'locale': (country, language)}
+    """
+    items = {}
+    for item_type, offset, header_size, size in iter_atoms(data):
+        if keys is not None:
+            index = struct.unpack('>I', item_type)[0]
+            if not 1 <= index <= len(keys):
+                continue
+            key = keys[index - 1]
         else:
-            if len(current) >= min_length:
-                result.append(''.join(current))
-            current = []
-    
-    if len(current) >= min_length:
-        result.append(''.join(current))
-    
-    return result
+            key = item_type.decode('latin-1')
+        names = {}
+        for child, c_offset, c_header, c_size in iter_atoms(data, offset + header_size, offset + size):
+            body = data[c_offset + c_header:c_offset + c_size]
+            if child in (b'mean', b'name'):
+                names[child] = body[4:].decode('utf-8', errors='replace')  # full box
+            elif child == b'data' and len(body) >= 8:
+                type_indicator, country, language = struct.unpack_from('>IHH', body)
+                type_code = type_indicator & 0xFFFFFF
+                if key == '----' and names:
+                    key = f"{names.get(b'mean', '')}:{names.get(b'name', '')}"
+                items[key] = {
+                    'value': decode_data_value(type_code, body[8:]),
+                    'type': DATA_TYPES.get(type_code, (f'type{type_code}', None))[0],
+                    'locale': (country, language),
+                }
+                break
+    return items
+
+
+def decode_meta(f, payload_start, end, metadata):
+    """Decode keys + ilst of one 'meta' atom into metadata['tags'] / ['tag_types']"""
+    f.seek(payload_start)
+    data = f.read(end - payload_start)
+    keys = None
+    items = {}
+    try:
+        for atom_type, offset, header_size, size in iter_atoms(data):
+            body = data[offset + header_size:offset + size]
+            if atom_type == b'keys':
+                keys = parse_keys(body)
+                metadata['raw_metadata']['keys'] = keys
+            elif atom_type == b'ilst':
+                items = parse_item_list(body, keys)
+    except (ValueError, struct.error) as e:
+        metadata['raw_metadata']['meta_error'] = str(e)
+    for key, item in items.items():
+        metadata['tags'][key] = item['value']
+        metadata['tag_types'][key] = {'type': item['type'], 'locale': item['locale']}
+    texts = [item['value'] for item in items.values() if isinstance(item['value'], str)]
+    metadata['interesting_strings'].extend(interesting(texts))
+
+
+def parse_udta_text(data):
+    """
+    Text of a QuickTime user-data '©xxx' atom under udta: a list of
+    (16-bit length, 16-bit language, text) records, first one returned
+    """
+    if len(data) < 4:
+        return None
+    if data[4:8] == b'data':  # some writers use an iTunes-style data atom here
+        size, _, type_indicator = struct.unpack_from('>I4sI', data)
+        value = decode_data_value(type_indicator & 0xFFFFFF, data[16:size])
+        return value if isinstance(value, str) else None
+    length, _language = struct.unpack_from('>HH', data)
+    return data[4:4 + length].decode('utf-8', errors='replace')
+
+
+def meta_children_offset(f, payload_start):
+    """
+    Where the children of a 'meta' atom start
+
+    QuickTime's moov/meta is a plain container, but ISO/iTunes meta
+    (udta/meta) is a full box with 4 bytes of version/flags first. Peek at
+    the first child's type to tell them apart.
+    """
+    f.seek(payload_start)
+    peek = f.read(12)
+    if len(peek) >= 8 and peek[4:8] in (b'hdlr', b'keys', b'ilst', b'free'):
+        return payload_start
+    return payload_start + 4
+
+
+def decode_leaf(f, atom_type, payload_start, data_size, metadata):
+    """Read and decode the payload of an atom we understand; returns False to skip it"""
+    if atom_type == 'mvhd':
+        f.seek(payload_start)
+        metadata['raw_metadata']['mvhd'] = parse_mvhd(f.read(min(data_size, 120)))
+    elif atom_type == 'ftyp':
+        f.seek(payload_start)
+        data = f.read(min(data_size, 32))
+        metadata['raw_metadata']['brand'] = data[:4].decode('ascii', errors='ignore')
+    elif atom_type in ITUNES_TEXT_ATOMS:
+        # Directly under udta (items under ilst are decoded with their meta)
+        f.seek(payload_start)
+        text = parse_udta_text(f.read(min(data_size, 1024)))
+        if text:
+            metadata['tags'][atom_type] = text
+            metadata['tag_types'][atom_type] = {'type': 'utf8', 'locale': (0, 0)}
+            metadata['interesting_strings'].extend(interesting([text]))
+    elif atom_type == 'XMP_':
+        # XMP metadata
+        f.seek(payload_start)
+        xmp_str = f.read(min(data_size, 65536)).decode('utf-8', errors='ignore')
+        metadata['raw_metadata']['xmp'] = xmp_str[:2000]  # First 2000 chars
+    else:
+        return False
+    return True
+
+
+def interesting(strings):
+    """
+    Decoded strings that mention one of INTERESTING_KEYWORDS
+
+    All strings are joined into one lower-cased buffer and each keyword is
+    located with str.find, instead of lower-casing and scanning every string
+    once per keyword. Hits map back to strings by bisecting the recorded
+    start offsets (strings may contain NULs themselves).
+    """
+    lowered = [s.lower() for s in strings]
+    starts = []
+    pos = 0
+    for s in lowered:
+        starts.append(pos)
+        pos += len(s) + 1
+    blob = '\0'.join(lowered)
+
+    hits = set()
+    for keyword in INTERESTING_KEYWORDS:
+        pos = blob.find(keyword)
+        while pos != -1:
+            hits.add(bisect_right(starts, pos) - 1)
+            pos = blob.find(keyword, pos + 1)
+    return [strings[i] for i in sorted(hits) if len(strings[i]) >= 5]
+
+
+def walk_atoms(f, start, end, depth, metadata):
+    """
+    Depth-first walk of the atoms in [start, end)
+
+    Containers are descended into; leaves are only read when decode_leaf
+    knows them, so media data and sample tables cost one header read each.
+    """
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        atom_type, size, header_size = read_atom(f)
+        if not atom_type:
+            break
+        if size == 0 or pos + size > end:
+            size = end - pos  # size 0 (or damaged size) runs to the end of the parent
+        if size < header_size:
+            break
+
+        metadata['atoms'].append({
+            'type': atom_type,
+            'offset': pos,
+            'size': size,
+            'depth': depth,
+        })
+
+        payload_start = pos + header_size
+        if atom_type in CONTAINER_ATOMS:
+            if atom_type == 'meta':
+                payload_start = meta_children_offset(f, payload_start)
+            walk_atoms(f, payload_start, pos + size, depth + 1, metadata)
+            if atom_type == 'meta':
+                decode_meta(f, payload_start, pos + size, metadata)
+        else:
+            decode_leaf(f, atom_type, payload_start, size - header_size, metadata)
+        pos += size
+
 
 def read_mov_metadata(filepath):
     """Read metadata from a MOV/MP4 file"""
+    file_size = os.path.getsize(filepath)
     metadata = {
         'file': os.path.basename(filepath),
-        'size_mb': os.path.getsize(filepath) / 1024 / 1024,
+        'size_mb': file_size / 1024 / 1024,
         'atoms': [],
+        'tags': {},         # key -> typed value, e.g. 'com.apple.quicktime.model' -> 'Ray-Ban Stories'
+        'tag_types': {},    # key -> {'type': 'utf8', 'locale': (country, language)}
         'interesting_strings': [],
         'raw_metadata': {}
     }
     
-    with open(filepath, 'rb') as f:
-        file_size = os.path.getsize(filepath)
-        
-        while f.tell() < file_size:
-            atom_type, size, header_size = read_atom(f)
-            if not atom_type:
-                break
-            
-            atom_start = f.tell() - header_size
-            metadata['atoms'].append({
-                'type': atom_type,
-                'offset': atom_start,
-                'size': size
-            })
-            
-            # Container atoms - recurse into them
-            container_atoms = ['moov', 'trak', 'mdia', 'minf', 'stbl', 'udta', 'meta']
-            
-            if atom_type in container_atoms:
-                # Just note it, continue reading children
-                continue
-            
-            # Read interesting atoms
-            data_size = size - header_size
-            
-            if atom_type == 'mvhd':
-                data = f.read(min(data_size, 120))
-                mvhd = parse_mvhd(data)
-                metadata['raw_metadata']['mvhd'] = mvhd
-                f.seek(atom_start + size)
-                
-            elif atom_type == 'ftyp':
-                data = f.read(min(data_size, 32))
-                brand = data[:4].decode('ascii', errors='ignore')
-                metadata['raw_metadata']['brand'] = brand
-                f.seek(atom_start + size)
-                
-            elif atom_type in ['©nam', '©ART', '©alb', '©day', '©too', '©cmt', 
-                               '©mak', '©mod', '©swr', '©xyz', 'desc']:
-                # iTunes-style metadata
-                data = f.read(min(data_size, 1024))
-                strings = find_all_strings(data)
-                if strings:
-                    metadata['raw_metadata'][atom_type] = strings
-                f.seek(atom_start + size)
-                
-            elif atom_type == 'keys':
-                data = f.read(min(data_size, 4096))
-                strings = find_all_strings(data)
-                metadata['raw_metadata']['keys'] = strings
-                f.seek(atom_start + size)
-                
-            elif atom_type == 'mdta':
-                data = f.read(min(data_size, 4096))
-                strings = find_all_strings(data)
-                if strings:
-                    metadata['raw_metadata']['mdta'] = strings
-                f.seek(atom_start + size)
-                
-            elif atom_type == 'ilst':
-                # Item list - contains metadata
-                data = f.read(min(data_size, 8192))
-                strings = find_all_strings(data, 3)
-                metadata['raw_metadata']['ilst_strings'] = strings
-                f.seek(atom_start + size)
-            
-            elif atom_type == 'XMP_':
-                # XMP metadata
-                data = f.read(min(data_size, 65536))
-                try:
-                    xmp_str = data.decode('utf-8', errors='ignore')
-                    metadata['raw_metadata']['xmp'] = xmp_str[:2000]  # First 2000 chars
-                except:
-                    pass
-                f.seek(atom_start + size)
-            
-            else:
-                # Skip other atoms but look for interesting strings in small ones
-                if data_size < 10000:
-                    data = f.read(data_size)
-                    strings = [s for s in find_all_strings(data, 5) 
-                              if any(kw in s.lower() for kw in 
-                                    ['meta', 'ray', 'ban', 'model', 'make', 'device', 
-                                     'software', 'apple', 'iphone', 'samsung'])]
-                    if strings:
-                        metadata['interesting_strings'].extend(strings)
-                else:
-                    f.seek(atom_start + size)
+    # Small buffer: each header read pulls in 4 KB, not the default 8+ KB
+    with open(filepath, 'rb', buffering=4096) as f:
+        walk_atoms(f, 0, file_size, 0, metadata)
     
     return metadata
 
-def main():
-    samples_dir = "/Users/bpmadmin/Charitycase/samples"
-    
-    video_files = [f for f in os.listdir(samples_dir) if f.lower().endswith(('.mov', '.mp4'))]
+# ============ PROBE (codec / dimensions / duration / bitrate) ============
+
+# Containers on the path from moov to the sample tables
+PROBE_CONTAINERS = {b'trak', b'mdia', b'minf', b'stbl'}
+
+AVC_PROFILES = {66: 'Baseline', 77: 'Main', 88: 'Extended', 100: 'High', 110: 'High 10',
+                122: 'High 4:2:2', 244: 'High 4:4:4 Predictive'}
+HEVC_PROFILES = {1: 'Main', 2: 'Main 10', 3: 'Main Still Picture', 4: 'Range Extensions'}
+
+# Sample tables decoded by sample_table_stats
+SAMPLE_TABLE_ATOMS = {b'stts', b'stsz', b'stz2', b'stsc', b'stco', b'co64', b'stss'}
+
+# Visual sample entries: 78 bytes of fixed fields before their child boxes (avcC, hvcC, ...)
+VISUAL_ENTRY_FIELDS = 78
+
+
+def _stsz_total(body):
+    """(sample_count, total_bytes) from an stsz payload - summed in C, no Python loop"""
+    sample_size, count = struct.unpack_from('>II', body, 4)
+    if sample_size:
+        return count, sample_size * count
+    sizes = array('I', body[12:12 + 4 * count])
+    if sys.byteorder == 'little':
+        sizes.byteswap()
+    return count, sum(sizes)
+
+
+def _codec_profile(fourcc, entry, start):
+    """Profile/level string from the avcC / hvcC child of a visual sample entry"""
+    for child, offset, header_size, size in iter_atoms(entry, start):
+        body = entry[offset + header_size:offset + size]
+        if child == b'avcC' and len(body) >= 4:
+            name = AVC_PROFILES.get(body[1], f'profile {body[1]}')
+            return f"{name}@L{body[3] / 10:g}"
+        if child == b'hvcC' and len(body) >= 13:
+            profile = body[1] & 0x1F
+            tier = 'High' if body[1] & 0x20 else 'Main'
+            name = HEVC_PROFILES.get(profile, f'profile {profile}')
+            return f"{name}@L{body[12] / 30:g} ({tier} tier)"
+    return None
+
+
+def _parse_stsd(body, track):
+    """Codec FourCC, profile and entry-level facts from the first sample description"""
+    if len(body) < 16:
+        return
+    entry_size, fourcc = struct.unpack_from('>I4s', body, 8)
+    entry = body[8:8 + entry_size]
+    track['codec'] = fourcc.decode('latin-1')
+    if track['type'] == 'vide' and len(entry) >= 8 + VISUAL_ENTRY_FIELDS:
+        track['profile'] = _codec_profile(fourcc, entry, 8 + VISUAL_ENTRY_FIELDS)
+    elif track['type'] == 'soun' and len(entry) >= 36:
+        track['channels'], = struct.unpack_from('>H', entry, 24)
+        track['sample_rate'] = struct.unpack_from('>I', entry, 32)[0] >> 16
+
+
+def _parse_tkhd(body, track):
+    """Frame size and rotation: the 3x3 matrix and 16.16 width/height end the box"""
+    a, b = struct.unpack_from('>ii', body, len(body) - 44)
+    width, height = struct.unpack_from('>II', body, len(body) - 8)
+    track['width'], track['height'] = width >> 16, height >> 16
+    track['rotation'] = int(round(math.degrees(math.atan2(b, a)))) % 360
+
+
+def _parse_mdhd(body, track):
+    if body[0] == 1:
+        timescale, duration = struct.unpack_from('>IQ', body, 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', body, 12)
+    track['timescale'] = timescale
+    track['duration'] = duration / timescale if timescale else 0.0
+
+
+def _walk_track(data, start, end, track, tables=None):
+    """Fill track with header facts; raw sample table payloads go into tables if given"""
+    for atom_type, offset, header_size, size in iter_atoms(data, start, end):
+        body = data[offset + header_size:offset + size]
+        if tables is not None and atom_type in SAMPLE_TABLE_ATOMS:
+            tables[atom_type] = body
+        if atom_type in PROBE_CONTAINERS:
+            _walk_track(data, offset + header_size, offset + size, track, tables)
+        elif atom_type == b'tkhd':
+            _parse_tkhd(body, track)
+        elif atom_type == b'mdhd':
+            _parse_mdhd(body, track)
+        elif atom_type == b'hdlr':
+            track['type'] = body[8:12].decode('latin-1')
+        elif atom_type == b'stsd':
+            _parse_stsd(body, track)
+        elif atom_type == b'stsz':
+            track['sample_count'], track['bytes'] = _stsz_total(body)
+        elif atom_type == b'stss':
+            track['keyframes'] = struct.unpack_from('>I', body, 4)[0]
+
+
+def read_moov(path):
+    """The moov atom's bytes - the only part of the file a probe needs"""
+    with open(path, 'rb') as f:
+        atoms = top_level_atoms(f, os.path.getsize(path))
+        moov = next((a for a in atoms if a[0] == b'moov'), None)
+        if moov is None:
+            raise ValueError("No moov atom - incomplete or not a QuickTime/MP4 file")
+        f.seek(moov[1])
+        return f.read(moov[2])
+
+
+def _new_track():
+    return {'type': None, 'codec': None, 'profile': None, 'width': 0, 'height': 0,
+            'rotation': 0, 'duration': 0.0, 'timescale': 0, 'sample_count': 0,
+            'bytes': 0, 'bitrate': 0, 'keyframes': None}
+
+
+def probe_video(path):
+    """
+    Codec, dimensions, duration and bitrate from the moov headers alone
+
+    Reads only the moov atom (no media data, no ffprobe). Raises ValueError
+    for files without a usable moov.
+
+    Returns:
+        dict: duration (s, from mvhd), width/height/rotation/codec/profile/fps
+        of the first video track, bitrate (bits/s over all tracks), and
+        tracks - one dict per trak with type, codec, profile, width, height,
+        rotation, duration, timescale, sample_count, bytes, bitrate, keyframes
+        (plus channels/sample_rate for audio)
+    """
+    data = read_moov(path)
+    header_size = 16 if struct.unpack_from('>I', data)[0] == 1 else 8
+    duration = None
+    tracks = []
+    for atom_type, offset, child_header, size in iter_atoms(data, header_size):
+        if atom_type == b'mvhd':
+            duration = parse_mvhd(data[offset + child_header:offset + size])['duration_seconds']
+        elif atom_type == b'trak':
+            track = _new_track()
+            _walk_track(data, offset + child_header, offset + size, track)
+            if track['duration']:
+                track['bitrate'] = int(track['bytes'] * 8 / track['duration'])
+            tracks.append(track)
+    if duration is None:
+        raise ValueError("No mvhd - movie header missing")
+
+    video = next((t for t in tracks if t['type'] == 'vide'), None) or {}
+    total_bytes = sum(t['bytes'] for t in tracks)
+    return {
+        'duration': duration,
+        'width': video.get('width', 0),
+        'height': video.get('height', 0),
+        'rotation': video.get('rotation', 0),
+        'codec': video.get('codec'),
+        'profile': video.get('profile'),
+        'fps': video['sample_count'] / video['duration'] if video.get('duration') else 0.0,
+        'bitrate': int(total_bytes * 8 / duration) if duration else 0,
+        'tracks': tracks,
+    }
+
+
+# ============ SAMPLE TABLES (NumPy) ============
+
+def _table(body, dtype, columns=1):
+    """Entries of a full-box table with a 32-bit entry count, as a read-only array view"""
+    (count,) = struct.unpack_from('>I', body, 4)
+    values = np.frombuffer(body, dtype, count * columns, 8)
+    return values.reshape(count, columns) if columns > 1 else values
+
+
+def _sample_sizes(tables):
+    if b'stsz' in tables:
+        body = tables[b'stsz']
+        sample_size, count = struct.unpack_from('>II', body, 4)
+        if sample_size:
+            return np.full(count, sample_size, np.int64)
+        return np.frombuffer(body, '>u4', count, 12).astype(np.int64)
+    if b'stz2' in tables:  # compact sizes: 4, 8 or 16 bits per sample
+        body = tables[b'stz2']
+        field_size, count = body[7], struct.unpack_from('>I', body, 8)[0]
+        if field_size == 4:
+            packed = np.frombuffer(body, np.uint8, (count + 1) // 2, 12)
+            return np.column_stack((packed >> 4, packed & 0x0F)).ravel()[:count].astype(np.int64)
+        return np.frombuffer(body, '>u1' if field_size == 8 else '>u2', count, 12).astype(np.int64)
+    raise ValueError("No stsz/stz2 - sample sizes missing")
+
+
+def decode_sample_tables(tables):
+    """
+    Per-sample arrays from raw stbl payloads - all vectorized, no per-sample Python
+
+    Returns:
+        dict: times and durations (media timescale units), sizes and file
+        offsets (bytes), keyframes (0-based sample indexes, None if every
+        sample is a sync sample)
+    """
+    stts = _table(tables[b'stts'], '>u4', 2)
+    durations = np.repeat(stts[:, 1].astype(np.int64), stts[:, 0])
+    times = np.cumsum(durations) - durations
+    sizes = _sample_sizes(tables)
+
+    # Chunk offsets, and which chunk each sample lives in (stsc is run-length coded)
+    if b'co64' in tables:
+        chunk_offsets = _table(tables[b'co64'], '>u8').astype(np.int64)
+    else:
+        chunk_offsets = _table(tables[b'stco'], '>u4').astype(np.int64)
+    stsc = _table(tables[b'stsc'], '>u4', 3).astype(np.int64)
+    run_lengths = np.diff(np.append(stsc[:, 0], len(chunk_offsets) + 1))
+    per_chunk = np.repeat(stsc[:, 1], run_lengths)
+    chunk_of_sample = np.repeat(np.arange(len(per_chunk)), per_chunk)[:len(sizes)]
+    if len(chunk_of_sample) < len(sizes) or len(durations) < len(sizes):
+        raise ValueError("Sample tables disagree on the sample count")
+    # Offset within the chunk = bytes of the earlier samples in the same chunk
+    before = np.cumsum(sizes) - sizes
+    chunk_first = (np.cumsum(per_chunk) - per_chunk)[chunk_of_sample]
+    offsets = chunk_offsets[chunk_of_sample] + before - before[chunk_first]
+
+    keyframes = None
+    if b'stss' in tables:
+        keyframes = _table(tables[b'stss'], '>u4').astype(np.int64) - 1
+    return {'times': times[:len(sizes)], 'durations': durations[:len(sizes)],
+            'sizes': sizes, 'offsets': offsets, 'keyframes': keyframes}
+
+
+def _track_stats(track, samples, bucket_seconds):
+    timescale = track['timescale'] or 1
+    durations = samples['durations']
+    total = int(durations.sum())
+    stats = {'type': track['type'], 'codec': track['codec'], 'samples': len(samples['sizes'])}
+
+    positive = durations[durations > 0]
+    stats['fps'] = len(durations) * timescale / total if total else 0.0
+    stats['fps_min'] = float(timescale / positive.max()) if len(positive) else 0.0
+    stats['fps_max'] = float(timescale / positive.min()) if len(positive) else 0.0
+    stats['variable_frame_rate'] = bool(len(positive) and positive.min() != positive.max())
+
+    # Bits per time bucket -> bitrate over time (at least one tick per bucket)
+    bucket_ticks = max(1, int(bucket_seconds * timescale))
+    buckets = (samples['times'] // bucket_ticks).astype(np.int64)
+    bits = np.bincount(buckets, weights=samples['sizes'] * 8.0) if len(buckets) else np.zeros(0)
+    seconds = np.full(len(bits), bucket_ticks / timescale)
+    if len(bits):
+        # The last bucket usually ends early - divide by the time it really covers
+        end = int(samples['times'][-1] + durations[-1])
+        seconds[-1] = max(end - (len(bits) - 1) * bucket_ticks, 1) / timescale
+    stats['bitrate_over_time'] = bits / seconds
+    # min/max over whole buckets only: a short tail is too noisy to compare
+    whole = stats['bitrate_over_time']
+    if len(bits) > 1 and seconds[-1] < seconds[0]:
+        whole = whole[:-1]
+    stats['bitrate_min'] = float(whole.min()) if len(bits) else 0.0
+    stats['bitrate_max'] = float(whole.max()) if len(bits) else 0.0
+
+    keyframes = samples['keyframes']
+    if keyframes is not None and len(keyframes) > 1:
+        gaps = np.diff(samples['times'][keyframes]) / timescale
+        stats['keyframe_interval'] = float(gaps.mean())
+        stats['keyframe_interval_max'] = float(gaps.max())
+    else:
+        stats['keyframe_interval'] = stats['keyframe_interval_max'] = None
+    return stats
+
+
+def _interleave(a, b):
+    """
+    Bytes between samples of two tracks that play at the same moment - how
+    far a player has to read ahead to keep both fed
+    """
+    a_seconds = a['samples']['times'] / (a['track']['timescale'] or 1)
+    b_seconds = b['samples']['times'] / (b['track']['timescale'] or 1)
+    if not len(a_seconds) or not len(b_seconds):
+        return None
+    nearest = np.clip(np.searchsorted(b_seconds, a_seconds, side='right') - 1, 0, len(b_seconds) - 1)
+    distance = np.abs(a['samples']['offsets'] - b['samples']['offsets'][nearest])
+    return {'mean_bytes': float(distance.mean()), 'max_bytes': int(distance.max())}
+
+
+def sample_table_stats(path, bucket_seconds=1.0):
+    """
+    Frame-level statistics for QA of processed videos, from the sample tables
+
+    Needs NumPy. Reads only the moov atom; every table is decoded with
+    np.frombuffer and processed in vectorized form, so hour-long recordings
+    with millions of samples take a fraction of a second.
+
+    Returns:
+        dict: tracks - per track type, codec, samples, fps (mean/min/max,
+        variable_frame_rate), bitrate_over_time (bits/s per bucket, NumPy
+        array) with its min/max, keyframe_interval (mean/max seconds);
+        interleave - mean/max byte distance between the first video track
+        and the first audio track at equal timestamps (None without both)
+    """
+    if not HAS_NUMPY:
+        raise RuntimeError("Sample table statistics need NumPy (pip install numpy)")
+    data = read_moov(path)
+    header_size = 16 if struct.unpack_from('>I', data)[0] == 1 else 8
+    decoded = []
+    for atom_type, offset, child_header, size in iter_atoms(data, header_size):
+        if atom_type != b'trak':
+            continue
+        track, tables = _new_track(), {}
+        _walk_track(data, offset + child_header, offset + size, track, tables)
+        if b'stts' in tables and (b'stco' in tables or b'co64' in tables):
+            decoded.append({'track': track, 'samples': decode_sample_tables(tables)})
+
+    video = next((d for d in decoded if d['track']['type'] == 'vide'), None)
+    audio = next((d for d in decoded if d['track']['type'] == 'soun'), None)
+    return {
+        'tracks': [_track_stats(d['track'], d['samples'], bucket_seconds) for d in decoded],
+        'interleave': _interleave(video, audio) if video and audio else None,
+    }
+
+
+def main(argv=None):
+    """Dump the MOV/MP4 files given as arguments (default: the repo's samples folder)"""
+    args = sys.argv[1:] if argv is None else argv
+    paths = args or [os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")]
+    video_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            video_files.extend(sorted(os.path.join(path, f) for f in os.listdir(path)
+                                      if f.lower().endswith(('.mov', '.mp4'))))
+        else:
+            video_files.append(path)
     
-    for video_file in video_files:
-        filepath = os.path.join(samples_dir, video_file)
+    for filepath in video_files:
+        video_file = os.path.basename(filepath)
         print(f"\n{'='*80}")
         print(f"VIDEO: {video_file}")
         print(f"{'='*80}")
@@ -197,12 +693,30 @@ def main():
         # Show atom structure
         print("\nAtom structure:")
         for atom in metadata['atoms'][:30]:  # First 30
-            print(f"  {atom['type']:8} at {atom['offset']:8} size {atom['size']:8}")
+            indent = '  ' * atom['depth']
+            print(f"  {indent}{atom['type']:8} at {atom['offset']:8} size {atom['size']:8}")
+        
+        if metadata['tags']:
+            print("\nTags:")
+            for key, value in metadata['tags'].items():
+                print(f"  {key} [{metadata['tag_types'][key]['type']}]: {value}")
         
         print("\nRaw metadata:")
         for key, value in metadata['raw_metadata'].items():
             print(f"  {key}: {value}")
         
+        if HAS_NUMPY:
+            stats = sample_table_stats(filepath)
+            print("\nSample tables:")
+            for track in stats['tracks']:
+                interval = track['keyframe_interval']
+                print(f"  {track['type']}: {track['samples']} samples, {track['fps']:.2f} fps"
+                      f" ({track['fps_min']:.2f}-{track['fps_max']:.2f}),"
+                      f" {track['bitrate_min'] / 1000:.0f}-{track['bitrate_max'] / 1000:.0f} kb/s"
+                      + (f", keyframe every {interval:.2f} s" if interval else ""))
+            if stats['interleave']:
+                print(f"  A/V interleave: {stats['interleave']['max_bytes'] / 1024:.0f} KB max")
+        
         if metadata['interesting_strings']:
             print("\nInteresting strings found:")
             for s in set(metadata['interesting_strings']):
@@ -0,0 +1,37 @@
+import os
+import sys
+
+# The modules are flat scripts at the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLES_DIR = os.path.join(ROOT, "samples")
+
+
+def make_mov(path, layout="end", free=0, meta=b"", mdat_size=4096):
+    """
+    Minimal MOV: ftyp, mdat and a moov with mvhd + one trak (tkhd, mdia/mdhd)
+
+    layout "end" puts moov after mdat; "start" puts it first, followed by a
+    free atom of `free` bytes (0 = none) and then mdat. `meta` is appended
+    inside moov as-is.
+    """
+    import struct
+
+    from quicktime_patch import atom
+
+    def full(atom_type, payload):
+        return atom(atom_type, b"\0\0\0\0" + payload)
+
+    moov = atom(b"moov",
+                full(b"mvhd", struct.pack(">IIII", 1, 2, 600, 6000) + bytes(80))
+                + atom(b"trak", full(b"tkhd", struct.pack(">IIII", 1, 2, 1, 0) + bytes(64))
+                       + atom(b"mdia", full(b"mdhd", struct.pack(">IIII", 1, 2, 600, 6000) + bytes(4))))
+                + meta)
+    ftyp = atom(b"ftyp", b"qt  \0\0\0\0qt  ")
+    mdat = atom(b"mdat", bytes(range(256)) * (mdat_size // 256))
+    padding = atom(b"free", bytes(free - 8)) if free else b""
+    data = ftyp + mdat + moov if layout == "end" else ftyp + moov + padding + mdat
+    with open(path, "wb") as f:
+        f.write(data)
+    return data
@@ -0,0 +1,83 @@
+import os
+
+import piexif
+import pytest
+from PIL import Image
+
+from conftest import SAMPLES_DIR
+from exif_reader import read_exif
+
+JPEG_SAMPLES = [
+    "photo-2712_singular_display_fullPicture.JPG",
+    "IMG_3777_20251203_195329_377990.JPEG",
+    "Murphi Kennedy-578899 2.JPEG",
+]
+IFDS = ("0th", "Exif", "GPS")
+
+
+def _assert_matches_piexif(exif, expected):
+    """
+    Same tags and values as piexif.load, modulo its conventions
+
+    piexif returns ASCII as NUL-terminated bytes (read_exif: str) and drops
+    tags missing from its table (e.g. CompositeImage), which read_exif keeps.
+    """
+    for ifd in IFDS:
+        ours = dict(exif.ifd(ifd).items())
+        theirs = {}
+        for tag, value in expected[ifd].items():
+            if isinstance(value, bytes) and isinstance(ours.get(tag), str):
+                value = value.rstrip(b"\0").decode("latin-1")
+            theirs[tag] = value
+        ours = {tag: value for tag, value in ours.items() if tag in piexif.TAGS[ifd]}
+        assert ours == theirs, ifd
+
+
+@pytest.mark.parametrize("name", JPEG_SAMPLES)
+def test_jpeg_matches_piexif(name):
+    path = os.path.join(SAMPLES_DIR, name)
+    _assert_matches_piexif(read_exif(path), piexif.load(path))
+
+
+@pytest.mark.parametrize("name", JPEG_SAMPLES)
+def test_jpeg_size_is_sof_size(name):
+    path = os.path.join(SAMPLES_DIR, name)
+    with Image.open(path) as img:
+        assert read_exif(path).size == img.size
+
+
+def test_jpeg_values():
+    exif = read_exif(os.path.join(SAMPLES_DIR, "photo-2712_singular_display_fullPicture.JPG"))
+    assert exif.get(piexif.ImageIFD.Make, "0th") == "Meta AI"
+    assert exif.get(piexif.ImageIFD.Model, "0th") == "Ray-Ban Stories"
+
+
+def test_truncated_jpeg_raises():
+    with pytest.raises(ValueError):
+        read_exif(os.path.join(SAMPLES_DIR, "Attachment-1-converted.jpg"))
+
+
+# ============ HEIF ============
+
+HEIF_SAMPLES = {
+    # name: (Make, Model, ispe size - stored before the irot rotation is applied)
+    "IMG_1173.HEIC": ("Apple", "iPhone 12", (4032, 3024)),
+    "Attachment-1.heic": ("Meta AI", "Ray-Ban Meta Smart Glasses 2", (3024, 4032)),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HEIF_SAMPLES))
+def test_heif_matches_piexif(name):
+    pillow_heif = pytest.importorskip("pillow_heif")
+    path = os.path.join(SAMPLES_DIR, name)
+    expected = piexif.load(pillow_heif.open_heif(path).info["exif"])
+    _assert_matches_piexif(read_exif(path), expected)
+
+
+@pytest.mark.parametrize("name", sorted(HEIF_SAMPLES))
+def test_heif_values(name):
+    make, model, size = HEIF_SAMPLES[name]
+    exif = read_exif(os.path.join(SAMPLES_DIR, name))
+    assert exif.get(piexif.ImageIFD.Make, "0th") == make
+    assert exif.get(piexif.ImageIFD.Model, "0th") == model
+    assert exif.size == size
@@ -0,0 +1,67 @@
+import io
+import os
+import shutil
+
+import piexif
+import pytest
+
+from cloner_core import create_rayban_exif_bytes
+from conftest import SAMPLES_DIR
+from jpeg_segments import rewrite_jpeg_exif
+
+JPEG_SAMPLES = ["photo-2712_singular_display_fullPicture.JPG",
+                "IMG_3777_20251203_195329_377990.JPEG",
+                "Murphi Kennedy-578899 2.JPEG"]
+
+
+def _piexif_rewrite(src, dst, exif):
+    """The copy2 + piexif.remove + piexif.insert sequence the rewriter replaced"""
+    shutil.copy2(src, dst)
+    piexif.remove(dst)
+    piexif.insert(exif, dst)
+
+
+def _jfif_jpeg(path):
+    Image = pytest.importorskip("PIL.Image")
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 30), (200, 10, 10)).save(buf, "JPEG")  # APP0 (JFIF), no EXIF
+    path.write_bytes(buf.getvalue())
+    return str(path)
+
+
+@pytest.mark.parametrize("name", JPEG_SAMPLES)
+def test_rewrite_matches_piexif_byte_for_byte(tmp_path, name):
+    src = os.path.join(SAMPLES_DIR, name)
+    exif = create_rayban_exif_bytes("metaspoof")
+    rewrite_jpeg_exif(src, str(tmp_path / "fast.jpg"), exif)
+    _piexif_rewrite(src, str(tmp_path / "piexif.jpg"), exif)
+    assert (tmp_path / "fast.jpg").read_bytes() == (tmp_path / "piexif.jpg").read_bytes()
+
+
+def test_rewrite_replaces_jfif_app0_like_piexif(tmp_path):
+    src = _jfif_jpeg(tmp_path / "jfif.jpg")
+    exif = create_rayban_exif_bytes("authentic")
+    rewrite_jpeg_exif(src, str(tmp_path / "fast.jpg"), exif)
+    _piexif_rewrite(src, str(tmp_path / "piexif.jpg"), exif)
+    assert (tmp_path / "fast.jpg").read_bytes() == (tmp_path / "piexif.jpg").read_bytes()
+
+
+def test_exif_callable_gets_sof_size(tmp_path):
+    src = os.path.join(SAMPLES_DIR, "photo-2712_singular_display_fullPicture.JPG")
+    seen = []
+
+    def exif(width, height):
+        seen.append((width, height))
+        return create_rayban_exif_bytes("metaspoof", width, height)
+
+    assert rewrite_jpeg_exif(src, str(tmp_path / "out.jpg"), exif) == (2592, 1944)
+    assert seen == [(2592, 1944)]
+    written = piexif.load(str(tmp_path / "out.jpg"))
+    assert written["Exif"][piexif.ExifIFD.PixelXDimension] == 2592
+    assert written["Exif"][piexif.ExifIFD.PixelYDimension] == 1944
+
+
+def test_truncated_jpeg_is_rejected(tmp_path):
+    src = os.path.join(SAMPLES_DIR, "Attachment-1-converted.jpg")
+    with pytest.raises(ValueError):
+        rewrite_jpeg_exif(src, str(tmp_path / "out.jpg"), create_rayban_exif_bytes("metaspoof"))
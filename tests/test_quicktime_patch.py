@@ -0,0 +1,90 @@
+import struct
+from datetime import datetime
+
+from conftest import make_mov
+from quicktime_patch import (DATA_TYPE_UTF8, MAC_EPOCH_OFFSET, atom, build_keys_meta, parse_keys_meta,
+                             patch_video_metadata, top_level_atoms)
+from read_video_metadata import read_mov_metadata
+
+KEYS = {"com.apple.quicktime.model": "Ray-Ban Meta Smart Glasses",
+        "com.apple.quicktime.description": "4V"}
+DATE = datetime(2025, 11, 3, 14, 50, 46)
+
+
+def _atoms(path):
+    with open(path, "rb") as f:
+        return top_level_atoms(f, len(f.read()))
+
+
+def _mdat(path):
+    data = path.read_bytes()
+    _, offset, size = next(a for a in _atoms(path) if a[0] == b"mdat")
+    return offset, data[offset:offset + size]
+
+
+def _assert_patched(path):
+    metadata = read_mov_metadata(str(path))
+    for key, value in KEYS.items():
+        assert metadata["tags"][key] == value
+    mvhd_time = metadata["raw_metadata"]["mvhd"]["creation_time"]
+    assert mvhd_time == int((DATE - datetime(1970, 1, 1)).total_seconds()) + MAC_EPOCH_OFFSET
+
+
+def test_moov_last_is_rewritten_and_truncated(tmp_path):
+    path = tmp_path / "end.mov"
+    make_mov(path, "end")
+    before = _mdat(path)
+
+    assert patch_video_metadata(str(path), KEYS, DATE)
+    _assert_patched(path)
+    assert _mdat(path) == before
+    assert [a[0] for a in _atoms(path)] == [b"ftyp", b"mdat", b"moov"]
+
+
+def test_moov_first_grows_into_free_padding(tmp_path):
+    path = tmp_path / "start.mov"
+    original = make_mov(path, "start", free=1024)
+    before = _mdat(path)
+
+    assert patch_video_metadata(str(path), KEYS, DATE)
+    _assert_patched(path)
+    # Same size and same mdat offset - chunk offsets stay valid
+    assert path.stat().st_size == len(original)
+    assert _mdat(path) == before
+    assert [a[0] for a in _atoms(path)] == [b"ftyp", b"moov", b"free", b"mdat"]
+
+
+def test_no_room_leaves_file_untouched(tmp_path):
+    path = tmp_path / "tight.mov"
+    original = make_mov(path, "start")
+
+    assert not patch_video_metadata(str(path), KEYS, DATE)
+    assert path.read_bytes() == original
+
+
+def test_existing_keys_are_merged(tmp_path):
+    path = tmp_path / "keys.mov"
+    existing = {"com.apple.quicktime.make": (DATA_TYPE_UTF8, b"Meta AI"),
+                "com.apple.quicktime.description": (DATA_TYPE_UTF8, b"old")}
+    make_mov(path, "end", meta=build_keys_meta(existing))
+
+    assert patch_video_metadata(str(path), KEYS, DATE)
+    tags = read_mov_metadata(str(path))["tags"]
+    assert tags["com.apple.quicktime.make"] == "Meta AI"
+    assert tags["com.apple.quicktime.description"] == "4V"
+
+
+def test_itunes_meta_falls_back(tmp_path):
+    path = tmp_path / "itunes.mov"
+    hdlr = atom(b"hdlr", bytes(8) + b"mdir" + bytes(13))
+    ilst = atom(b"ilst", atom(b"\xa9nam", atom(b"data", struct.pack(">II", 1, 0) + b"Title")))
+    original = make_mov(path, "end", meta=atom(b"meta", b"\0\0\0\0" + hdlr + ilst))
+
+    assert not patch_video_metadata(str(path), KEYS, DATE)
+    assert path.read_bytes() == original
+
+
+def test_keys_meta_round_trip():
+    items = {"com.apple.quicktime.model": (DATA_TYPE_UTF8, "Ray-Ban Meta Smart Glasses".encode())}
+    meta = build_keys_meta(items)
+    assert parse_keys_meta(meta[8:]) == items
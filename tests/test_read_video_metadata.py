@@ -0,0 +1,20 @@
+import struct
+
+from quicktime_patch import atom
+from read_video_metadata import interesting, read_mov_metadata
+
+
+def test_interesting_keeps_strings_with_embedded_nuls_aligned():
+    assert interesting(["Ray-Ban Stories\0", "Meta View"]) == ["Ray-Ban Stories\0", "Meta View"]
+    assert interesting(["x\0y\0z", "Apple\0iPhone 12", "none"]) == ["Apple\0iPhone 12"]
+
+
+def test_udta_text_with_nul_is_read(tmp_path):
+    text = b"Apple\x00iPhone 12"
+    udta = atom(b"udta", atom(b"\xa9mak", struct.pack(">HH", len(text), 0) + text))
+    path = tmp_path / "nul.mov"
+    path.write_bytes(atom(b"ftyp", b"qt  \0\0\0\0qt  ") + atom(b"moov", atom(b"mvhd", bytes(100)) + udta))
+
+    metadata = read_mov_metadata(str(path))
+    assert metadata["tags"]["©mak"] == "Apple\x00iPhone 12"
+    assert metadata["interesting_strings"] == ["Apple\x00iPhone 12"]
@@ -1,66 +1,70 @@
 #!/usr/bin/env python3
 """
 Verify metadata in processed files vs the original Ray-Ban sample
+Checks every output (header-only parsing, in parallel) against a field
+profile - the one the cloner writes for a mode, a reference image's, or a
+saved JSON - and reports per-field match rates, value distributions and
+the files that don't match.
+
+Usage:
+    python verify_metadata.py ~/Desktop/"Ready to Send" --mode metaspoof
+    python verify_metadata.py out/ --reference samples/photo-2712_singular_display_fullPicture.JPG
 """
 
-import piexif
+import argparse
+import json
 import os
 import sys
-from PIL import Image
-from PIL.ExifTags import TAGS
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from exif_reader import TAG_NAMES, read_exif as read_exif_header
 
 def read_exif(filepath):
-    """Read and display EXIF data from an image"""
+    """Read and display EXIF data from an image (header-only, see exif_reader)"""
     print(f"\n{'='*60}")
     print(f"FILE: {os.path.basename(filepath)}")
     print(f"{'='*60}")
     
     try:
-        # Method 1: piexif
-        exif_dict = piexif.load(filepath)
+        exif = read_exif_header(filepath)
         
         print("\n📷 CRITICAL FIELDS (what Instagram checks):")
         
         # 0th IFD
-        ifd0 = exif_dict.get("0th", {})
-        make = ifd0.get(271, b"").decode() if isinstance(ifd0.get(271), bytes) else ifd0.get(271, "NOT SET")
-        model = ifd0.get(272, b"").decode() if isinstance(ifd0.get(272), bytes) else ifd0.get(272, "NOT SET")
-        software = ifd0.get(305, b"").decode() if isinstance(ifd0.get(305), bytes) else ifd0.get(305, "NOT SET")
+        ifd0 = exif.ifd("0th")
+        make = ifd0.get(271, "NOT SET")
+        model = ifd0.get(272, "NOT SET")
+        software = ifd0.get(305, "NOT SET")
         
         print(f"  Make: {make}")
         print(f"  Model: {model}")
         print(f"  Software: {software}")
         
         # Exif IFD
-        exif_ifd = exif_dict.get("Exif", {})
+        exif_ifd = exif.ifd("Exif")
         user_comment = exif_ifd.get(37510, b"")
         if isinstance(user_comment, bytes):
             user_comment = user_comment.decode('utf-8', errors='ignore')
-        body_serial = exif_ifd.get(42033, b"")
-        if isinstance(body_serial, bytes):
-            body_serial = body_serial.decode('utf-8', errors='ignore')
+        body_serial = exif_ifd.get(42033, "")
         
         print(f"  UserComment: {user_comment[:50]}..." if len(str(user_comment)) > 50 else f"  UserComment: {user_comment}")
         print(f"  BodySerialNumber: {body_serial}")
         
         print("\n📋 ALL 0th IFD fields:")
         for tag, value in ifd0.items():
-            tag_name = TAGS.get(tag, tag)
+            tag_name = TAG_NAMES.get(("0th", tag), tag)
             if isinstance(value, bytes):
-                try:
-                    value = value.decode('utf-8', errors='ignore')
-                except:
-                    value = str(value)[:50]
+                value = value.decode('utf-8', errors='ignore')[:50]
             print(f"  {tag} ({tag_name}): {value}")
         
         print("\n📋 ALL Exif IFD fields:")
         for tag, value in exif_ifd.items():
             if isinstance(value, bytes):
-                try:
-                    value = value.decode('utf-8', errors='ignore')[:50]
-                except:
-                    value = str(value)[:50]
-            print(f"  {tag}: {value}")
+                value = value.decode('utf-8', errors='ignore')[:50]
+            print(f"  {tag}: {str(value)[:50]}")
             
     except Exception as e:
         print(f"Error reading EXIF: {e}")
@@ -74,33 +78,293 @@ def compare_files(original_sample, processed_file):
     read_exif(original_sample)
     read_exif(processed_file)
 
-if __name__ == "__main__":
-    # Check Ready to Send folder for processed files
-    ready_folder = os.path.expanduser("~/Desktop/Ready to Send")
-    samples_folder = "/Users/bpmadmin/Charitycase/samples"
-    
-    print("🔍 Checking metadata...")
-    
-    # Original sample
-    original = os.path.join(samples_folder, "photo-2712_singular_display_fullPicture.JPG")
-    if os.path.exists(original):
-        read_exif(original)
-    else:
-        print(f"Original sample not found: {original}")
-    
-    # Check processed files
-    if os.path.exists(ready_folder):
-        files = [f for f in os.listdir(ready_folder) if f.lower().endswith(('.jpg', '.jpeg'))]
-        if files:
-            print(f"\n\n{'='*60}")
-            print("PROCESSED FILES in Ready to Send:")
-            print("="*60)
-            for f in files[:3]:  # Check first 3
-                read_exif(os.path.join(ready_folder, f))
+# ============ BATCH VERIFICATION ============
+
+# Photo fields checked by a profile: name -> (IFD, tag)
+PHOTO_FIELDS = {
+    "Make": ("0th", 271),
+    "Model": ("0th", 272),
+    "Orientation": ("0th", 274),
+    "ExposureTime": ("Exif", 33434),
+    "FNumber": ("Exif", 33437),
+    "ExposureProgram": ("Exif", 34850),
+    "ISOSpeedRatings": ("Exif", 34855),
+    "ExifVersion": ("Exif", 36864),
+    "DateTimeOriginal": ("Exif", 36867),
+    "DateTimeDigitized": ("Exif", 36868),
+    "MeteringMode": ("Exif", 37383),
+    "Flash": ("Exif", 37385),
+    "FocalLength": ("Exif", 37386),
+    "UserComment": ("Exif", 37510),
+    "SubSecTimeOriginal": ("Exif", 37521),
+    "ColorSpace": ("Exif", 40961),
+    "ExposureMode": ("Exif", 41986),
+    "WhiteBalance": ("Exif", 41987),
+    "FocalLengthIn35mmFilm": ("Exif", 41989),
+    "SceneCaptureType": ("Exif", 41990),
+    "BodySerialNumber": ("Exif", 42033),
+}
+
+# Fields the cloner randomizes per file: only presence is checked (plus uniqueness for UUIDs)
+VARYING_FIELDS = {"ExposureTime", "FNumber", "ISOSpeedRatings", "DateTimeOriginal", "DateTimeDigitized",
+                  "SubSecTimeOriginal", "BodySerialNumber"}
+UNIQUE_FIELDS = {"UserComment"}
+
+# QuickTime keys checked on videos
+VIDEO_FIELDS = {
+    "Model": "com.apple.quicktime.model",
+    "Copyright": "com.apple.quicktime.copyright",
+    "Description": "com.apple.quicktime.description",
+    "Comment": "com.apple.quicktime.comment",
+    "CreationDate": "com.apple.quicktime.creationdate",
+}
+
+# Pseudo-field: EXIF PixelX/YDimension must match the real (SOF / ispe) size
+SIZE_FIELD = "PixelDimensions"
+
+DEFAULT_REPORT = "verification_report.json"
+
+
+def _normalize(value):
+    """JSON-comparable form: bytes -> text, rationals/tuples -> lists"""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace').replace('\x00', '').strip()
+    if isinstance(value, tuple):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _photo_rules(get):
+    """Profile rules from any (ifd, tag) -> value lookup"""
+    rules = {}
+    for name, (ifd, tag) in PHOTO_FIELDS.items():
+        value = get(ifd, tag)
+        if value is None:
+            continue
+        if name in UNIQUE_FIELDS:
+            rules[name] = {"present": True, "unique": True}
+        elif name in VARYING_FIELDS:
+            rules[name] = {"present": True}
         else:
-            print("\nNo processed JPEG files found in Ready to Send folder")
+            rules[name] = {"equals": _normalize(value)}
+    rules[SIZE_FIELD] = {"matches_image_size": True}
+    return rules
+
+
+def profile_for_mode(mode):
+    """The profile cloner_core writes for a mode (metaspoof / authentic)"""
+    from cloner_core import create_rayban_exif, model_name_for
+
+    exif_dict = create_rayban_exif(mode)
+    model = model_name_for(mode)
+    return {
+        "name": mode,
+        "photo": _photo_rules(lambda ifd, tag: exif_dict[ifd].get(tag)),
+        "video": {
+            "Model": {"equals": model},
+            "Copyright": {"equals": "Meta AI"},
+            "Description": {"equals": "4V"},
+            "Comment": {"prefix": f"app=Meta AI&device={model}&id=", "unique": True},
+            "CreationDate": {"present": True},
+        },
+    }
+
+
+def profile_from_reference(path, mode="metaspoof"):
+    """Photo rules taken from a reference image's EXIF (video rules from mode)"""
+    exif = read_exif_header(path)
+    if not exif:
+        raise ValueError(f"No EXIF in reference {path}")
+    profile = profile_for_mode(mode)
+    profile["name"] = os.path.basename(path)
+    profile["photo"] = _photo_rules(lambda ifd, tag: exif.get(tag, ifd))
+    return profile
+
+
+def load_profile(path):
+    """Profile JSON - or a previous report, whose profile is reused"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get("profile", data)
+
+
+def _check(rule, value):
+    """Problem text for one value against one rule, or None"""
+    if value is None:
+        return "missing"
+    if "equals" in rule and value != rule["equals"]:
+        return f"{value!r} != {rule['equals']!r}"
+    if "prefix" in rule and not str(value).startswith(rule["prefix"]):
+        return f"{value!r} does not start with {rule['prefix']!r}"
+    return None
+
+
+def _photo_values(path):
+    exif = read_exif_header(path)
+    values = {name: _normalize(exif.get(tag, ifd)) for name, (ifd, tag) in PHOTO_FIELDS.items()}
+    dims = (exif.get(40962, "Exif"), exif.get(40963, "Exif"))
+    values[SIZE_FIELD] = None if None in dims else f"{dims[0]}x{dims[1]}"
+    return values, exif.size
+
+
+def _video_values(path):
+    from read_video_metadata import read_mov_metadata
+
+    tags = read_mov_metadata(path)["tags"]
+    return {name: _normalize(tags.get(key)) for name, key in VIDEO_FIELDS.items()}, None
+
+
+def verify_file(path, profile):
+    """
+    Check one output against a profile (headers only)
+
+    Returns:
+        dict: path, kind, values {field: value}, problems {field: text}, error
+    """
+    from metadata_scanner import file_kind
+
+    kind = "video" if file_kind(path) == "video" else "photo"
+    result = {"path": path, "kind": kind, "values": {}, "problems": {}, "error": None}
+    try:
+        values, size = _photo_values(path) if kind == "photo" else _video_values(path)
+    except Exception as e:  # one unreadable file must not stop the batch
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    for field, rule in profile.get(kind, {}).items():
+        value = values.get(field)
+        result["values"][field] = value
+        if rule.get("matches_image_size"):
+            expected = f"{size[0]}x{size[1]}" if size else None
+            problem = _check({"equals": expected} if expected else {}, value)
+        else:
+            problem = _check(rule, value)
+        if problem:
+            result["problems"][field] = problem
+    return result
+
+
+def verify_all(paths, profile, jobs=None):
+    """verify_file over every path on a process pool, in input order"""
+    check = partial(verify_file, profile=profile)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) < 2:
+        return list(map(check, paths))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(check, paths, chunksize=max(1, min(64, len(paths) // (jobs * 4)))))
+
+
+def summarize(results, profile, top=5):
+    """
+    Per-field match rates and value distributions, plus the failing files
+
+    UNIQUE rules are checked here, across the batch: a value shared by
+    several files marks every one of them.
+    """
+    fields = {}
+    for kind in ("photo", "video"):
+        checked = [r for r in results if r["kind"] == kind and r["error"] is None]
+        for field, rule in profile.get(kind, {}).items():
+            values = Counter(json.dumps(r["values"].get(field), ensure_ascii=False) for r in checked)
+            if rule.get("unique"):
+                for r in checked:
+                    value = r["values"].get(field)
+                    if value is not None and values[json.dumps(value, ensure_ascii=False)] > 1:
+                        r["problems"].setdefault(field, f"{value!r} shared with other files")
+            matched = sum(field not in r["problems"] for r in checked)
+            fields[f"{kind}.{field}"] = {
+                "rule": rule,
+                "checked": len(checked),
+                "matched": matched,
+                "missing": sum(r["values"].get(field) is None for r in checked),
+                "rate": round(matched / len(checked), 4) if checked else None,
+                "distinct": len(values),
+                "values": [{"value": json.loads(v), "count": n} for v, n in values.most_common(top)],
+            }
+    outliers = [{"path": r["path"], "error": r["error"], "problems": r["problems"]}
+                for r in results if r["error"] or r["problems"]]
+    return {
+        "profile": profile,
+        "files": len(results),
+        "passed": len(results) - len(outliers),
+        "failed": len(outliers),
+        "fields": fields,
+        "outliers": outliers,
+    }
+
+
+def print_summary(report, limit=20):
+    """Compact console view of a summarize() report"""
+    print(f"\n{'Field':32} {'match':>11} {'rate':>7}  values")
+    for name, stats in report["fields"].items():
+        if not stats["checked"]:
+            continue
+        if stats["distinct"] > 3:
+            shown = f"{stats['distinct']} distinct"
+        else:
+            shown = ", ".join(f"{v['value']} ({v['count']})" for v in stats["values"])
+        mark = "✓" if stats["matched"] == stats["checked"] else "❌"
+        print(f"{mark} {name:30} {stats['matched']:>5}/{stats['checked']:<5} {stats['rate']:>7.1%}  {shown[:60]}")
+    if report["outliers"]:
+        print(f"\n❌ {report['failed']} of {report['files']} files failed:")
+        for outlier in report["outliers"][:limit]:
+            name = os.path.basename(outlier["path"])
+            if outlier["error"]:
+                print(f"  {name}: {outlier['error']}")
+            else:
+                print(f"  {name}: " + "; ".join(f"{f} {p}" for f, p in outlier["problems"].items()))
+        if report["failed"] > limit:
+            print(f"  ... and {report['failed'] - limit} more (see the JSON report)")
     else:
-        print(f"\nReady to Send folder not found: {ready_folder}")
+        print(f"\n✓ All {report['files']} files match profile '{report['profile']['name']}'")
 
 
+def main(argv=None):
+    """Verify every output in a folder; exit 1 on any mismatch, 2 when nothing to check"""
+    from metadata_scanner import expand_inputs
+
+    samples = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+    parser = argparse.ArgumentParser(description="Verify processed outputs against a metadata profile")
+    parser.add_argument("paths", nargs="*", default=["~/Desktop/Ready to Send"],
+                        help="Output files or folders (default: ~/Desktop/Ready to Send)")
+    parser.add_argument("--mode", choices=("metaspoof", "authentic"), default="metaspoof",
+                        help="Profile the cloner writes for this mode (default: metaspoof)")
+    parser.add_argument("--reference", help="Take the photo profile from this image's EXIF instead")
+    parser.add_argument("--profile", help="Profile JSON (or a previous report) to check against")
+    parser.add_argument("--report", default=DEFAULT_REPORT, help=f"JSON report path (default: {DEFAULT_REPORT})")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--dump", type=int, default=0, metavar="N",
+                        help="Also print the full EXIF of the reference sample and the first N photos")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        profile = load_profile(args.profile)
+    elif args.reference:
+        profile = profile_from_reference(args.reference, args.mode)
+    else:
+        profile = profile_for_mode(args.mode)
 
+    paths = expand_inputs(args.paths)
+    if not paths:
+        print("No supported files found.", file=sys.stderr)
+        return 2
+
+    if args.dump:
+        original = args.reference or os.path.join(samples, "photo-2712_singular_display_fullPicture.JPG")
+        photos = [p for p in paths if p.lower().endswith(('.jpg', '.jpeg'))]
+        for path in photos[:args.dump]:
+            compare_files(original, path)
+
+    print(f"🔍 Verifying {len(paths)} files against profile '{profile['name']}'...")
+    started = time.perf_counter()
+    report = summarize(verify_all(paths, profile, args.jobs), profile)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    print_summary(report)
+
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📄 Report: {args.report} ({report['seconds']:.2f}s)")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Watch-folder daemon
+Processes photos and videos as they are dropped into an input folder,
+using the same pipeline as the desktop app (cloner_core). Linux uses
+inotify (via ctypes, no extra packages); everywhere else, or with
+--polling, the folder is re-scanned with os.scandir.
+
+Run: python cloner_cli.py --watch --input DROP_FOLDER --output OUT_FOLDER
+"""
+
+import collections
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from batch_journal import BatchJournal
+from cloner_core import batch_settings, classify, process_file
+
+# inotify event bits (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+
+def is_candidate(name):
+    """Supported media that isn't hidden or a partial download"""
+    return not name.startswith('.') and classify(name) is not None
+
+
+class InotifyWatcher:
+    """Top-level inotify watch on one folder (Linux only)"""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, folder):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.folder = folder
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), self.MASK)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+        self.needs_rescan = False
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds; return the set of paths that were written or moved in"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        paths = set()
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Kernel queue overflowed - events were lost, fall back to a scan
+                self.needs_rescan = True
+            elif name:
+                name = os.fsdecode(name)
+                if is_candidate(name):
+                    paths.add(os.path.join(self.folder, name))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Portable fallback: scandir the folder and report new or changed files"""
+
+    def __init__(self, folder, interval=2.0):
+        self.folder = folder
+        self.interval = interval
+        self.seen = {}
+        self.needs_rescan = False
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = {}
+        changed = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not is_candidate(entry.name):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                key = (st.st_size, st.st_mtime_ns)
+                current[entry.path] = key
+                if self.seen.get(entry.path) != key:
+                    changed.add(entry.path)
+        self.seen = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class Debouncer:
+    """
+    Holds files until they stop changing
+
+    A file is released once its size and mtime have stayed the same for
+    settle_seconds - copies over SMB/AirDrop often close and reopen the
+    file several times before they are complete.
+    """
+
+    def __init__(self, settle_seconds=2.0):
+        self.settle_seconds = settle_seconds
+        self.pending = {}  # path -> ((size, mtime_ns), stable_since)
+
+    def add(self, paths, now):
+        for path in paths:
+            self.pending.setdefault(path, (None, now))
+
+    def ready(self, now):
+        """Return files that have been stable long enough, dropping ones that vanished"""
+        released = []
+        for path, (last_key, since) in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            key = (st.st_size, st.st_mtime_ns)
+            if key != last_key or st.st_size == 0:
+                self.pending[path] = (key, now)
+            elif now - since >= self.settle_seconds:
+                del self.pending[path]
+                released.append(path)
+        return released
+
+    def __len__(self):
+        return len(self.pending)
+
+
+class WatchDaemon:
+    """
+    Watch input_folder and process arrivals through a bounded worker pool
+
+    Conversions go to a process pool and JPEG rewrites / video copies to a
+    thread pool, as in run_batch. At most 2 x jobs files are in flight; the
+    rest wait in the backlog, so a burst of thousands of files can't exhaust
+    memory. Finished files are journalled, so a restart doesn't redo them.
+    """
+
+    def __init__(self, input_folder, output_folder, mode="metaspoof", max_dimension=None,
+                 encoder_profile="standard", jobs=None, settle_seconds=2.0,
+                 poll_interval=2.0, stats_interval=30.0, use_inotify=True):
+        self.input_folder = os.path.abspath(input_folder)
+        self.output_folder = os.path.abspath(output_folder)
+        if self.output_folder == self.input_folder:
+            raise ValueError("Output folder must differ from the watched folder")
+        self.mode = mode
+        self.max_dimension = max_dimension
+        self.encoder_profile = encoder_profile
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_in_flight = self.jobs * 2
+        self.poll_interval = poll_interval
+        self.stats_interval = stats_interval
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+
+        self.debouncer = Debouncer(settle_seconds)
+        self.backlog = collections.deque()
+        self.queued = set()       # paths in the backlog or in flight
+        self.in_flight = {}       # future -> path
+        self.stats = {"processed": 0, "skipped": 0, "failed": 0}
+        self.interval_done = 0
+
+    def _make_watcher(self):
+        if self.use_inotify:
+            try:
+                return InotifyWatcher(self.input_folder)
+            except (OSError, AttributeError) as e:
+                print(f"⚠ inotify unavailable ({e}), falling back to polling")
+        return PollingWatcher(self.input_folder, self.poll_interval)
+
+    def initial_scan(self):
+        """Everything already in the folder - the journal filters out finished files"""
+        with os.scandir(self.input_folder) as entries:
+            return {entry.path for entry in entries if entry.is_file() and is_candidate(entry.name)}
+
+    def _enqueue(self, paths, journal):
+        for path in paths:
+            if path in self.queued:
+                continue
+            if journal.lookup(path) is not None:
+                self.stats["skipped"] += 1
+                continue
+            self.queued.add(path)
+            self.backlog.append(path)
+
+    def _submit(self, thread_pool, process_pool):
+        while self.backlog and len(self.in_flight) < self.max_in_flight:
+            path = self.backlog.popleft()
+            pool = process_pool if classify(path) == "convert" else thread_pool
+            future = pool.submit(process_file, path, self.output_folder, self.mode,
+                                 self.max_dimension, self.encoder_profile)
+            self.in_flight[future] = path
+
+    def _harvest(self, journal):
+        """Journal finished files; returns True when the process pool has broken"""
+        from concurrent.futures.process import BrokenProcessPool
+
+        broken = False
+        for future in [f for f in self.in_flight if f.done()]:
+            path = self.in_flight.pop(future)
+            self.queued.discard(path)
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                # A worker died (OOM, decoder crash) - every file it held fails with it
+                broken = True
+                result = {"error": "Worker process crashed", "output": None}
+            except Exception as e:
+                result = {"error": str(e), "output": None}
+            name = os.path.basename(path)
+            if result["error"]:
+                self.stats["failed"] += 1
+                print(f"  ✗ {name}: {result['error']}")
+            else:
+                journal.record(path, result["output"])
+                self.stats["processed"] += 1
+                print(f"  ✓ {name} → {os.path.basename(result['output'])}")
+            self.interval_done += 1
+        return broken
+
+    def _print_stats(self, elapsed):
+        rate = self.interval_done / elapsed if elapsed > 0 else 0.0
+        print(f"[watch] {rate:.2f} files/s · processed {self.stats['processed']} · "
+              f"failed {self.stats['failed']} · in flight {len(self.in_flight)} · "
+              f"backlog {len(self.backlog)} · settling {len(self.debouncer)}")
+        self.interval_done = 0
+
+    def run(self, stop_event=None):
+        """Block until stop_event is set (or Ctrl+C)"""
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        stop_event = stop_event or threading.Event()
+        os.makedirs(self.output_folder, exist_ok=True)
+        journal = BatchJournal(self.output_folder,
+                               batch_settings(self.mode, self.max_dimension, self.encoder_profile))
+        watcher = self._make_watcher()
+        thread_pool = ThreadPoolExecutor(max_workers=min(32, self.jobs * 2))
+        process_pool = ProcessPoolExecutor(max_workers=self.jobs)
+        kind = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+        print(f"👀 Watching {self.input_folder} ({kind}) → {self.output_folder}, {self.jobs} workers")
+
+        try:
+            # Files already waiting are treated like new arrivals
+            self.debouncer.add(self.initial_scan(), time.monotonic())
+            last_stats = time.monotonic()
+            while not stop_event.is_set():
+                # Short waits while anything is settling or running, so results flow promptly
+                busy = self.debouncer.pending or self.in_flight or self.backlog
+                arrived = watcher.poll(0.2 if busy else 1.0)
+                now = time.monotonic()
+                if watcher.needs_rescan:
+                    watcher.needs_rescan = False
+                    arrived |= self.initial_scan()
+                self.debouncer.add(arrived, now)
+                self._enqueue(self.debouncer.ready(now), journal)
+                if self._harvest(journal):
+                    print("⚠ Worker pool broke - starting a new one")
+                    process_pool.shutdown(wait=False, cancel_futures=True)
+                    process_pool = ProcessPoolExecutor(max_workers=self.jobs)
+                self._submit(thread_pool, process_pool)
+
+                if self.stats_interval and now - last_stats >= self.stats_interval:
+                    self._print_stats(now - last_stats)
+                    last_stats = now
+        except KeyboardInterrupt:
+            print("\n⏹ Stopping - finishing files in progress...")
+        finally:
+            thread_pool.shutdown(wait=True, cancel_futures=True)
+            process_pool.shutdown(wait=True, cancel_futures=True)
+            self._harvest(journal)
+            watcher.close()
+            journal.close()
+            print(f"✓ Watch stopped: {self.stats['processed']} processed, "
+                  f"{self.stats['skipped']} already done, {self.stats['failed']} failed")
+        return self.stats
@@ -6,7 +6,8 @@ Now with PostgreSQL database for persistent storage!
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 import piexif
 import io
 import os
@@ -22,9 +23,21 @@ import subprocess
 import tempfile
 import shutil
 import uuid as uuid_lib
+import struct
+import json
+import queue
+import threading
+import time
+import bisect
+import sys
+import re
+import cProfile
+import pstats
+from collections import deque
+from contextlib import contextmanager
 
 # Database imports
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Boolean
+from sqlalchemy import event, create_engine, Column, String, Integer, BigInteger, Float, Text, DateTime, Boolean, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 
@@ -65,6 +78,41 @@ STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "sk_test_...")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "whsec_...")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "metacloner2024")
 
+# Usage ledger - events are buffered in memory and written in batches
+USAGE_BATCH_SIZE = int(os.getenv("USAGE_BATCH_SIZE", "200"))
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "2.0"))
+USAGE_QUEUE_SIZE = int(os.getenv("USAGE_QUEUE_SIZE", "10000"))
+
+# Prometheus /metrics needs "Authorization: Bearer <METRICS_TOKEN>" or an admin
+# token; METRICS_PUBLIC=1 opens it to anyone (e.g. behind a private network)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "0") == "1"
+
+# Opt-in request profiling (admin only, see /api/process/file)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "metacloner-profiles"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.002"))
+# Only the newest PROFILE_KEEP profiles are kept on disk; older ones are pruned after each run
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+# Global memory budget that decodes must reserve before allocating pixels
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", "1024"))
+MEMORY_BUDGET_WAIT_SECONDS = float(os.getenv("MEMORY_BUDGET_WAIT_SECONDS", "30"))
+
+# Longest output side in pixels; larger photos are decoded at reduced scale (0 = keep full size)
+MAX_IMAGE_DIMENSION = int(os.getenv("MAX_IMAGE_DIMENSION", "0"))
+
+# JPEG encoder settings for converted photos (encode time / size on a 3024x4032 HEIC).
+# Same table as cloner_core.ENCODER_PROFILES - web-app/ deploys on its own, so keep both in sync.
+ENCODER_PROFILES = {
+    "standard": {"quality": 95},                                      #  53 ms, 3.7 MB (4:2:0)
+    "fast": {"quality": 90, "subsampling": 2},                        #  45 ms, 2.3 MB
+    "compact": {"quality": 90, "subsampling": 2, "optimize": True, "progressive": True},  # 278 ms, 2.2 MB
+    "max": {"quality": 95, "subsampling": 0, "optimize": True},       # 284 ms, 3.8 MB (4:4:4)
+}
+ENCODER_PROFILE = os.getenv("ENCODER_PROFILE", "standard")
+if ENCODER_PROFILE not in ENCODER_PROFILES:
+    raise RuntimeError(f"ENCODER_PROFILE must be one of {', '.join(ENCODER_PROFILES)}")
+
 # Database URL - Railway provides this automatically when you add PostgreSQL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./metacloner.db")
 
@@ -75,6 +123,144 @@ if DATABASE_URL.startswith("postgres://"):
 stripe.api_key = STRIPE_SECRET_KEY
 
 
+# ============ Metrics ============
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _format_labels(names, values, le=None):
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    """
+    Fixed-bucket histogram rendered in Prometheus text format.
+    
+    observe() does the bucket search outside the lock and holds it only for
+    three integer/float updates, so it is cheap enough for every request.
+    """
+    
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    @contextmanager
+    def time(self, labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(labels, time.perf_counter() - started)
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+        for labels, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class Gauge:
+    """Labelled gauge; values are either set directly or read from a callback at scrape time"""
+    
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def dec(self, labels, amount=1):
+        self.inc(labels, -amount)
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        if self.callback is not None:
+            values = self.callback()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+REQUEST_LATENCY = Histogram(
+    "metacloner_http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route", "status"))
+STAGE_LATENCY = Histogram(
+    "metacloner_stage_duration_seconds", "Time spent in each file processing stage",
+    ("pipeline", "stage"))
+DB_QUERY_LATENCY = Histogram(
+    "metacloner_db_query_duration_seconds", "Database statement execution time",
+    ("statement",))
+INFLIGHT_JOBS = Gauge(
+    "metacloner_inflight_jobs", "Files currently being processed", ("kind",))
+
+@contextmanager
+def timed_stage(pipeline, stage, timings=None):
+    """Time one processing stage into STAGE_LATENCY and, optionally, a {stage: ms} dict"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.observe((pipeline, stage), elapsed)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+@contextmanager
+def track_inflight(kind):
+    INFLIGHT_JOBS.inc((kind,))
+    try:
+        yield
+    finally:
+        INFLIGHT_JOBS.dec((kind,))
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        REQUEST_LATENCY.observe((request.method, route_path, str(status)), time.perf_counter() - started)
+
+
 # ============ Database Setup ============
 
 Base = declarative_base()
@@ -90,15 +276,69 @@ class User(Base):
     subscription_expires = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class UsageEvent(Base):
+    """Append-only record of one processed file"""
+    __tablename__ = "usage_events"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, nullable=False, index=True)
+    file_type = Column(String, nullable=False)
+    path = Column(String, nullable=False)  # video, image_convert or image_jpeg
+    success = Column(Boolean, default=True)
+    input_bytes = Column(BigInteger, default=0)
+    output_bytes = Column(BigInteger, default=0)
+    duration_ms = Column(Float, default=0.0)
+    stage_durations = Column(Text, nullable=True)  # JSON: {stage: milliseconds}
+    credit_delta = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class UsageRollupMixin:
+    """Columns shared by the hourly and daily usage aggregates"""
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    file_type = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    events = Column(Integer, default=0)
+    failures = Column(Integer, default=0)
+    input_bytes = Column(BigInteger, default=0)
+    output_bytes = Column(BigInteger, default=0)
+    total_duration_ms = Column(Float, default=0.0)
+    credits_used = Column(Integer, default=0)
+
+class UsageHourly(UsageRollupMixin, Base):
+    __tablename__ = "usage_hourly"
+    __table_args__ = (UniqueConstraint("bucket_start", "file_type", "path"),)
+
+class UsageDaily(UsageRollupMixin, Base):
+    __tablename__ = "usage_daily"
+    __table_args__ = (UniqueConstraint("bucket_start", "file_type", "path"),)
+
 # Create engine and session
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create tables on startup
-@app.on_event("startup")
-def startup():
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created/verified")
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+@event.listens_for(engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    DB_QUERY_LATENCY.observe((verb,), time.perf_counter() - started)
+
+def _pool_usage():
+    pool = engine.pool
+    usage = {}
+    for state, getter in (("checked_out", "checkedout"), ("idle", "checkedin"), ("size", "size")):
+        if hasattr(pool, getter):
+            usage[(state,)] = getattr(pool, getter)()
+    return usage
+
+DB_POOL = Gauge("metacloner_db_pool_connections", "SQLAlchemy connection pool usage",
+                ("state",), callback=_pool_usage)
 
 # Dependency to get database session
 def get_db():
@@ -109,6 +349,156 @@ def get_db():
         db.close()
 
 
+# ============ Usage Ledger ============
+
+class UsageLedger:
+    """
+    Buffers usage events and writes them from a background thread.
+    
+    Requests only pay for a queue put. The writer drains the queue in batches,
+    bulk-inserts the raw events and folds them into the hourly/daily rollups
+    in the same transaction, so the stats endpoint never scans usage_events.
+    """
+    
+    def __init__(self, session_factory, batch_size=USAGE_BATCH_SIZE,
+                 flush_interval=USAGE_FLUSH_INTERVAL, max_queue=USAGE_QUEUE_SIZE):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stop = object()
+    
+    def record(self, user_id, file_type, path, input_bytes, output_bytes,
+               stage_durations, credit_delta, success=True):
+        """Queue one event; never blocks the request"""
+        event = {
+            "user_id": user_id,
+            "file_type": file_type,
+            "path": path,
+            "success": success,
+            "input_bytes": input_bytes,
+            "output_bytes": output_bytes,
+            "duration_ms": sum(stage_durations.values()),
+            "stage_durations": json.dumps(stage_durations),
+            "credit_delta": credit_delta,
+            "created_at": datetime.utcnow(),
+        }
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+    
+    @property
+    def pending(self):
+        return self._queue.qsize()
+    
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="usage-ledger", daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        """Flush whatever is queued and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(self._stop)
+            self._thread.join(timeout=10)
+            self._thread = None
+    
+    def _run(self):
+        while True:
+            batch = []
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if event is self._stop:
+                    stopping = True
+                    break
+                batch.append(event)
+            if batch:
+                try:
+                    self.write_batch(batch)
+                except Exception as e:
+                    print(f"⚠ Usage ledger flush failed ({len(batch)} events): {e}")
+            if stopping:
+                return
+    
+    def write_batch(self, events):
+        db = self.session_factory()
+        try:
+            db.bulk_insert_mappings(UsageEvent, events)
+            self._apply_rollup(db, UsageHourly, events,
+                               lambda ts: ts.replace(minute=0, second=0, microsecond=0))
+            self._apply_rollup(db, UsageDaily, events,
+                               lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    ROLLUP_COUNTERS = ("events", "failures", "input_bytes", "output_bytes",
+                       "total_duration_ms", "credits_used")
+    
+    @classmethod
+    def _apply_rollup(cls, db, model, events, bucket_of):
+        totals = {}
+        for event in events:
+            key = (bucket_of(event["created_at"]), event["file_type"], event["path"])
+            agg = totals.setdefault(key, [0, 0, 0, 0, 0.0, 0])
+            agg[0] += 1
+            agg[1] += 0 if event["success"] else 1
+            agg[2] += event["input_bytes"]
+            agg[3] += event["output_bytes"]
+            agg[4] += event["duration_ms"]
+            agg[5] += -event["credit_delta"]
+        if not totals:
+            return
+        
+        rows = [dict(bucket_start=bucket_start, file_type=file_type, path=path,
+                     **dict(zip(cls.ROLLUP_COUNTERS, agg)))
+                for (bucket_start, file_type, path), agg in totals.items()]
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise RuntimeError(f"Usage rollups need PostgreSQL or SQLite, not {dialect}")
+        # One atomic upsert: concurrent uvicorn workers adding to the same
+        # bucket can't both INSERT and trip the unique constraint
+        stmt = insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bucket_start", "file_type", "path"],
+            set_={name: getattr(model, name) + getattr(stmt.excluded, name) for name in cls.ROLLUP_COUNTERS},
+        )
+        db.execute(stmt)
+
+usage_ledger = UsageLedger(SessionLocal)
+
+# Create tables on startup
+@app.on_event("startup")
+def startup():
+    Base.metadata.create_all(bind=engine)
+    print("✅ Database tables created/verified")
+    usage_ledger.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    usage_ledger.stop()
+
+
 # ============ Models ============
 
 class UserCreate(BaseModel):
@@ -159,45 +549,139 @@ def generate_random_datetime():
 def generate_uuid():
     return str(uuid_lib.uuid4()).upper()
 
-def create_rayban_exif():
-    random_datetime = generate_random_datetime()
-    random_subsec = str(random.randint(100, 999))
-    unique_uuid = generate_uuid()
+def random_exif_values(width=3024, height=4032):
+    """Per-file EXIF values - keys match EXIF_PATCH_FIELDS"""
+    exposure_times = [(1, 4000), (1, 3000), (1, 2000), (1, 1000)]
+    f_numbers = [(7, 5), (14, 5)]
+    iso_values = [100, 125, 160, 200, 250, 320, 400]
+    return {
+        "datetime": generate_random_datetime(),
+        "subsec": str(random.randint(100, 999)),
+        "user_comment": b"ASCII\x00\x00\x00" + generate_uuid().encode('utf-8'),
+        "exposure_time": random.choice(exposure_times),
+        "f_number": random.choice(f_numbers),
+        "iso": random.choice(iso_values),
+        "body_serial": str(random.randint(10, 99)),
+        "width": width,
+        "height": height,
+    }
+
+def create_rayban_exif(width=3024, height=4032):
+    values = random_exif_values(width, height)
     
     make = "Meta AI"
     model = "Ray-Ban Meta Smart Glasses"
     exif_version = b"0231"
-    user_comment_prefix = b"ASCII\x00\x00\x00"
     focal_length_35mm = 35
     scene_capture_type = 1
-    exposure_times = [(1, 4000), (1, 3000), (1, 2000), (1, 1000)]
-    f_numbers = [(7, 5), (14, 5)]
-    iso_values = [100, 125, 160, 200, 250, 320, 400]
     focal_length = (35, 1)
-    body_serial = str(random.randint(10, 99))
     
     exif_dict = {
         "0th": {
             271: make, 272: model, 282: (72, 1), 283: (72, 1),
-            296: 2, 305: "", 306: random_datetime,
+            296: 2, 305: "", 306: values["datetime"],
         },
         "Exif": {
-            33434: random.choice(exposure_times), 33437: random.choice(f_numbers),
-            34850: 0, 34855: random.choice(iso_values), 36864: exif_version,
-            36867: random_datetime, 36868: random_datetime,
+            33434: values["exposure_time"], 33437: values["f_number"],
+            34850: 0, 34855: values["iso"], 36864: exif_version,
+            36867: values["datetime"], 36868: values["datetime"],
             37121: b"\x01\x02\x03\x00", 37377: (14767, 2500), 37378: (91, 40),
             37379: (0, 1), 37383: 1, 37385: 16, 37386: focal_length,
-            37510: user_comment_prefix + unique_uuid.encode('utf-8'),
-            37520: random_subsec, 37521: random_subsec, 37522: random_subsec,
-            40960: b"0100", 40961: 1, 40962: 3024, 40963: 4032,
+            37510: values["user_comment"],
+            37520: values["subsec"], 37521: values["subsec"], 37522: values["subsec"],
+            40960: b"0100", 40961: 1, 40962: values["width"], 40963: values["height"],
             41495: 1, 41729: b"\x01", 41986: 2, 41987: 0,
-            41989: focal_length_35mm, 41990: scene_capture_type, 42033: body_serial,
+            41989: focal_length_35mm, 41990: scene_capture_type, 42033: values["body_serial"],
         },
         "GPS": {}, "1st": {}, "thumbnail": None
     }
     return exif_dict
 
 
+# ============ Precompiled EXIF ============
+# piexif.dump runs once at import; each file gets a copy of that block with
+# its own values patched in at known offsets (microseconds instead of a full
+# IFD rebuild and re-serialization per file).
+# Mirrors the repo's exif_template.py: web-app/ is deployed as its own root
+# (Railway/Procfile), so it can't import the desktop modules - change both together.
+
+EXIF_PATCH_FIELDS = {
+    "datetime": [("0th", 306), ("Exif", 36867), ("Exif", 36868)],
+    "subsec": [("Exif", 37520), ("Exif", 37521), ("Exif", 37522)],
+    "user_comment": [("Exif", 37510)],
+    "exposure_time": [("Exif", 33434)],
+    "f_number": [("Exif", 33437)],
+    "iso": [("Exif", 34855)],
+    "body_serial": [("Exif", 42033)],
+    "width": [("Exif", 40962)],
+    "height": [("Exif", 40963)],
+}
+
+EXIF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1}
+
+def _locate_exif_fields(blob: bytes) -> dict:
+    """Map (ifd, tag) -> (type, count, offset) for a big-endian piexif.dump blob"""
+    def walk(ifd_offset):
+        base = 6 + ifd_offset
+        (entry_count,) = struct.unpack_from('>H', blob, base)
+        for i in range(entry_count):
+            entry = base + 2 + i * 12
+            tag, field_type, count = struct.unpack_from('>HHL', blob, entry)
+            if EXIF_TYPE_SIZES.get(field_type, 1) * count <= 4:
+                offset = entry + 8
+            else:
+                offset = 6 + struct.unpack_from('>L', blob, entry + 8)[0]
+            yield tag, field_type, count, offset
+    
+    if blob[:8] != b"Exif\x00\x00MM":
+        raise ValueError("Expected a big-endian EXIF block from piexif.dump")
+    fields = {}
+    for tag, field_type, count, offset in walk(struct.unpack_from('>L', blob, 10)[0]):
+        fields[("0th", tag)] = (field_type, count, offset)
+        if tag == 34665:  # Exif IFD pointer
+            for sub_tag, sub_type, sub_count, sub_offset in walk(struct.unpack_from('>L', blob, offset)[0]):
+                fields[("Exif", sub_tag)] = (sub_type, sub_count, sub_offset)
+    return fields
+
+def _pack_exif_value(field_type: int, count: int, value) -> bytes:
+    if field_type == 2:
+        data = (value.encode('ascii') if isinstance(value, str) else value) + b"\x00"
+    elif field_type == 7:
+        data = value
+    elif field_type == 3:
+        data = struct.pack('>H', value)
+    elif field_type == 4:
+        data = struct.pack('>L', value)
+    elif field_type == 5:
+        data = struct.pack('>LL', *value)
+    else:
+        raise ValueError(f"Cannot patch TIFF type {field_type}")
+    if len(data) != EXIF_TYPE_SIZES[field_type] * count:
+        raise ValueError(f"Value {value!r} does not fit the compiled EXIF field")
+    return data
+
+class ExifTemplate:
+    """A serialized EXIF block plus the offsets of its per-file fields"""
+    
+    def __init__(self, exif_dict: dict, patch_fields: dict):
+        self._blob = piexif.dump(exif_dict)
+        located = _locate_exif_fields(self._blob)
+        self._fields = {name: [located[ifd_tag] for ifd_tag in tags] for name, tags in patch_fields.items()}
+    
+    def render(self, values: dict) -> bytes:
+        buf = bytearray(self._blob)
+        for name, value in values.items():
+            for field_type, count, offset in self._fields[name]:
+                data = _pack_exif_value(field_type, count, value)
+                buf[offset:offset + len(data)] = data
+        return bytes(buf)
+
+RAYBAN_EXIF_TEMPLATE = ExifTemplate(create_rayban_exif(), EXIF_PATCH_FIELDS)
+
+def create_rayban_exif_bytes(width=3024, height=4032) -> bytes:
+    return RAYBAN_EXIF_TEMPLATE.render(random_exif_values(width, height))
+
+
 # ============ Auth Helpers ============
 
 def hash_password(password: str) -> str:
@@ -219,11 +703,15 @@ def verify_token(authorization: Optional[str] = Header(None)) -> str:
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def is_admin_token(token: Optional[str]) -> bool:
+    expected = hashlib.sha256(ADMIN_PASSWORD.encode()).hexdigest()
+    return bool(token) and secrets.compare_digest(token, expected)
+
 def verify_admin(authorization: Optional[str] = Header(None)) -> bool:
     if not authorization or not authorization.startswith("Admin "):
         raise HTTPException(status_code=401, detail="Admin access required")
     token = authorization.split(" ")[1]
-    if token != hashlib.sha256(ADMIN_PASSWORD.encode()).hexdigest():
+    if not is_admin_token(token):
         raise HTTPException(status_code=401, detail="Invalid admin credentials")
     return True
 
@@ -355,42 +843,361 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
 # Credits can only be added via Stripe payment or admin panel
 
 
+# ============ Memory Budget ============
+
+class MemoryBudgetExceeded(Exception):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+class MemoryBudget:
+    """
+    Global byte budget shared by all processing jobs.
+    
+    Jobs reserve their estimated peak before decoding. A reservation larger
+    than the whole budget is rejected outright (413); otherwise the job waits
+    up to wait_timeout seconds for room and is then rejected (503).
+    """
+    
+    def __init__(self, capacity_bytes: int, wait_timeout: float):
+        self.capacity = capacity_bytes
+        self.wait_timeout = wait_timeout
+        self.in_use = 0
+        self.peak = 0
+        self.waiting = 0
+        self.granted = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+    
+    @contextmanager
+    def reserve(self, nbytes: int):
+        with self._cond:
+            if nbytes > self.capacity:
+                self.rejected += 1
+                raise MemoryBudgetExceeded(
+                    f"File needs ~{nbytes // 2**20} MB to process, over the {self.capacity // 2**20} MB limit", 413)
+            self.waiting += 1
+            try:
+                ok = self._cond.wait_for(lambda: self.in_use + nbytes <= self.capacity, timeout=self.wait_timeout)
+            finally:
+                self.waiting -= 1
+            if not ok:
+                self.rejected += 1
+                raise MemoryBudgetExceeded("Server is busy processing other files, please retry shortly", 503)
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+            self.granted += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_use -= nbytes
+                self._cond.notify_all()
+    
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "capacity_bytes": self.capacity,
+                "in_use_bytes": self.in_use,
+                "peak_bytes": self.peak,
+                "utilization": round(self.in_use / self.capacity, 3) if self.capacity else 0.0,
+                "waiting_jobs": self.waiting,
+                "granted": self.granted,
+                "rejected": self.rejected,
+            }
+
+memory_budget = MemoryBudget(MEMORY_BUDGET_MB * 2**20, MEMORY_BUDGET_WAIT_SECONDS)
+
+MEMORY_BUDGET = Gauge("metacloner_memory_budget_bytes", "Decode memory budget",
+                      ("state",), callback=lambda: {
+                          ("capacity",): memory_budget.capacity,
+                          ("in_use",): memory_budget.in_use,
+                          ("peak",): memory_budget.peak})
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+class RequestMemory:
+    """
+    Tracks the process RSS high-water mark seen at checkpoints during one job.
+    
+    RSS is process-wide, so overlapping jobs inflate each other's numbers;
+    reserved_bytes is the job's own estimate.
+    """
+    
+    def __init__(self, label: str):
+        self.label = label
+        self.reserved_bytes = 0
+        self.start_rss = current_rss()
+        self.peak_rss = self.start_rss
+    
+    def checkpoint(self):
+        rss = current_rss()
+        if rss > self.peak_rss:
+            self.peak_rss = rss
+    
+    def summary(self) -> dict:
+        return {
+            "label": self.label,
+            "reserved_bytes": self.reserved_bytes,
+            "start_rss_bytes": self.start_rss,
+            "peak_rss_bytes": self.peak_rss,
+            "peak_delta_bytes": self.peak_rss - self.start_rss,
+        }
+
+recent_memory = deque(maxlen=50)
+
+def estimate_decode_bytes(img, encoded_size: int) -> int:
+    """Estimate peak bytes to decode img, flatten it to RGB and re-encode it"""
+    width, height = img.size
+    bytes_per_pixel = {"1": 1, "L": 1, "P": 1, "LA": 2, "RGB": 3, "YCbCr": 3, "RGBA": 4,
+                       "CMYK": 4, "I": 4, "F": 4, "I;16": 2}.get(img.mode, 4)
+    # decoded source + RGBA/RGB working copies + encoded output buffers
+    return width * height * (bytes_per_pixel + 4 + 3) + encoded_size * 2
+
+# prepare_scaled_decode / reduce_to_fit mirror cloner_core's (self-contained deploy - keep in sync)
+
+def prepare_scaled_decode(img, max_dimension: int):
+    """
+    Ask the decoder for a smaller image before load() when the source is oversized.
+    
+    For JPEG, draft() makes libjpeg decode at 1/2, 1/4 or 1/8 scale directly,
+    picking the smallest scale that still covers max_dimension, so the full
+    resolution is never materialized.
+    """
+    if not max_dimension or max(img.size) <= max_dimension:
+        return
+    if img.format == 'JPEG':
+        scale = max(img.size) / max_dimension
+        img.draft('RGB', (int(img.size[0] / scale), int(img.size[1] / scale)))
+
+def reduce_to_fit(img, max_dimension: int):
+    """
+    Shrink a loaded image so its longest side is at most max_dimension.
+    
+    Uses reduce() (integer box filter, much cheaper than a full resample) for
+    the bulk of the scaling and a final resize only for the remainder.
+    Returns img itself when nothing needed to change.
+    """
+    if not max_dimension or max(img.size) <= max_dimension:
+        return img
+    factor = max(img.size) // max_dimension
+    result = img.reduce(factor) if factor >= 2 else img
+    if max(result.size) > max_dimension:
+        scale = max_dimension / max(result.size)
+        size = (max(1, round(result.size[0] * scale)), max(1, round(result.size[1] * scale)))
+        resized = result.resize(size, Image.LANCZOS)
+        if result is not img:
+            result.close()
+        result = resized
+    return result
+
+def flatten_to_rgb(img):
+    """Return an RGB version of img on a white background; intermediates are closed"""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        source = img.convert('RGBA') if img.mode == 'P' else img
+        try:
+            if source.mode == 'RGBA':
+                alpha = source.getchannel('A')
+                background.paste(source, mask=alpha)
+                alpha.close()
+            else:
+                background.paste(source)
+        finally:
+            if source is not img:
+                source.close()
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+# ============ Profiling ============
+
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval and counts collapsed stacks"""
+    
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+    
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, ready for flamegraph.pl / speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.counts.items()))
+
+def run_profiled(label: str, fn, *args, **kwargs):
+    """
+    Run fn under cProfile plus a stack sampler on the calling thread.
+    
+    Returns (result, profile_id). The pstats dump, collapsed stacks and a small
+    JSON summary are written to PROFILE_DIR under the profile id.
+    """
+    profile_id = uuid_lib.uuid4().hex
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident())
+    started = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        sampler.stop()
+        elapsed = time.perf_counter() - started
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, profile_id)
+        profiler.dump_stats(base + ".pstats")
+        with open(base + ".collapsed", "w") as f:
+            f.write(sampler.collapsed())
+        with open(base + ".json", "w") as f:
+            json.dump({
+                "id": profile_id,
+                "label": label,
+                "created_at": datetime.utcnow().isoformat(),
+                "elapsed_ms": round(elapsed * 1000, 2),
+                "samples": sum(sampler.counts.values()),
+            }, f)
+        print(f"🔬 Profile {profile_id} saved for {label} ({elapsed * 1000:.0f} ms)")
+        prune_profiles(PROFILE_KEEP)
+    return result, profile_id
+
+PROFILE_SUFFIXES = (".json", ".pstats", ".collapsed")
+
+def delete_profile(profile_id: str):
+    for suffix in PROFILE_SUFFIXES:
+        try:
+            os.unlink(os.path.join(PROFILE_DIR, profile_id + suffix))
+        except FileNotFoundError:
+            pass
+
+def prune_profiles(keep: int) -> int:
+    """Delete all but the newest `keep` profiles; returns how many were removed"""
+    summaries = []
+    try:
+        for entry in os.scandir(PROFILE_DIR):
+            if entry.name.endswith(".json"):
+                summaries.append((entry.stat().st_mtime, entry.name[:-len(".json")]))
+    except FileNotFoundError:  # directory gone, or a concurrent prune got there first
+        pass
+    summaries.sort(reverse=True)
+    for _, profile_id in summaries[keep:]:
+        delete_profile(profile_id)
+    return max(0, len(summaries) - keep)
+
+def profile_path(profile_id: str, suffix: str) -> str:
+    if not PROFILE_ID_RE.match(profile_id):
+        raise HTTPException(status_code=400, detail="Invalid profile id")
+    path = os.path.join(PROFILE_DIR, profile_id + suffix)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return path
+
+
 # ============ File Processing ============
 
-def process_image(image_data: bytes, filename: str) -> bytes:
+def process_image(image_data: bytes, filename: str, timings: Optional[dict] = None,
+                  memory: Optional[RequestMemory] = None) -> bytes:
     ext = os.path.splitext(filename)[1].lower()
+    memory = memory or RequestMemory(filename)
+    size = (3024, 4032)
     
-    if ext in ['.heic', '.heif', '.png', '.webp', '.gif', '.bmp', '.tiff']:
-        if not HAS_PIL:
-            raise Exception("Image conversion not supported. Please upload JPEG.")
-        img = Image.open(io.BytesIO(image_data))
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        output = io.BytesIO()
-        img.save(output, format='JPEG', quality=95)
-        image_data = output.getvalue()
+    needs_conversion = ext in ['.heic', '.heif', '.png', '.webp', '.gif', '.bmp', '.tiff']
+    if needs_conversion and not HAS_PIL:
+        raise Exception("Image conversion not supported. Please upload JPEG.")
     
-    exif_dict = create_rayban_exif()
-    exif_bytes = piexif.dump(exif_dict)
-    output = io.BytesIO()
-    piexif.insert(exif_bytes, image_data, output)
-    return output.getvalue()
-
-def process_video(video_data: bytes, filename: str) -> bytes:
+    if HAS_PIL:
+        # Image.open only parses the header, so size checks and the budget
+        # reservation happen before any pixels exist
+        with Image.open(io.BytesIO(image_data)) as img:
+            size = img.size
+            oversized = bool(MAX_IMAGE_DIMENSION) and max(img.size) > MAX_IMAGE_DIMENSION
+            if needs_conversion or oversized:
+                prepare_scaled_decode(img, MAX_IMAGE_DIMENSION)
+                memory.reserved_bytes = estimate_decode_bytes(img, len(image_data))
+                with memory_budget.reserve(memory.reserved_bytes):
+                    with timed_stage("image", "decode", timings):
+                        img.load()
+                        scaled = reduce_to_fit(img, MAX_IMAGE_DIMENSION)
+                    memory.checkpoint()
+                    try:
+                        with timed_stage("image", "rgb_convert", timings):
+                            rgb = flatten_to_rgb(scaled)
+                        memory.checkpoint()
+                        try:
+                            with timed_stage("image", "exif_dump", timings):
+                                exif_bytes = create_rayban_exif_bytes(*rgb.size)
+                            # EXIF goes straight into the encoder: one encode, one buffer
+                            with timed_stage("image", "jpeg_encode", timings):
+                                output = io.BytesIO()
+                                rgb.save(output, format='JPEG', exif=exif_bytes,
+                                         **ENCODER_PROFILES[ENCODER_PROFILE])
+                            memory.checkpoint()
+                            return output.getvalue()
+                        finally:
+                            if rgb is not scaled:
+                                rgb.close()
+                    finally:
+                        if scaled is not img:
+                            scaled.close()
+    
+    # Native JPEG at an acceptable size - only the EXIF segment changes
+    with timed_stage("image", "exif_dump", timings):
+        exif_bytes = create_rayban_exif_bytes(*size)
+    with timed_stage("image", "exif_insert", timings):
+        output = io.BytesIO()
+        piexif.insert(exif_bytes, image_data, output)
+        return output.getvalue()
+
+def process_video(video_data: bytes, filename: str, timings: Optional[dict] = None,
+                  memory: Optional[RequestMemory] = None) -> bytes:
+    memory = memory or RequestMemory(filename)
+    # Nothing is decoded in-process (ffmpeg does the work on spooled temp
+    # files), so the only new allocation is the read-back - reserved there
+    return _process_video(video_data, filename, timings, memory)
+
+def _process_video(video_data: bytes, filename: str, timings: Optional[dict],
+                   memory: RequestMemory) -> bytes:
     model_name = "Ray-Ban Meta Smart Glasses"
     unique_uuid = generate_uuid()
     comment = f"app=Meta AI&device={model_name}&id={unique_uuid}"
     creation_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
     
-    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(filename)[1], delete=False) as tmp_in:
-        tmp_in.write(video_data)
-        tmp_in_path = tmp_in.name
+    with timed_stage("video", "upload_spool", timings):
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(filename)[1], delete=False) as tmp_in:
+            tmp_in.write(video_data)
+            tmp_in_path = tmp_in.name
     
     tmp_out_path = tmp_in_path + "_out.MOV"
     
@@ -400,7 +1207,8 @@ def process_video(video_data: bytes, filename: str) -> bytes:
             cmd = [ffmpeg_path, '-y', '-i', tmp_in_path, '-c:v', 'libx264', '-preset', 'medium',
                    '-crf', '23', '-c:a', 'aac', '-b:a', '128k', '-pix_fmt', 'yuv420p',
                    '-movflags', '+faststart', '-f', 'mov', tmp_out_path]
-            result = subprocess.run(cmd, capture_output=True)
+            with timed_stage("video", "ffmpeg", timings):
+                result = subprocess.run(cmd, capture_output=True)
             if result.returncode == 0:
                 exiftool_path = shutil.which("exiftool")
                 if exiftool_path:
@@ -408,9 +1216,16 @@ def process_video(video_data: bytes, filename: str) -> bytes:
                                 f'-Keys:Model={model_name}', f'-Keys:Copyright=Meta AI',
                                 f'-Keys:Comment={comment}', f'-Keys:Description=4V',
                                 f'-Keys:CreationDate={creation_date}', tmp_out_path]
-                    subprocess.run(meta_cmd, capture_output=True)
-                with open(tmp_out_path, 'rb') as f:
-                    return f.read()
+                    with timed_stage("video", "exiftool", timings):
+                        subprocess.run(meta_cmd, capture_output=True)
+                # Capped at the budget: a long video waits for the whole budget
+                # rather than being refused for its size
+                memory.reserved_bytes = min(os.path.getsize(tmp_out_path), memory_budget.capacity)
+                with timed_stage("video", "read_back", timings), memory_budget.reserve(memory.reserved_bytes):
+                    with open(tmp_out_path, 'rb') as f:
+                        output = f.read()
+                memory.checkpoint()
+                return output
         return video_data
     finally:
         if os.path.exists(tmp_in_path):
@@ -421,9 +1236,17 @@ def process_video(video_data: bytes, filename: str) -> bytes:
 @app.post("/api/process/file")
 async def process_file(
     file: UploadFile = File(...),
+    profile: bool = False,
+    x_profile: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
     user_id: str = Depends(verify_token),
     db: Session = Depends(get_db)
 ):
+    # Profiling is opt-in per request: ?profile=1 or "X-Profile: 1", plus the admin token
+    profiling = profile or x_profile not in (None, "", "0")
+    if profiling and not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid X-Admin-Token")
+    
     user = get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -439,15 +1262,36 @@ async def process_file(
     if not is_video and not is_image:
         raise HTTPException(status_code=400, detail="Unsupported file type")
     
+    ext = os.path.splitext(filename)[1]
+    if is_video:
+        path = "video"
+    elif ext in ('.jpg', '.jpeg'):
+        path = "image_jpeg"
+    else:
+        path = "image_convert"
+    stage_durations = {}
+    file_data = b""
+    
     try:
-        file_data = await file.read()
+        with timed_stage("request", "upload_read", stage_durations):
+            file_data = await file.read()
         
+        processor = process_video if is_video else process_image
+        memory = RequestMemory(file.filename)
+        profile_id = None
+        # Run in the threadpool so budget waits and decodes don't stall the event loop
+        with track_inflight("video" if is_video else "image"):
+            if profiling:
+                processed_data, profile_id = await run_in_threadpool(
+                    run_profiled, file.filename, processor, file_data, file.filename, stage_durations, memory)
+            else:
+                processed_data = await run_in_threadpool(
+                    processor, file_data, file.filename, stage_durations, memory)
+        recent_memory.append(memory.summary())
         if is_video:
-            processed_data = process_video(file_data, file.filename)
             media_type = "video/quicktime"
             out_filename = f"RayBan_{os.path.splitext(file.filename)[0]}.MOV"
         else:
-            processed_data = process_image(file_data, file.filename)
             media_type = "image/jpeg"
             out_filename = f"RayBan_{os.path.splitext(file.filename)[0]}.jpg"
         
@@ -456,15 +1300,24 @@ async def process_file(
             user.credits -= 1
             db.commit()
         
-        return StreamingResponse(
-            io.BytesIO(processed_data),
-            media_type=media_type,
-            headers={
-                "Content-Disposition": f"attachment; filename={out_filename}",
-                "X-Credits-Remaining": str(user.credits)
-            }
-        )
+        usage_ledger.record(user_id, ext, path, len(file_data), len(processed_data),
+                            stage_durations, 0 if has_sub else -1)
+        
+        headers = {
+            "Content-Disposition": f"attachment; filename={out_filename}",
+            "X-Credits-Remaining": str(user.credits)
+        }
+        if profile_id:
+            headers["X-Profile-Id"] = profile_id
+        
+        return StreamingResponse(io.BytesIO(processed_data), media_type=media_type, headers=headers)
+    except MemoryBudgetExceeded as e:
+        usage_ledger.record(user_id, ext, path, len(file_data), 0,
+                            stage_durations, 0, success=False)
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
+        usage_ledger.record(user_id, ext, path, len(file_data), 0,
+                            stage_durations, 0, success=False)
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 @app.get("/api/credits")
@@ -542,6 +1395,90 @@ async def admin_remove_subscription(email: str, admin: bool = Depends(verify_adm
     db.commit()
     return {"email": email, "message": "Subscription removed"}
 
+@app.get("/api/admin/stats")
+async def admin_usage_stats(period: str = "daily", days: int = 7, admin: bool = Depends(verify_admin), db: Session = Depends(get_db)):
+    if period not in ("hourly", "daily"):
+        raise HTTPException(status_code=400, detail="period must be 'hourly' or 'daily'")
+    model = UsageHourly if period == "hourly" else UsageDaily
+    since = datetime.utcnow() - timedelta(days=max(1, days))
+    since = since.replace(minute=0, second=0, microsecond=0)
+    if period == "daily":
+        since = since.replace(hour=0)
+    
+    rows = db.query(model).filter(model.bucket_start >= since).order_by(model.bucket_start).all()
+    buckets = []
+    totals = {"events": 0, "failures": 0, "input_bytes": 0, "output_bytes": 0,
+              "total_duration_ms": 0.0, "credits_used": 0}
+    for row in rows:
+        entry = {
+            "bucket_start": row.bucket_start.isoformat(),
+            "file_type": row.file_type,
+            "path": row.path,
+            "events": row.events,
+            "failures": row.failures,
+            "input_bytes": row.input_bytes,
+            "output_bytes": row.output_bytes,
+            "total_duration_ms": round(row.total_duration_ms, 1),
+            "avg_duration_ms": round(row.total_duration_ms / row.events, 1) if row.events else 0.0,
+            "credits_used": row.credits_used,
+        }
+        buckets.append(entry)
+        for key in totals:
+            totals[key] += entry[key]
+    totals["total_duration_ms"] = round(totals["total_duration_ms"], 1)
+    return {
+        "period": period,
+        "since": since.isoformat(),
+        "buckets": buckets,
+        "totals": totals,
+        "pending_events": usage_ledger.pending,
+        "dropped_events": usage_ledger.dropped,
+    }
+
+@app.get("/api/admin/memory")
+async def admin_memory_stats(admin: bool = Depends(verify_admin)):
+    return {
+        "budget": memory_budget.stats(),
+        "process_rss_bytes": current_rss(),
+        "recent_requests": list(recent_memory),
+    }
+
+@app.get("/api/admin/profiles")
+async def admin_list_profiles(admin: bool = Depends(verify_admin)):
+    profiles = []
+    if os.path.isdir(PROFILE_DIR):
+        for name in os.listdir(PROFILE_DIR):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(PROFILE_DIR, name)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+    profiles.sort(key=lambda p: p.get("created_at", ""), reverse=True)
+    return {"profiles": profiles, "total": len(profiles)}
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def admin_get_profile(profile_id: str, format: str = "text", limit: int = 40, admin: bool = Depends(verify_admin)):
+    if format == "pstats":
+        with open(profile_path(profile_id, ".pstats"), "rb") as f:
+            return Response(f.read(), media_type="application/octet-stream", headers={
+                "Content-Disposition": f"attachment; filename={profile_id}.pstats"})
+    if format == "collapsed":
+        with open(profile_path(profile_id, ".collapsed")) as f:
+            return PlainTextResponse(f.read())
+    if format == "text":
+        stream = io.StringIO()
+        stats = pstats.Stats(profile_path(profile_id, ".pstats"), stream=stream)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return PlainTextResponse(stream.getvalue())
+    raise HTTPException(status_code=400, detail="format must be 'text', 'pstats' or 'collapsed'")
+
+@app.delete("/api/admin/profiles/{profile_id}")
+async def admin_delete_profile(profile_id: str, admin: bool = Depends(verify_admin)):
+    profile_path(profile_id, ".json")  # 400 / 404 for bad or unknown ids
+    delete_profile(profile_id)
+    return {"deleted": profile_id}
+
 
 # ============ Health Check ============
 
@@ -556,6 +1493,18 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics(authorization: Optional[str] = Header(None)):
+    if not METRICS_PUBLIC:
+        bearer = f"Bearer {METRICS_TOKEN}"
+        if not (METRICS_TOKEN and authorization and secrets.compare_digest(authorization, bearer)):
+            verify_admin(authorization)  # 401 unless "Admin <token>"
+    lines = []
+    for metric in (REQUEST_LATENCY, STAGE_LATENCY, DB_QUERY_LATENCY, INFLIGHT_JOBS, DB_POOL, MEMORY_BUDGET):
+        lines.extend(metric.render())
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)